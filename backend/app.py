@@ -3,17 +3,22 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import Config
 from db import init_db
+from services.rollup import start_background_rollup
+from services.serialization import OrjsonProvider
 
 # Import des routes
 from routes.auth import auth_bp
 from routes.targets import targets_bp
 from routes.metrics import metrics_bp
 from routes.alerts import alerts_bp
+from routes.live import live_bp
+from services.live import start_change_stream_source
 
 import os
 
 # Initialisation de l'app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config.from_object(Config)
 
 # Configuration CORS
@@ -31,6 +36,7 @@ app.register_blueprint(auth_bp, url_prefix='/api/auth')
 app.register_blueprint(targets_bp, url_prefix='/api/targets')
 app.register_blueprint(metrics_bp, url_prefix='/api/metrics')
 app.register_blueprint(alerts_bp, url_prefix='/api/alerts')
+app.register_blueprint(live_bp, url_prefix='/api/live')
 
 # Route de test
 @app.get('/')
@@ -77,5 +83,14 @@ if __name__ == '__main__':
     print("Initialisation de la base de données...")
     init_db()
 
+    if Config.ROLLUP_ENABLED:
+        print("Démarrage de l'agrégation des métriques (1m / 1h / 1d)...")
+        start_background_rollup()
+
+    if Config.LIVE_SOURCE == "changestream":
+        print("Flux temps réel alimenté par les change streams MongoDB...")
+        start_change_stream_source()
+
+    # Serveur de développement (production : gunicorn -c gunicorn.conf.py app:app)
     print(f"Démarrage du serveur sur le port {Config.PORT}...")
-    app.run(host='0.0.0.0', port=Config.PORT, debug=True)
+    app.run(host='0.0.0.0', port=Config.PORT, debug=True, threaded=True)
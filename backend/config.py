@@ -16,9 +16,67 @@ class Config:
         raise SystemExit("Erreur: JWT_SECRET_KEY manquant dans .env")
     JWT_ACCESS_TOKEN_EXPIRES = 86400  # 24 heures
 
+    # Stockage des métriques: "standard" (un document par mesure)
+    # ou "timeseries" (collection time-series MongoDB, compressée par buckets)
+    METRICS_STORAGE = os.getenv("METRICS_STORAGE", "standard").lower()
+    METRICS_TS_COLLECTION = os.getenv("METRICS_TS_COLLECTION", "metrics_ts")
+    METRICS_TS_GRANULARITY = os.getenv("METRICS_TS_GRANULARITY", "seconds")
+
+    # Agrégation des métriques (paliers 1m / 1h / 1d) et rétention
+    ROLLUP_ENABLED = os.getenv("ROLLUP_ENABLED", "true").lower() in ("1", "true", "yes")
+    ROLLUP_INTERVAL_SECONDS = int(os.getenv("ROLLUP_INTERVAL_SECONDS", "60"))
+    # Délai avant de figer un intervalle ; les mesures plus tardives (jusqu'à
+    # METRICS_MAX_SAMPLE_AGE_SECONDS) font recalculer leurs intervalles
+    ROLLUP_LAG_SECONDS = int(os.getenv("ROLLUP_LAG_SECONDS", "30"))
+    ROLLUP_MAX_BUCKETS_PER_PASS = int(os.getenv("ROLLUP_MAX_BUCKETS_PER_PASS", "1440"))
+    # Rétention en jours (0 = conservation illimitée)
+    RETENTION_RAW_DAYS = int(os.getenv("RETENTION_RAW_DAYS", "0"))
+    ROLLUP_RETENTION_1M_DAYS = int(os.getenv("ROLLUP_RETENTION_1M_DAYS", "30"))
+    ROLLUP_RETENTION_1H_DAYS = int(os.getenv("ROLLUP_RETENTION_1H_DAYS", "365"))
+    ROLLUP_RETENTION_1D_DAYS = int(os.getenv("ROLLUP_RETENTION_1D_DAYS", "0"))
+
+    # Date de collecte fournie par le collector : refusée (date de réception à la place)
+    # si elle est dans le futur au-delà de cette marge ou plus ancienne que cet âge
+    METRICS_MAX_CLOCK_SKEW_SECONDS = int(os.getenv("METRICS_MAX_CLOCK_SKEW_SECONDS", "300"))
+    METRICS_MAX_SAMPLE_AGE_SECONDS = int(os.getenv("METRICS_MAX_SAMPLE_AGE_SECONDS", "86400"))
+
+    # Flux temps réel (SSE) : "local" (publication depuis l'ingestion de ce processus)
+    # ou "changestream" (plusieurs workers, nécessite un replica set, pas en time-series)
+    LIVE_SOURCE = os.getenv("LIVE_SOURCE", "local").lower()
+    if LIVE_SOURCE not in ("local", "changestream"):
+        raise SystemExit(f"Erreur: LIVE_SOURCE={LIVE_SOURCE} inconnu (local ou changestream)")
+    if LIVE_SOURCE == "changestream" and METRICS_STORAGE == "timeseries":
+        # MongoDB n'ouvre pas de change stream sur une collection time-series
+        raise SystemExit("Erreur: LIVE_SOURCE=changestream incompatible avec METRICS_STORAGE=timeseries")
+    LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "256"))
+    LIVE_HEARTBEAT_SECONDS = int(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+    # Validité du jeton d'ouverture du flux (POST /api/live/token)
+    LIVE_TOKEN_TTL_SECONDS = int(os.getenv("LIVE_TOKEN_TTL_SECONDS", "30"))
+
+    # Compression des réponses d'historique (br ou gzip selon Accept-Encoding)
+    COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+    COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+    COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
     # API
     PORT = int(os.getenv("PORT", "5000"))
 
+    # Serveur de production (gunicorn.conf.py) : "production" (gunicorn) ou "development" (app.run)
+    SERVER_MODE = os.getenv("SERVER_MODE", "production").lower()
+    # Plusieurs workers seulement si le flux temps réel est partagé entre processus
+    WEB_WORKERS = int(os.getenv(
+        "WEB_WORKERS",
+        str(min(2 * (os.cpu_count() or 1) + 1, 9)) if LIVE_SOURCE == "changestream" else "1"
+    ))
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "16"))
+    # Flux SSE simultanés par worker (un thread chacun), au-delà : 503
+    LIVE_MAX_STREAMS = int(os.getenv("LIVE_MAX_STREAMS", str(max(1, WEB_THREADS // 2))))
+    WEB_KEEPALIVE = int(os.getenv("WEB_KEEPALIVE", "5"))
+    WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "60"))
+    WEB_GRACEFUL_TIMEOUT = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30"))
+    WEB_MAX_REQUESTS = int(os.getenv("WEB_MAX_REQUESTS", "10000"))
+    WEB_ACCESS_LOG = os.getenv("WEB_ACCESS_LOG", "false").lower() in ("1", "true", "yes")
+
     # CORS Origins (liste pour credentials=True)
     ALLOWED_ORIGINS_STR = os.getenv("ALLOWED_ORIGINS")
     if ALLOWED_ORIGINS_STR:
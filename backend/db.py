@@ -1,5 +1,5 @@
-from pymongo import MongoClient, ASCENDING, DESCENDING
-from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+from pymongo import MongoClient
+from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, CollectionInvalid
 from datetime import datetime
 from config import Config
 
@@ -14,7 +14,9 @@ db = client.get_database()
 # Collections - NOMS STANDARDISÉS
 users_collection = db["users"]
 targets_collection = db["targets"]
-metrics_collection = db["metrics"]
+# Mode "timeseries" : les mesures sont lues et écrites dans une collection time-series
+METRICS_TIMESERIES = Config.METRICS_STORAGE == "timeseries"
+metrics_collection = db[Config.METRICS_TS_COLLECTION if METRICS_TIMESERIES else "metrics"]
 alerts_collection = db["alerts_history"]
 alerts_config_collection = db["alerts_config"]
 poll_errors_collection = db["poll_errors"]
@@ -43,25 +45,43 @@ def check_connection():
         print(f"MongoDB erreur: {e}")
         return False
 
+def ensure_metrics_timeseries():
+    """Créer la collection time-series des métriques si elle n'existe pas"""
+    name = Config.METRICS_TS_COLLECTION
+    # Rétention des mesures brutes : option de la collection time-series
+    expire = Config.RETENTION_RAW_DAYS * 86400 if Config.RETENTION_RAW_DAYS else "off"
+
+    if name in db.list_collection_names():
+        db.command("collMod", name, expireAfterSeconds=expire)
+        return db[name]
+
+    try:
+        options = {}
+        if Config.RETENTION_RAW_DAYS:
+            options["expireAfterSeconds"] = expire
+        db.create_collection(
+            name,
+            timeseries={
+                "timeField": "timestamp",
+                "metaField": "server_id",
+                "granularity": Config.METRICS_TS_GRANULARITY
+            },
+            **options
+        )
+        print(f"Collection time-series créée: {name}")
+    except CollectionInvalid:
+        # Créée entre-temps par un autre processus
+        pass
+    return db[name]
+
 def init_db():
     """Initialiser les index et l'admin par défaut"""
     try:
-        # Index pour users
-        users_collection.create_index([("username", ASCENDING)], unique=True)
-        users_collection.create_index([("email", ASCENDING)], unique=True)
-
-        # Index pour targets
-        targets_collection.create_index([("ip", ASCENDING)], unique=True)
-        targets_collection.create_index([("enabled", ASCENDING)])
-
-        # Index pour metrics
-        metrics_collection.create_index([("target_id", ASCENDING)])
-        metrics_collection.create_index([("timestamp", DESCENDING)])
-        metrics_collection.create_index([("target_id", ASCENDING), ("timestamp", DESCENDING)])
+        if METRICS_TIMESERIES:
+            ensure_metrics_timeseries()
 
-        # Index pour alerts
-        alerts_config_collection.create_index([("target_id", ASCENDING)], unique=True)
-        alerts_collection.create_index([("target_id", ASCENDING), ("timestamp", DESCENDING)])
+        from services.indexes import sync_indexes
+        sync_indexes(db)
 
         print("Index MongoDB créés avec succès")
     except Exception as e:
@@ -12,6 +12,16 @@ else
   echo "ℹSkip init admin (MONGODB_URI absent ou script manquant)"
 fi
 
-# Lance l'app Flask
-echo "Lancement Flask sur port 5000..."
-exec python app.py
+SERVER_MODE="${SERVER_MODE:-production}"
+
+if [ "$SERVER_MODE" = "development" ]; then
+  # Serveur de développement Flask (reloader + debugger, un seul processus)
+  echo "Lancement Flask (développement) sur port ${PORT:-5000}..."
+  exec python app.py
+fi
+
+# Lance gunicorn (workers, threads, keep-alive : voir gunicorn.conf.py)
+# L'agrégation des métriques est lancée et supervisée par le maître gunicorn
+# Rechargement sans coupure : kill -HUP sur le processus gunicorn
+echo "Lancement gunicorn sur port ${PORT:-5000}..."
+exec gunicorn -c gunicorn.conf.py app:app
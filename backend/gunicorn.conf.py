@@ -0,0 +1,113 @@
+"""
+Configuration gunicorn du backend (mode production).
+
+Usage :
+    gunicorn -c gunicorn.conf.py app:app
+
+- workers gthread : WEB_WORKERS processus de WEB_THREADS threads. Chaque
+  client du flux temps réel (/api/live/stream) occupe un thread tant qu'il
+  est connecté : au plus LIVE_MAX_STREAMS flux par worker, les threads
+  restants servent l'API ;
+- plusieurs workers exigent LIVE_SOURCE=changestream (sinon un client SSE ne
+  verrait que les mesures reçues par son worker) : le démarrage est refusé ;
+- preload : l'application, ses routes et le client MongoDB sont importés
+  une seule fois dans le maître avant le fork (PyMongo >= 4.3 réinitialise
+  ses connexions dans chaque worker) ;
+- rechargement sans coupure : `kill -HUP <pid du maître>` relance les
+  workers un par un, les requêtes en cours disposent de graceful_timeout ;
+- recyclage des workers après WEB_MAX_REQUESTS requêtes (avec gigue) pour
+  borner la mémoire.
+
+L'initialisation des index est faite une fois, dans le maître. L'agrégation
+des métriques tourne dans un processus séparé, lancé par le maître et relancé
+s'il s'arrête, et non dans chaque worker.
+"""
+
+import sys
+import subprocess
+import threading
+from config import Config
+
+bind = f"0.0.0.0:{Config.PORT}"
+
+worker_class = "gthread"
+workers = Config.WEB_WORKERS
+threads = Config.WEB_THREADS
+preload_app = True
+
+# Connexions HTTP persistantes (collector, reverse proxy)
+keepalive = Config.WEB_KEEPALIVE
+backlog = 2048
+
+# Un worker sans signe de vie pendant `timeout` secondes est relancé
+timeout = Config.WEB_TIMEOUT
+graceful_timeout = Config.WEB_GRACEFUL_TIMEOUT
+
+max_requests = Config.WEB_MAX_REQUESTS
+max_requests_jitter = max(1, Config.WEB_MAX_REQUESTS // 10) if Config.WEB_MAX_REQUESTS else 0
+
+accesslog = "-" if Config.WEB_ACCESS_LOG else None
+errorlog = "-"
+loglevel = "info"
+
+
+# Délai avant de relancer le processus d'agrégation après un arrêt
+ROLLUP_RESTART_SECONDS = 5
+
+_rollup_stop = threading.Event()
+_rollup_process = None
+
+
+def on_starting(server):
+    """Maître : index et collections une seule fois, avant le chargement de l'application"""
+    if server.cfg.workers > 1 and Config.LIVE_SOURCE != "changestream":
+        # Publication locale : un client SSE ne verrait que les mesures reçues par son worker
+        raise SystemExit(
+            f"Erreur: {server.cfg.workers} workers avec LIVE_SOURCE={Config.LIVE_SOURCE}, "
+            f"utiliser LIVE_SOURCE=changestream ou WEB_WORKERS=1"
+        )
+    from db import init_db
+    print("Initialisation de la base de données...")
+    init_db()
+
+
+def _supervise_rollup(server):
+    """Lancer l'agrégation et la relancer tant que gunicorn tourne"""
+    global _rollup_process
+    while not _rollup_stop.is_set():
+        _rollup_process = subprocess.Popen([sys.executable, "-m", "services.rollup"])
+        # Le maître récupère aussi les processus enfants terminés : le code de
+        # sortie peut être perdu (0), seul l'arrêt compte ici
+        code = _rollup_process.wait()
+        if _rollup_stop.is_set():
+            break
+        server.log.warning(f"Agrégation des métriques arrêtée (code {code}), "
+                           f"redémarrage dans {ROLLUP_RESTART_SECONDS}s")
+        _rollup_stop.wait(ROLLUP_RESTART_SECONDS)
+
+
+def when_ready(server):
+    """Maître : agrégation des métriques dans un processus supervisé"""
+    if Config.ROLLUP_ENABLED:
+        print("Démarrage de l'agrégation des métriques (1m / 1h / 1d)...")
+        threading.Thread(target=_supervise_rollup, args=(server,), name="rollup-supervisor", daemon=True).start()
+
+
+def on_exit(server):
+    """Maître : arrêter l'agrégation avec gunicorn"""
+    _rollup_stop.set()
+    process = _rollup_process
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def post_fork(server, worker):
+    """Worker : sources propres à chaque processus"""
+    if Config.LIVE_SOURCE == "changestream":
+        # Chaque worker a son broker et ses abonnés SSE
+        from services.live import start_change_stream_source
+        start_change_stream_source()
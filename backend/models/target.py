@@ -3,7 +3,7 @@ from datetime import datetime
 
 class Target:
     @staticmethod
-    def create(ip, alias=None, port=22, enabled=True):
+    def create(ip, alias=None, port=22, enabled=True, poll_interval=None, alert_poll_interval=None):
         """Créer une nouvelle cible"""
         target = {
             "ip": ip,
@@ -12,15 +12,20 @@ class Target:
             "enabled": enabled,
             "created_at": datetime.utcnow().isoformat()
         }
+        # Intervalles de collecte propres à la cible (sinon ceux du collector)
+        if poll_interval:
+            target["poll_interval"] = poll_interval
+        if alert_poll_interval:
+            target["alert_poll_interval"] = alert_poll_interval
 
-        result = targets.insert_one(target)
-        target["_id"] = str(result.inserted_id)
+        # insert_one ajoute _id au document
+        targets.insert_one(target)
         return target
 
     @staticmethod
-    def find_all():
+    def find_all(projection=None):
         """Récupérer toutes les cibles"""
-        return list(targets.find())
+        return list(targets.find({}, projection))
 
     @staticmethod
     def find_by_ip(ip):
@@ -1,7 +1,10 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from db import db
+from services.live import live_broker, publish_local
 
 alerts_bp = Blueprint('alerts', __name__)
 
@@ -22,9 +25,6 @@ def get_active_alerts():
             {"status": "active"},
             sort=[("created_at", -1)]
         ))
-
-        for alert in alerts:
-            alert['_id'] = str(alert['_id'])
         return jsonify(alerts), 200
 
     except Exception as e:
@@ -41,9 +41,6 @@ def get_alerts_history():
             sort=[("created_at", -1)],
             limit=limit
         ))
-
-        for alert in alerts:
-            alert['_id'] = str(alert['_id'])
         return jsonify(alerts), 200
 
     except Exception as e:
@@ -104,23 +101,74 @@ def clear_all_alerts():
         return jsonify({"error": str(e)}), 500
 
 
+DEFAULT_RULES = {
+    "cpu_threshold": 80,
+    "memory_threshold": 85,
+    "disk_threshold": 90,
+    "temperature_threshold": 85,
+    "enabled": True
+}
+
+
+# Réglages facultatifs par serveur : seuil de retour (hystérésis), durée de
+# dépassement avant déclenchement, et règle de remplissage du disque (%/h)
+OPTIONAL_RULE_FIELDS = tuple(
+    f"{metric}_{option}"
+    for metric in ("cpu", "memory", "disk", "temperature")
+    for option in ("clear_threshold", "for_seconds")
+) + ("disk_fill_rate_threshold",)
+
+
+@alerts_bp.get('/rules')
+def list_alert_rules():
+    """
+    Toutes les règles d'alerte (appelé par le collector pour son cache).
+    Avec ?since=<version>, seules les règles modifiées depuis cette version
+    sont renvoyées. La version est la date de la dernière modification.
+    """
+    try:
+        query = {}
+        since = request.args.get('since')
+        if since:
+            since_dt = datetime.fromisoformat(since.replace('Z', '+00:00'))
+            if since_dt.tzinfo is None:
+                since_dt = since_dt.replace(tzinfo=timezone.utc)
+            query["updated_at"] = {"$gte": since_dt}
+
+        rules = list(alert_rules_collection.find(query, {"_id": 0}))
+
+        version = since
+        for rule in rules:
+            updated_at = rule.get("updated_at")
+            if isinstance(updated_at, datetime):
+                if updated_at.tzinfo is None:
+                    updated_at = updated_at.replace(tzinfo=timezone.utc)
+                rule["updated_at"] = updated_at.isoformat()
+                if version is None or rule["updated_at"] > version:
+                    version = rule["updated_at"]
+
+        return jsonify({
+            "rules": rules,
+            "defaults": DEFAULT_RULES,
+            "version": version,
+            "full": not since
+        }), 200
+
+    except ValueError as e:
+        return jsonify({"error": f"Paramètre invalide: {e}"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @alerts_bp.get('/rules/<server_id>')
 def get_alert_rules(server_id):
     try:
-        rules = alert_rules_collection.find_one({"server_id": server_id})
+        rules = alert_rules_collection.find_one({"server_id": server_id}, {"_id": 0})
 
         if rules:
-            rules['_id'] = str(rules['_id'])
             return jsonify(rules), 200
 
-        return jsonify({
-            "server_id": server_id,
-            "cpu_threshold": 80,
-            "memory_threshold": 85,
-            "disk_threshold": 90,
-            "temperature_threshold": 85,
-            "enabled": True
-        }), 200
+        return jsonify({"server_id": server_id, **DEFAULT_RULES}), 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -134,13 +182,15 @@ def set_alert_rules(server_id):
 
         rules = {
             "server_id": server_id,
-            "cpu_threshold": data.get('cpu_threshold', 80),
-            "memory_threshold": data.get('memory_threshold', 85),
-            "disk_threshold": data.get('disk_threshold', 90),
-            "temperature_threshold": data.get('temperature_threshold', 85),
-            "enabled": data.get('enabled', True),
+            "cpu_threshold": data.get('cpu_threshold', DEFAULT_RULES["cpu_threshold"]),
+            "memory_threshold": data.get('memory_threshold', DEFAULT_RULES["memory_threshold"]),
+            "disk_threshold": data.get('disk_threshold', DEFAULT_RULES["disk_threshold"]),
+            "temperature_threshold": data.get('temperature_threshold', DEFAULT_RULES["temperature_threshold"]),
+            "enabled": data.get('enabled', DEFAULT_RULES["enabled"]),
             "updated_at": now_utc()
         }
+        # Réglages optionnels du moteur d'alertes du collector
+        rules.update({k: data[k] for k in OPTIONAL_RULE_FIELDS if data.get(k) is not None})
 
         alert_rules_collection.update_one(
             {"server_id": server_id},
@@ -154,40 +204,153 @@ def set_alert_rules(server_id):
         return jsonify({"error": str(e)}), 500
 
 
+# Champs gérés par le backend, jamais repris tels quels du collector
+MANAGED_FIELDS = ("_id", "server_id", "type", "status", "created_at", "updated_at")
+
+
+def alert_upsert(data, now):
+    """
+    Upsert de l'alerte active (server_id, type) : une seule alerte active par
+    serveur et par type, garantie par l'index unique partiel sur status=active.
+    """
+    return UpdateOne(
+        {"server_id": data["server_id"], "type": data["type"], "status": "active"},
+        {
+            "$set": {
+                **{k: v for k, v in data.items() if k not in MANAGED_FIELDS},
+                "updated_at": now
+            },
+            "$setOnInsert": {"created_at": now}
+        },
+        upsert=True
+    )
+
+
+def alert_resolve(data, now):
+    """Retour à la normale signalé par le collector : l'alerte active est résolue"""
+    return UpdateOne(
+        {"server_id": data["server_id"], "type": data["type"], "status": "active"},
+        {"$set": {
+            "status": "resolved",
+            "resolved_at": now,
+            "resolved_value": data.get("value"),
+            "resolved_message": data.get("message"),
+            "updated_at": now
+        }}
+    )
+
+
+def alert_operation(data, now):
+    if data.get("status") == "resolved":
+        return alert_resolve(data, now)
+    return alert_upsert(data, now)
+
+
+def write_alerts(alerts):
+    """
+    Écrire un lot d'alertes en un seul bulk_write.
+    Retourne ({index dans le lot: _id des alertes créées}, date d'écriture).
+    """
+    now = now_utc()
+    operations = [alert_operation(alert, now) for alert in alerts]
+
+    # Ne publier que les retours à la normale qui résolvent réellement une alerte
+    resolved = [a for a in alerts if a.get("status") == "resolved"]
+    open_alerts = set()
+    if resolved and publish_local():
+        open_alerts = {
+            (a["server_id"], a["type"]) for a in alerts_collection.find(
+                {"status": "active", "$or": [{"server_id": a["server_id"], "type": a["type"]} for a in resolved]},
+                {"_id": 0, "server_id": 1, "type": 1}
+            )
+        }
+
+    try:
+        upserted = alerts_collection.bulk_write(operations, ordered=False).upserted_ids
+    except BulkWriteError as e:
+        # Deux upserts concurrents sur la même alerte : le second devient une mise à jour
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+        upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+        retry = [operations[err["index"]] for err in e.details["writeErrors"]]
+        alerts_collection.bulk_write(retry, ordered=False)
+
+    if publish_local():
+        for index, alert in enumerate(alerts):
+            if alert.get("status") == "resolved" and (alert["server_id"], alert["type"]) not in open_alerts:
+                continue
+            event = {k: v for k, v in alert.items() if k not in ("_id", "created_at")}
+            event.update({"status": alert.get("status") or "active", "updated_at": now})
+            if index in upserted:
+                event["_id"] = upserted[index]
+                event["created_at"] = now
+            live_broker.publish_alert(event)
+
+    return upserted, now
+
+
+def validate_alert(data):
+    return isinstance(data, dict) and all(k in data for k in ("server_id", "type", "value", "message"))
+
+
 @alerts_bp.post('/create')
 def create_alert():
     try:
         data = request.get_json()
 
-        five_minutes_ago = now_utc() - timedelta(minutes=5)
+        if not validate_alert(data):
+            return jsonify({"error": "Champs manquants"}), 400
 
-        # Vérifier alerte existante
-        existing = alerts_collection.find_one({
-            "server_id": data["server_id"],
-            "type": data["type"],
-            "status": "active",
-            "created_at": {"$gte": five_minutes_ago}
-        })
+        upserted, now = write_alerts([data])
 
-        if existing:
-            alerts_collection.update_one(
-                {"_id": existing["_id"]},
-                {"$set": {
-                    "value": data["value"],
-                    "message": data["message"],
-                    "updated_at": now_utc()
-                }}
-            )
+        if data.get("status") == "resolved":
+            return jsonify({"message": "Alerte résolue"}), 200
+
+        if not upserted:
             return jsonify({"message": "Alerte mise à jour"}), 200
 
         # Nouvelle alerte
-        data["created_at"] = now_utc()
-        data["updated_at"] = now_utc()
+        data = {k: v for k, v in data.items() if k not in ("_id", "status", "created_at", "updated_at")}
+        data.update({
+            "_id": upserted[0],
+            "status": "active",
+            "created_at": now,
+            "updated_at": now
+        })
+        return jsonify(data), 201
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
 
-        result = alerts_collection.insert_one(data)
-        data["_id"] = str(result.inserted_id)
 
-        return jsonify(data), 201
+@alerts_bp.post('/batch')
+def create_alerts_batch():
+    """Créer ou mettre à jour toutes les alertes d'un cycle de collecte en une écriture"""
+    try:
+        data = request.get_json()
+
+        if isinstance(data, dict):
+            data = data.get('alerts')
+
+        if not isinstance(data, list):
+            return jsonify({"error": "Liste d'alertes attendue"}), 400
+
+        alerts = [alert for alert in data if validate_alert(alert)]
+        rejected = len(data) - len(alerts)
+
+        if not alerts:
+            return jsonify({"inserted": 0, "updated": 0, "rejected": rejected}), 400
+
+        upserted, _now = write_alerts(alerts)
+        inserted = len(upserted)
+        resolved = sum(1 for alert in alerts if alert.get("status") == "resolved")
+
+        return jsonify({
+            "inserted": inserted,
+            "updated": len(alerts) - inserted - resolved,
+            "resolved": resolved,
+            "rejected": rejected
+        }), 207 if rejected else 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,82 @@
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from services.live import live_broker
+from services.latest_cache import latest_cache
+from services.serialization import dumps
+from config import Config
+import queue
+
+live_bp = Blueprint('live', __name__)
+
+# Délai de reconnexion conseillé aux clients (retry SSE, Retry-After)
+STREAM_RETRY_SECONDS = 5
+
+
+def format_event(event, payload):
+    """Mettre en forme un événement Server-Sent Events"""
+    return f"event: {event}\ndata: {dumps(payload)}\n\n"
+
+
+def stream_serializer():
+    # Jetons signés avec la clé JWT mais d'un autre type : inutilisables sur le reste de l'API
+    return URLSafeTimedSerializer(current_app.config["JWT_SECRET_KEY"], salt="live-stream")
+
+
+@live_bp.post('/token')
+@jwt_required()
+def stream_token():
+    """Jeton d'ouverture du flux, valable LIVE_TOKEN_TTL_SECONDS secondes"""
+    token = stream_serializer().dumps({"sub": get_jwt_identity()})
+    return jsonify({"token": token, "expires_in": Config.LIVE_TOKEN_TTL_SECONDS}), 200
+
+
+@live_bp.get('/stream')
+def live_stream():
+    """
+    Flux SSE des mesures (deltas) et des alertes.
+    EventSource ne pouvant pas envoyer d'en-tête, la connexion est ouverte
+    avec un jeton court obtenu par POST /token (?token=...), jamais avec le
+    JWT : seul ce jeton, expiré en quelques secondes, peut apparaître dans
+    les journaux des proxys. Filtre optionnel : ?servers=ip1,ip2
+    """
+    try:
+        stream_serializer().loads(request.args.get('token', ''), max_age=Config.LIVE_TOKEN_TTL_SECONDS)
+    except BadSignature:
+        return jsonify({"error": "Jeton de flux invalide ou expiré"}), 401
+
+    servers = [s for s in request.args.get('servers', '').split(',') if s] or None
+    # Chaque flux occupe un thread du worker : le reste est gardé pour l'API
+    subscriber = live_broker.subscribe(servers, limit=Config.LIVE_MAX_STREAMS)
+    if subscriber is None:
+        response = jsonify({"error": "Trop de flux temps réel ouverts, réessayer plus tard"})
+        response.headers["Retry-After"] = str(STREAM_RETRY_SECONDS)
+        return response, 503
+
+    # État complet au démarrage, puis uniquement les changements
+    latest, _etag = latest_cache.get_all()
+    snapshot = {server_id: doc for server_id, doc in latest.items() if subscriber.wants(server_id)}
+
+    def generate():
+        try:
+            yield f"retry: {STREAM_RETRY_SECONDS * 1000}\n\n"
+            yield format_event("snapshot", snapshot)
+            while True:
+                try:
+                    event, payload = subscriber.queue.get(timeout=Config.LIVE_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # Garder la connexion ouverte à travers les proxys
+                    yield ": ping\n\n"
+                    continue
+                yield format_event(event, payload)
+        finally:
+            live_broker.unsubscribe(subscriber)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
@@ -1,115 +1,521 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required
+from pymongo.errors import BulkWriteError
+from bson.objectid import ObjectId
 from db import metrics
-from datetime import datetime
+from config import Config
+from services.serialization import json_default, dumps
+from services.rollup import (
+    select_tier, tier_collection, tier_documents_from_raw, rollup_watermarks, mark_late_samples, ROLLUP_FIELDS
+)
+from services.latest_cache import latest_cache
+from services.live import live_broker, publish_local
+from services.columnar import to_columnar
+from services.history import bucket_pipeline, fill_bounds, split_at_watermark
+from services.compression import compress_response
+from datetime import datetime, timezone, timedelta
+import re
+import io
+import math
+import csv
 import pytz
 
 metrics_bp = Blueprint('metrics', __name__)
 
+REQUIRED_FIELDS = ['server_id', 'cpu_usage', 'memory_usage', 'disk_usage']
+
+# Champs fixés par le backend, jamais repris de la mesure (timestamp : sample_timestamp)
+RESERVED_FIELDS = ('_id', 'timestamp')
+
+FIELD_NAME = re.compile(r'^[a-z][a-z0-9_]*$')
+# Clés des objets imbriqués (interfaces, disques) : ni opérateur MongoDB ni chemin pointé
+NESTED_KEY = re.compile(r'^[^$.\x00][^.\x00]{0,63}$')
+
+# Bornes d'une mesure reçue par la route d'ingestion (non authentifiée)
+MAX_METRIC_FIELDS = 200
+MAX_VALUE_DEPTH = 2
+MAX_VALUE_ITEMS = 4096
+MAX_STRING_LENGTH = 256
+MAX_INTEGER = 2 ** 63 - 1
+
+
+def value_size(value, depth=0):
+    """
+    Nombre d'éléments d'une valeur de mesure : nombre, texte court ou
+    liste/objet de ces valeurs, d'imbrication et de taille bornées.
+    ValueError si la valeur n'est pas admise.
+    """
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, int):
+        if abs(value) > MAX_INTEGER:
+            raise ValueError("entier hors limites")
+        return 1
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError("valeur non finie")
+        return 1
+    if isinstance(value, str):
+        if len(value) > MAX_STRING_LENGTH:
+            raise ValueError("texte trop long")
+        return 1
+    if isinstance(value, (list, dict)):
+        if depth >= MAX_VALUE_DEPTH:
+            raise ValueError("imbrication trop profonde")
+        if isinstance(value, dict):
+            invalid = [k for k in value if not isinstance(k, str) or not NESTED_KEY.match(k)]
+            if invalid:
+                raise ValueError(f"clé invalide: {invalid[0]!r}")
+            value = value.values()
+        size = 1 + sum(value_size(item, depth + 1) for item in value)
+        if size > MAX_VALUE_ITEMS:
+            raise ValueError("valeur trop volumineuse")
+        return size
+    raise ValueError(f"type non admis: {type(value).__name__}")
+
+
+def build_metric_document(data):
+    """
+    Construire le document stocké à partir d'une mesure du collector.
+    Tous les champs au nom valide sont conservés : un nouveau champ du
+    script distant est stocké sans modification de cette route. La route
+    n'étant pas authentifiée, la forme de la mesure est contrôlée (nombre de
+    champs, noms, champs réservés, valeurs) : ValueError si elle est refusée.
+    """
+    if len(data) > MAX_METRIC_FIELDS:
+        raise ValueError(f"trop de champs ({len(data)}, maximum {MAX_METRIC_FIELDS})")
+    for field in ('server_id', 'ip'):
+        if field in data and (not isinstance(data[field], str) or not data[field]):
+            raise ValueError(f"{field} doit être une chaîne non vide")
+
+    document = {}
+    for key, value in data.items():
+        if key == '_id' or not isinstance(key, str) or not FIELD_NAME.match(key):
+            raise ValueError(f"champ invalide: {key!r}")
+        if key in RESERVED_FIELDS:
+            continue
+        try:
+            value_size(value)
+        except ValueError as e:
+            raise ValueError(f"{key}: {e}")
+        document[key] = value
+
+    document.setdefault("ip", data['server_id'])
+    document.setdefault("cpu_temperature", None)
+    document.setdefault("network_rx", 0)
+    document.setdefault("network_tx", 0)
+    document["timestamp"] = sample_timestamp(data.get("timestamp"))
+    return document
+
+
+def sample_timestamp(value, now=None):
+    """
+    Date de collecte fournie par le collector (ISO 8601 ou epoch en secondes),
+    en UTC naïf. Les mesures envoyées par lots gardent ainsi leur date réelle.
+    Date de réception si la valeur est absente, invalide ou hors des bornes.
+    """
+    now = now or datetime.utcnow()
+    try:
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            timestamp = datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+        elif isinstance(value, str):
+            timestamp = parse_datetime(value)
+        else:
+            return now
+    except (ValueError, OverflowError, OSError):
+        return now
+
+    if timestamp is None or timestamp > now + timedelta(seconds=Config.METRICS_MAX_CLOCK_SKEW_SECONDS):
+        return now
+    if timestamp < now - timedelta(seconds=Config.METRICS_MAX_SAMPLE_AGE_SECONDS):
+        return now
+    return timestamp
+
+
+def note_late_samples(documents):
+    """Mesures tardives : intervalles déjà agrégés à recalculer par le rollup"""
+    if not Config.ROLLUP_ENABLED:
+        return
+    try:
+        mark_late_samples(documents)
+    except Exception as e:
+        print(f"Erreur signalement des mesures tardives: {e}")
+
+
 @metrics_bp.post('')
 def add_metric():
     """Ajouter une nouvelle métrique (appelé par le collector)"""
     data = request.get_json()
-    required = ['server_id', 'cpu_usage', 'memory_usage', 'disk_usage']
 
-    if not all(field in data for field in required):
+    if not isinstance(data, dict) or not all(field in data for field in REQUIRED_FIELDS):
         return jsonify({"error": "Champs manquants"}), 400
 
     try:
-        metric = {
-            "server_id": data['server_id'],
-            "ip": data.get('ip', data['server_id']),
-            "cpu_usage": data['cpu_usage'],
-            "memory_usage": data['memory_usage'],
-            "disk_usage": data['disk_usage'],
-            "cpu_temperature": data.get('cpu_temperature'),
-            "network_rx": data.get('network_rx', 0),
-            "network_tx": data.get('network_tx', 0),
-            "timestamp": datetime.utcnow()
-        }
-
-        result = metrics.insert_one(metric)
-        metric['_id'] = str(result.inserted_id)
+        metric = build_metric_document(data)
+    except ValueError as e:
+        return jsonify({"error": f"Mesure refusée: {e}"}), 400
+
+    try:
+
+        metrics.insert_one(metric)
+        note_late_samples([metric])
+        latest_cache.update(metric)
+        if publish_local():
+            live_broker.publish_metric(metric)
         return jsonify(metric), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@metrics_bp.post('/batch')
+def add_metrics_batch():
+    """Ajouter un lot de métriques en une seule écriture (appelé par le collector)"""
+    data = request.get_json()
+
+    if isinstance(data, dict):
+        data = data.get('metrics')
+
+    if not isinstance(data, list):
+        return jsonify({"error": "Liste de métriques attendue"}), 400
+
+    documents = []
+    rejected = 0
+    for item in data:
+        if not isinstance(item, dict) or not all(field in item for field in REQUIRED_FIELDS):
+            rejected += 1
+            continue
+        try:
+            documents.append(build_metric_document(item))
+        except ValueError:
+            rejected += 1
+
+    if not documents:
+        return jsonify({"inserted": 0, "rejected": rejected}), 400
+
+    try:
+        result = metrics.insert_many(documents, ordered=False)
+        note_late_samples(documents)
+        for document in documents:
+            latest_cache.update(document)
+            if publish_local():
+                live_broker.publish_metric(document)
+        return jsonify({
+            "inserted": len(result.inserted_ids),
+            "rejected": rejected
+        }), 201
+    except BulkWriteError as e:
+        # Recalcul sans effet pour les mesures non écrites
+        note_late_samples(documents)
+        inserted = e.details.get('nInserted', 0)
+        return jsonify({
+            "inserted": inserted,
+            "rejected": rejected + len(documents) - inserted,
+            "error": "Écriture partielle du lot"
+        }), 207
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@metrics_bp.get('/latest')
+@jwt_required()
+def get_all_latest_metrics():
+    """Dernière métrique de chaque serveur, en une seule réponse (avec ETag)"""
+    try:
+        latest, etag = latest_cache.get_all()
+
+        # Comparaison faible : un proxy qui compresse la réponse transforme l'ETag en W/"..."
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = jsonify(latest)
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @metrics_bp.get('/<server_id>/latest')
 @jwt_required()
 def get_latest_metric(server_id):
     """Obtenir la dernière métrique d'un serveur"""
     try:
-        metric = metrics.find_one(
-            {"server_id": server_id},
-            sort=[("timestamp", -1)]
-        )
+        metric = latest_cache.get(server_id)
 
         if not metric:
             return jsonify({"error": "Aucune métrique trouvée"}), 404
 
-        metric['_id'] = str(metric['_id'])
         return jsonify(metric), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+def parse_datetime(value):
+    """Convertir une date ISO 8601 en datetime UTC naïf (format stocké)"""
+    if not value:
+        return None
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+
+MAX_HISTORY_LIMIT = 10000
+
+
+def parse_fields(value):
+    """Liste de champs demandés (?fields=cpu_usage,memory_usage)"""
+    if not value:
+        return None
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    invalid = [f for f in fields if not FIELD_NAME.match(f)]
+    if invalid:
+        raise ValueError(f"champs invalides: {', '.join(invalid)}")
+    return fields
+
+
+def read_history(server_id, tier, from_tier, time_range, step, fields, descending, limit, fill):
+    """Lire une partie de l'historique, depuis le palier ou depuis les mesures brutes"""
+    query = {"server_id": server_id}
+    if time_range:
+        query["timestamp"] = time_range
+    collection = tier_collection(tier) if from_tier else metrics
+
+    if step:
+        bounds = None
+        if fill:
+            # Plage restreinte par le curseur : les pages suivantes ne régénèrent
+            # pas les intervalles vides déjà renvoyés
+            bounds = fill_bounds(time_range, step)
+        return list(collection.aggregate(bucket_pipeline(
+            query, step, fields or ROLLUP_FIELDS, from_tier, descending, limit, bounds
+        )))
+
+    if tier and not from_tier:
+        # Après le watermark : intervalles du palier calculés à la volée, même forme
+        docs = tier_documents_from_raw(tier, query, fields or ROLLUP_FIELDS, descending, limit)
+        if fields:
+            keep = {"timestamp", *fields}
+            docs = [{key: value for key, value in doc.items() if key in keep} for doc in docs]
+        return docs
+
+    projection = {"_id": 0}
+    if fields:
+        projection.update({"timestamp": 1, **{f: 1 for f in fields}})
+    return list(
+        collection.find(query, projection)
+        .sort("timestamp", -1 if descending else 1)
+        .limit(limit)
+    )
+
+
 @metrics_bp.get('/<server_id>/history')
 @jwt_required()
 def get_metric_history(server_id):
-    """Obtenir l'historique des métriques"""
+    """
+    Obtenir l'historique des métriques.
+
+    Paramètres : from/to (ISO 8601), step (secondes, agrégation en intervalles
+    fixes), resolution (secondes, choix du palier agrégé), fields (liste de
+    champs), order (asc/desc), limit et cursor (pagination par timestamp).
+
+    format=columnar : tableaux parallèles (timestamps en epoch ms, une série
+    par champ) au lieu d'une liste d'objets, avec delta=1 pour le codage
+    différentiel et precision=<n> pour arrondir les valeurs.
+    La réponse est compressée (br/gzip) si le client l'accepte.
+    """
     try:
-        limit = int(request.args.get('limit', 100))
-        page = int(request.args.get('page', 1))
-        skip = (page - 1) * limit
+        limit = min(int(request.args.get('limit', 100)), MAX_HISTORY_LIMIT)
+        if limit < 1:
+            raise ValueError("limit doit être supérieur ou égal à 1")
+        descending = request.args.get('order', 'desc') != 'asc'
+        start = parse_datetime(request.args.get('from'))
+        end = parse_datetime(request.args.get('to'))
+        cursor = parse_datetime(request.args.get('cursor'))
+        step = request.args.get('step', type=int)
+        resolution = request.args.get('resolution', type=int) or step
+        fields = parse_fields(request.args.get('fields'))
+        shape = request.args.get('format', 'rows')
+        precision = request.args.get('precision', type=int)
 
-        cursor = metrics.find(
-            {"server_id": server_id}
-        ).sort("timestamp", -1).skip(skip).limit(limit)
+        if step is not None and step <= 0:
+            raise ValueError("step doit être positif")
+        if step and not start:
+            # Une agrégation sans borne de début parcourrait tout l'historique
+            raise ValueError("from est requis avec step")
+        if shape not in ('rows', 'columnar'):
+            raise ValueError(f"format inconnu: {shape}")
+        if shape == 'columnar' and not fields:
+            # Une série par champ : limiter aux métriques numériques connues
+            fields = ROLLUP_FIELDS
 
-        data = list(cursor)
+        time_range = {}
+        if start:
+            time_range["$gte"] = start
+        if end:
+            time_range["$lt"] = end
 
-        for item in data:
-            item['_id'] = str(item['_id'])
+        # Pagination par curseur : reprendre après le dernier point renvoyé
+        if cursor:
+            if descending:
+                time_range["$lt"] = min(cursor, end) if end else cursor
+            else:
+                after = cursor + timedelta(seconds=step or 0)
+                time_range["$gte" if step else "$gt"] = max(after, start) if start else after
 
-        total = metrics.count_documents({"server_id": server_id})
+        # Palier agrégé le plus grossier compatible avec la résolution demandée
+        tier = None
+        segments = [(False, time_range)]
+        if resolution:
+            watermarks = rollup_watermarks()
+            tier = select_tier(start, resolution, watermarks)
+        if tier:
+            # Palier complet jusqu'à son watermark seulement : la suite vient des mesures brutes
+            tier_range, raw_range = split_at_watermark(time_range, watermarks[tier], step)
+            segments = [(from_tier, r) for from_tier, r in ((True, tier_range), (False, raw_range)) if r is not None]
+        if descending:
+            segments.reverse()
 
-        return jsonify({
-            "data": data,
-            "total": total,
-            "page": page,
+        fill = step and request.args.get('fill') in ('1', 'true')
+        data = []
+        for from_tier, segment_range in segments:
+            if len(data) >= limit:
+                break
+            data.extend(read_history(
+                server_id, tier, from_tier, segment_range, step, fields, descending, limit - len(data), fill
+            ))
+
+        next_cursor = None
+        if data and len(data) == limit:
+            next_cursor = data[-1]['timestamp'].isoformat()
+
+        if shape == 'columnar':
+            body = {
+                "format": "columnar",
+                **to_columnar(data, fields, request.args.get('delta') in ('1', 'true'), precision),
+                "count": len(data),
+            }
+        else:
+            body = {"data": data}
+
+        return compress_response(jsonify({
+            **body,
             "limit": limit,
-            "pages": (total + limit - 1) // limit
-        }), 200
+            "step": step,
+            "tier": tier or "raw",
+            "next_cursor": next_cursor
+        }))
+    except ValueError as e:
+        return jsonify({"error": f"Paramètre invalide: {e}"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+EXPORT_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+DEFAULT_EXPORT_FIELDS = ["timestamp", "server_id", "ip"] + ROLLUP_FIELDS
+
+
+def export_json(cursor, server_id):
+    """Même forme que l'ancienne réponse, mais produite document par document"""
+    yield '{"server_id": ' + dumps(server_id) + ', "data": ['
+    count = 0
+    for doc in cursor:
+        yield (',' if count else '') + dumps(doc)
+        count += 1
+    yield '], "count": ' + str(count) + '}'
+
+
+def export_ndjson(cursor):
+    for doc in cursor:
+        yield dumps(doc) + '\n'
+
+
+def export_csv(cursor, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(fields)
+    for doc in cursor:
+        writer.writerow([
+            json_default(doc.get(f)) if isinstance(doc.get(f), (datetime, ObjectId)) else doc.get(f)
+            for f in fields
+        ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate(0)
+
+    # En-tête seul si aucune mesure
+    if buffer.getvalue():
+        yield buffer.getvalue()
+
+
 @metrics_bp.get('/<server_id>/history/all')
 @jwt_required()
 def get_all_metrics_history(server_id):
-    """Récupérer TOUTES les métriques d'un serveur sans limite"""
+    """
+    Exporter TOUTES les métriques d'un serveur, en flux.
+
+    Paramètres : format (json, ndjson, csv), fields, from/to (ISO 8601),
+    order (asc/desc) et batch_size (taille des lots lus depuis MongoDB).
+    La mémoire utilisée ne dépend pas du nombre de mesures exportées.
+    """
     try:
-        print(f"Récupération de TOUTES les métriques pour {server_id}")
+        export_format = request.args.get('format', 'json')
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"format inconnu: {export_format}")
 
-        # Renommer la variable locale pour éviter le conflit
-        all_metrics = list(metrics.find(
-            {"server_id": server_id},
-            sort=[("timestamp", -1)]
-        ))
+        fields = parse_fields(request.args.get('fields'))
+        start = parse_datetime(request.args.get('from'))
+        end = parse_datetime(request.args.get('to'))
+        descending = request.args.get('order', 'desc') != 'asc'
+        batch_size = max(1, min(int(request.args.get('batch_size', 1000)), 10000))
 
-        print(f"Trouvé {len(all_metrics)} métriques pour {server_id}")
+        query = {"server_id": server_id}
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = start
+            if end:
+                query["timestamp"]["$lt"] = end
 
-        # Convertir ObjectId en string pour la sérialisation JSON
-        for metric in all_metrics:
-            metric['_id'] = str(metric['_id'])
+        projection = None
+        if fields:
+            projection = {"_id": 0, **{f: 1 for f in fields}}
+        elif export_format == "csv":
+            fields = DEFAULT_EXPORT_FIELDS
 
-        return jsonify({
-            "server_id": server_id,
-            "count": len(all_metrics),
-            "data": all_metrics
-        }), 200
+        cursor = metrics.find(
+            query,
+            projection,
+            sort=[("timestamp", -1 if descending else 1)],
+            batch_size=batch_size
+        )
+
+        if export_format == "csv":
+            body = export_csv(cursor, fields)
+        elif export_format == "ndjson":
+            body = export_ndjson(cursor)
+        else:
+            body = export_json(cursor, server_id)
+
+        headers = {}
+        if export_format != "json":
+            filename = f"metrics_{server_id}.{export_format}"
+            headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+
+        return Response(
+            stream_with_context(body),
+            mimetype=EXPORT_FORMATS[export_format],
+            headers=headers
+        )
 
+    except ValueError as e:
+        return jsonify({"error": f"Paramètre invalide: {e}"}), 400
     except Exception as e:
         print(f"Erreur get_all_metrics_history: {e}")
         import traceback
@@ -123,6 +529,8 @@ def delete_metrics(server_id):
     """Supprimer toutes les métriques d'un serveur"""
     try:
         result = metrics.delete_many({"server_id": server_id})
+        latest_cache.evict(server_id)
+        live_broker.forget_server(server_id)
         return jsonify({
             "message": f"{result.deleted_count} métriques supprimées"
         }), 200
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from models.target import Target
 from db import metrics
+from services.latest_cache import latest_cache
 
 targets_bp = Blueprint('targets', __name__)
 
@@ -10,11 +11,8 @@ targets_bp = Blueprint('targets', __name__)
 def get_targets():
     """Récupérer toutes les cibles"""
     try:
-        all_targets = Target.find_all()
-
-        # Convertir ObjectId en string
-        for t in all_targets:
-            t['_id'] = str(t['_id'])
+        # Le dashboard identifie les cibles par IP, _id n'est pas renvoyé
+        all_targets = Target.find_all({"_id": 0})
 
         return jsonify(all_targets), 200
     except Exception as e:
@@ -38,10 +36,11 @@ def add_target():
             ip=data['ip'],
             alias=data.get('alias'),
             port=data.get('port', 22),
-            enabled=data.get('enabled', True)
+            enabled=data.get('enabled', True),
+            poll_interval=data.get('poll_interval'),
+            alert_poll_interval=data.get('alert_poll_interval')
         )
 
-        target['_id'] = str(target['_id'])
         return jsonify(target), 201
 
     except Exception as e:
@@ -80,6 +79,7 @@ def delete_target(ip):
 
         # Supprimer les métriques associées
         metrics.delete_many({"server_id": ip})
+        latest_cache.evict(ip)
 
         return jsonify({"message": "Cible et métriques supprimées"}), 200
 
@@ -0,0 +1,61 @@
+"""
+Format colonnes des séries de mesures (?format=columnar).
+
+Au lieu d'une liste d'objets où chaque nom de champ est répété à chaque
+point, la réponse contient des tableaux parallèles :
+
+    {"timestamps": [1718000000000, ...],          # epoch en millisecondes
+     "series": {"cpu_usage": [12.5, ...], ...},   # une valeur par timestamp
+     "delta": ["timestamps"]}
+
+Avec le codage différentiel (?delta=1), le premier élément des tableaux
+listés dans "delta" est absolu et les suivants sont des écarts au précédent :
+les timestamps d'un historique régulier deviennent une suite de petits
+entiers identiques. Seules les séries entières (compteurs) sont codées ainsi,
+les séries flottantes restent absolues. Pour les paliers agrégés (1m, 1h,
+1d) lus sans step, la valeur retenue est la moyenne de l'intervalle.
+"""
+
+from datetime import datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def epoch_ms(value):
+    """Datetime UTC naïf (format stocké) en millisecondes depuis l'epoch"""
+    return (value - EPOCH) // timedelta(milliseconds=1)
+
+
+def delta_encode(values):
+    return values[:1] + [b - a for a, b in zip(values, values[1:])]
+
+
+def is_integer_series(values):
+    return bool(values) and all(type(v) is int for v in values)
+
+
+def to_columnar(docs, fields, delta=False, precision=None):
+    """Convertir des mesures (avec timestamp) en tableaux parallèles"""
+    timestamps = [epoch_ms(doc["timestamp"]) for doc in docs]
+
+    series = {}
+    for field in fields:
+        values = [doc.get(field) for doc in docs]
+        # Paliers agrégés lus sans step : {avg, min, max, ...} par champ
+        values = [v.get("avg") if isinstance(v, dict) else v for v in values]
+        if all(v is None for v in values):
+            continue  # Champ absent de toutes les mesures
+        if precision is not None:
+            values = [round(v, precision) if isinstance(v, float) else v for v in values]
+        series[field] = values
+
+    encoded = []
+    if delta:
+        timestamps = delta_encode(timestamps)
+        encoded.append("timestamps")
+        for field, values in series.items():
+            if is_integer_series(values):
+                series[field] = delta_encode(values)
+                encoded.append(field)
+
+    return {"timestamps": timestamps, "series": series, "delta": encoded}
@@ -0,0 +1,34 @@
+"""
+Compression des réponses volumineuses selon l'en-tête Accept-Encoding du
+client : Brotli si le module est installé et accepté, sinon gzip. Les
+réponses de moins de COMPRESS_MIN_BYTES octets sont renvoyées telles quelles.
+"""
+
+import gzip
+from flask import request
+from config import Config
+
+try:
+    import brotli
+except ImportError:  # gzip seul si le module Brotli n'est pas installé
+    brotli = None
+
+
+def compress_response(response):
+    """Compresser le corps d'une réponse JSON déjà construite"""
+    if response.direct_passthrough or response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < Config.COMPRESS_MIN_BYTES:
+        return response
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        response.set_data(brotli.compress(body, quality=Config.COMPRESS_BROTLI_QUALITY))
+        response.headers["Content-Encoding"] = "br"
+    elif accepted["gzip"]:
+        response.set_data(gzip.compress(body, compresslevel=Config.COMPRESS_GZIP_LEVEL))
+        response.headers["Content-Encoding"] = "gzip"
+    return response
@@ -0,0 +1,94 @@
+"""
+Construction des requêtes d'historique agrégé (intervalles fixes de `step`
+secondes). Fonctions pures, sans accès à MongoDB.
+
+Les intervalles sont calculés par $dateTrunc, dont la grille part de la date
+de référence 2000-01-01T00:00:00Z : les bornes de $densify sont alignées sur
+cette même grille pour que les intervalles vides générés tombent exactement
+sur les intervalles existants.
+"""
+
+from datetime import datetime, timedelta
+
+# Date de référence de $dateTrunc (binSize en secondes)
+BIN_REFERENCE = datetime(2000, 1, 1)
+
+
+def align_to_step(value, step):
+    """Début de l'intervalle de `step` secondes contenant `value`"""
+    offset = (value - BIN_REFERENCE) // timedelta(seconds=step)
+    return BIN_REFERENCE + offset * timedelta(seconds=step)
+
+
+def fill_bounds(time_range, step, now=None):
+    """
+    Bornes de $densify pour la plage réellement interrogée (curseur compris) :
+    début aligné sur la grille des intervalles, fin exclue (date courante si
+    la plage n'est pas bornée).
+    """
+    lower = time_range.get("$gte") or time_range.get("$gt")
+    upper = time_range.get("$lt") or now or datetime.utcnow()
+    return [align_to_step(lower, step), upper]
+
+
+def bucket_pipeline(query, step, fields, from_tier, descending, limit, fill_bounds=None):
+    """Agréger les mesures en intervalles fixes de `step` secondes"""
+    group = {
+        "_id": {"$dateTrunc": {"date": "$timestamp", "unit": "second", "binSize": step}},
+        "count": {"$sum": "$count" if from_tier else 1},
+    }
+    project = {"_id": 0, "timestamp": "$_id", "count": 1}
+
+    for field in fields:
+        if from_tier:
+            # Moyenne pondérée par le nombre de mesures de chaque intervalle du palier
+            group[f"{field}__sum"] = {"$sum": {"$multiply": [f"${field}.avg", f"${field}.count"]}}
+            group[f"{field}__n"] = {"$sum": f"${field}.count"}
+            project[field] = {"$cond": [
+                {"$gt": [f"${field}__n", 0]},
+                {"$divide": [f"${field}__sum", f"${field}__n"]},
+                None
+            ]}
+        else:
+            group[field] = {"$avg": f"${field}"}
+            project[field] = 1
+
+    pipeline = [{"$match": query}, {"$group": group}, {"$project": project}]
+
+    if fill_bounds is not None:
+        # Intervalles vides matérialisés (valeurs nulles) pour un axe de temps régulier
+        pipeline.append({"$densify": {
+            "field": "timestamp",
+            "range": {"step": step, "unit": "second", "bounds": fill_bounds}
+        }})
+
+    pipeline.append({"$sort": {"timestamp": -1 if descending else 1}})
+    pipeline.append({"$limit": limit})
+    return pipeline
+
+
+def split_at_watermark(time_range, watermark, step=None):
+    """
+    Partager une plage au watermark d'un palier agrégé : avant, intervalles
+    déjà calculés (palier) ; après, mesures pas encore agrégées (brutes).
+    Avec step, la coupure est ramenée sur la grille des intervalles pour
+    qu'aucun intervalle ne soit lu des deux côtés.
+    Retourne (plage du palier, plage brute), None pour une partie vide.
+    """
+    if watermark is None:
+        return None, dict(time_range)
+    if step:
+        watermark = align_to_step(watermark, step)
+
+    lower = time_range.get("$gte") or time_range.get("$gt")
+    upper = time_range.get("$lt")
+    if upper is not None and upper <= watermark:
+        return dict(time_range), None
+    if lower is not None and lower >= watermark:
+        return None, dict(time_range)
+
+    before = {key: value for key, value in time_range.items() if key != "$lt"}
+    before["$lt"] = watermark
+    after = {key: value for key, value in time_range.items() if key not in ("$gte", "$gt")}
+    after["$gte"] = watermark
+    return before, after
@@ -0,0 +1,258 @@
+"""
+Gestion des index MongoDB.
+
+Les index sont déclarés ici à partir des requêtes réellement exécutées par les
+routes, puis réconciliés au démarrage : création des index manquants,
+recréation de ceux dont la définition a changé et suppression des index
+obsolètes. Un contrôle par explain() vérifie qu'aucune requête enregistrée
+ne fait de COLLSCAN.
+
+Usage :
+    python -m services.indexes           # réconcilier les index
+    python -m services.indexes --check   # réconcilier puis vérifier les plans
+"""
+
+import sys
+from datetime import datetime, timezone
+from pymongo import ASCENDING, DESCENDING
+from config import Config
+from db import db, metrics_collection, METRICS_TIMESERIES
+from services.rollup import TIERS
+
+METRICS = metrics_collection.name
+
+
+def _ttl(days):
+    """Index TTL sur timestamp (aucun si la rétention est illimitée)"""
+    if not days:
+        return []
+    return [([("timestamp", ASCENDING)], {"expireAfterSeconds": days * 86400})]
+
+
+def _timestamp_index(days):
+    """
+    Parcours par plage de dates tous serveurs confondus (agrégation, purge) :
+    l'index TTL sert aussi à ces requêtes, sinon un index simple sur timestamp
+    """
+    return _ttl(days) or [([("timestamp", ASCENDING)], {})]
+
+
+def _rollup_indexes():
+    return {
+        f"metrics_{name}": [
+            ([("server_id", ASCENDING), ("timestamp", DESCENDING)], {"unique": True}),
+        ] + _timestamp_index(retention_days)
+        for name, _seconds, _unit, retention_days in TIERS
+    }
+
+
+def _rollup_queries():
+    """Lectures du service d'agrégation : plage de dates tous serveurs, plus ancienne mesure"""
+    since = {"$gte": datetime(1970, 1, 1), "$lt": datetime(1970, 1, 2)}
+    sources = [METRICS] + [f"metrics_{name}" for name, _seconds, _unit, _retention in TIERS[:-1]]
+    return [
+        query
+        for source in sources
+        for query in (
+            (f"rollup.range.{source}", source, {"timestamp": since}, None),
+            (f"rollup.first.{source}", source, {}, [("timestamp", ASCENDING)]),
+        )
+    ]
+
+
+# Index attendus par collection : (clés, options)
+INDEXES = {
+    "users": [
+        ([("username", ASCENDING)], {"unique": True}),
+        ([("email", ASCENDING)], {"unique": True}),
+    ],
+    "targets": [
+        ([("ip", ASCENDING)], {"unique": True}),
+        ([("enabled", ASCENDING)], {}),
+    ],
+    # /latest, /history, /history/all, count_documents et suppression par serveur.
+    # En time-series, MongoDB crée lui-même l'index (meta, time) ascendant :
+    # il est conservé, et parcouru à l'envers pour les tris décroissants.
+    # La rétention d'une collection time-series est une option de collection (voir db.py) :
+    # l'index sur timestamp n'y porte pas de TTL
+    METRICS: [
+        ([("server_id", ASCENDING), ("timestamp", ASCENDING if METRICS_TIMESERIES else DESCENDING)], {}),
+    ] + _timestamp_index(0 if METRICS_TIMESERIES else Config.RETENTION_RAW_DAYS),
+    **_rollup_indexes(),
+    "alerts": [
+        # /active
+        ([("status", ASCENDING), ("created_at", DESCENDING)], {}),
+        # /history
+        ([("created_at", DESCENDING)], {}),
+        # une seule alerte active par (serveur, type) : cible des upserts de create_alert / batch
+        ([("server_id", ASCENDING), ("type", ASCENDING), ("status", ASCENDING)], {
+            "unique": True,
+            "partialFilterExpression": {"status": "active"}
+        }),
+    ],
+    "alert_rules": [
+        ([("server_id", ASCENDING)], {"unique": True}),
+        # synchronisation incrémentale du cache des règles du collector
+        ([("updated_at", ASCENDING)], {}),
+    ],
+    # Instances du collector : instances actives (heartbeat récent), purge des instances disparues
+    "collectors": [
+        ([("heartbeat_at", ASCENDING)], {"expireAfterSeconds": 86400}),
+    ],
+    # Anciennes collections, plus interrogées par les routes
+    "alerts_history": [],
+    "alerts_config": [],
+}
+
+# Requêtes des routes, vérifiées par explain() : (nom, collection, filtre, tri)
+QUERIES = [
+    ("metrics.latest", METRICS, {"server_id": "0.0.0.0"}, [("timestamp", DESCENDING)]),
+    ("metrics.count", METRICS, {"server_id": "0.0.0.0"}, None),
+    ("alerts.active", "alerts", {"status": "active"}, [("created_at", DESCENDING)]),
+    ("alerts.history", "alerts", {}, [("created_at", DESCENDING)]),
+    ("alerts.upsert", "alerts", {"server_id": "0.0.0.0", "type": "cpu", "status": "active"}, None),
+    ("alert_rules.by_server", "alert_rules", {"server_id": "0.0.0.0"}, None),
+    ("alert_rules.since", "alert_rules", {"updated_at": {"$gte": datetime(1970, 1, 1, tzinfo=timezone.utc)}}, None),
+    ("targets.by_ip", "targets", {"ip": "0.0.0.0"}, None),
+    ("users.by_username", "users", {"username": ""}, None),
+    ("users.by_email", "users", {"email": ""}, None),
+] + _rollup_queries()
+
+# Options comparées pour savoir si un index existant doit être recréé
+COMPARED_OPTIONS = ("unique", "sparse", "partialFilterExpression", "expireAfterSeconds")
+
+
+def index_name(keys):
+    """Nom par défaut généré par MongoDB (ex: server_id_1_timestamp_-1)"""
+    return "_".join(f"{field}_{direction}" for field, direction in keys)
+
+
+def _same_definition(existing, keys, options):
+    if [tuple(k) for k in existing["key"]] != [tuple(k) for k in keys]:
+        return False
+    return all(existing.get(opt) == options.get(opt) for opt in COMPARED_OPTIONS)
+
+
+def sync_collection_indexes(collection, declared):
+    """Aligner les index d'une collection sur leur déclaration"""
+    existing = collection.index_information()
+    wanted = {index_name(keys): (keys, options) for keys, options in declared}
+    created, dropped = [], []
+
+    for name, info in existing.items():
+        if name == "_id_":
+            continue
+        if name not in wanted or not _same_definition(info, *wanted[name]):
+            collection.drop_index(name)
+            dropped.append(name)
+
+    existing = collection.index_information()
+    for name, (keys, options) in wanted.items():
+        if name not in existing:
+            collection.create_index(keys, name=name, **options)
+            created.append(name)
+
+    return created, dropped
+
+
+def supersede_duplicate_active_alerts(database):
+    """
+    Avant l'index unique partiel : ne garder que l'alerte active la plus
+    récente par (serveur, type), les autres passent au statut "superseded".
+    """
+    pipeline = [
+        {"$match": {"status": "active"}},
+        {"$sort": {"created_at": -1}},
+        {"$group": {"_id": {"server_id": "$server_id", "type": "$type"}, "ids": {"$push": "$_id"}}},
+        {"$match": {"ids.1": {"$exists": True}}},
+    ]
+    superseded = 0
+    for group in database["alerts"].aggregate(pipeline, allowDiskUse=True):
+        result = database["alerts"].update_many(
+            {"_id": {"$in": group["ids"][1:]}},
+            {"$set": {"status": "superseded", "superseded_at": datetime.now(timezone.utc)}}
+        )
+        superseded += result.modified_count
+    if superseded:
+        print(f"{superseded} alerte(s) active(s) en double marquée(s) 'superseded'")
+
+
+# Mises en conformité des données nécessaires avant la création des index
+PREPARE = {
+    "alerts": supersede_duplicate_active_alerts,
+}
+
+
+def sync_indexes(database=db):
+    """Réconcilier les index de toutes les collections déclarées"""
+    existing_collections = set(database.list_collection_names())
+
+    for name, declared in INDEXES.items():
+        # Ne pas créer de collection vide juste pour la nettoyer
+        if not declared and name not in existing_collections:
+            continue
+
+        if name in PREPARE and name in existing_collections:
+            PREPARE[name](database)
+
+        created, dropped = sync_collection_indexes(database[name], declared)
+        for index in dropped:
+            print(f"Index supprimé: {name}.{index}")
+        for index in created:
+            print(f"Index créé: {name}.{index}")
+
+
+def _plan_stages(plan):
+    """Lister récursivement les étapes d'un plan d'exécution"""
+    stages = [plan.get("stage")]
+    for child in ("inputStage", "queryPlan"):
+        if child in plan:
+            stages.extend(_plan_stages(plan[child]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+def _winning_plan(explain):
+    """Plan retenu, y compris pour une collection time-series (explain d'agrégation)"""
+    planner = explain.get("queryPlanner")
+    if planner is None:
+        for stage in explain.get("stages", []):
+            if "$cursor" in stage:
+                planner = stage["$cursor"].get("queryPlanner")
+                break
+    return (planner or {}).get("winningPlan", {})
+
+
+def check_query_plans(database=db):
+    """
+    Vérifier par explain() que chaque requête enregistrée utilise un index.
+    Retourne la liste des requêtes en COLLSCAN (vide si tout va bien).
+    """
+    collscans = []
+
+    for name, collection_name, query, sort in QUERIES:
+        cursor = database[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+
+        stages = _plan_stages(_winning_plan(cursor.explain()))
+
+        if "COLLSCAN" in stages:
+            collscans.append(name)
+            print(f"COLLSCAN: {name} ({collection_name} {query})")
+        else:
+            print(f"OK: {name} -> {' > '.join(s for s in stages if s)}")
+
+    return collscans
+
+
+if __name__ == "__main__":
+    sync_indexes()
+
+    if "--check" in sys.argv:
+        failed = check_query_plans()
+        if failed:
+            print(f"{len(failed)} requête(s) sans index: {', '.join(failed)}")
+            sys.exit(1)
+        print("Toutes les requêtes enregistrées utilisent un index")
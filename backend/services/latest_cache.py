@@ -0,0 +1,82 @@
+"""
+Cache en mémoire de la dernière mesure de chaque serveur.
+
+Chargé une seule fois au premier accès : une requête find_one par serveur,
+servie par l'index (server_id, timestamp), sans tri de toute la collection.
+Il est ensuite tenu à jour par chaque ingestion (add_metric,
+add_metrics_batch) et, avec plusieurs workers, par le change stream des
+mesures (LIVE_SOURCE=changestream) : les lectures "latest" du dashboard ne
+font plus aucune requête MongoDB.
+"""
+
+import hashlib
+import threading
+from db import metrics
+
+
+class LatestMetricsCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._latest = {}
+        self._loaded = False
+        self._etag = None
+
+    def _load(self):
+        """Charger la dernière mesure de chaque serveur depuis MongoDB"""
+        latest = {}
+        for server_id in metrics.distinct("server_id"):
+            doc = metrics.find_one({"server_id": server_id}, sort=[("timestamp", -1)])
+            if doc is not None:
+                latest[server_id] = doc
+
+        with self._lock:
+            # Garder une mesure ingérée pendant le chargement si elle est plus récente
+            for server_id, doc in self._latest.items():
+                current = latest.get(server_id)
+                if current is None or doc["timestamp"] > current["timestamp"]:
+                    latest[server_id] = doc
+            self._latest = latest
+            self._etag = None
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        # Un seul chargement, même si plusieurs requêtes arrivent en même temps
+        with self._load_lock:
+            if not self._loaded:
+                self._load()
+                self._loaded = True
+
+    def update(self, doc):
+        """Enregistrer une mesure qui vient d'être ingérée"""
+        with self._lock:
+            current = self._latest.get(doc["server_id"])
+            if current is None or doc["timestamp"] >= current["timestamp"]:
+                self._latest[doc["server_id"]] = doc
+                self._etag = None
+
+    def evict(self, server_id):
+        """Oublier un serveur (métriques ou cible supprimées)"""
+        with self._lock:
+            if self._latest.pop(server_id, None) is not None:
+                self._etag = None
+
+    def get(self, server_id):
+        self._ensure_loaded()
+        with self._lock:
+            return self._latest.get(server_id)
+
+    def get_all(self):
+        """Retourner (dernières mesures par serveur, ETag)"""
+        self._ensure_loaded()
+        with self._lock:
+            if self._etag is None:
+                signature = "|".join(
+                    f"{server_id}:{doc['_id']}" for server_id, doc in sorted(self._latest.items())
+                )
+                self._etag = hashlib.md5(signature.encode()).hexdigest()
+            return dict(self._latest), self._etag
+
+
+latest_cache = LatestMetricsCache()
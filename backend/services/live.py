@@ -0,0 +1,152 @@
+"""
+Diffusion en direct des mesures et des alertes (Server-Sent Events).
+
+Les événements sont publiés depuis le chemin d'ingestion (add_metric,
+add_metrics_batch) et la création d'alertes. Pour les mesures, seuls les
+champs qui ont changé depuis la mesure précédente du même serveur sont
+envoyés. Chaque client a sa propre file bornée et son filtre de serveurs :
+un client trop lent voit sa file vidée et reçoit un événement "resync"
+l'invitant à recharger l'état complet.
+
+Avec plusieurs workers, LIVE_SOURCE=changestream alimente chaque processus
+depuis un change stream MongoDB au lieu de la publication locale.
+"""
+
+import queue
+import threading
+from config import Config
+
+# Champs toujours présents dans un delta de mesure
+DELTA_KEYS = ("server_id", "timestamp")
+
+
+class Subscriber:
+    def __init__(self, servers=None, max_queue=None):
+        self.servers = set(servers) if servers else None
+        self.queue = queue.Queue(maxsize=max_queue or Config.LIVE_QUEUE_SIZE)
+        self.dropped = 0
+
+    def wants(self, server_id):
+        return self.servers is None or server_id in self.servers
+
+    def push(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            # Client trop lent : on vide sa file et on lui demande de se resynchroniser
+            self.dropped += 1
+            while True:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            self.queue.put_nowait(("resync", {"reason": "backpressure"}))
+
+
+class LiveBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._last_metrics = {}
+
+    def subscribe(self, servers=None, limit=None):
+        """Nouvel abonné, None si `limit` abonnés sont déjà connectés"""
+        subscriber = Subscriber(servers)
+        with self._lock:
+            if limit and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def _subscribers_for(self, server_id):
+        """Copie des abonnés concernés, prise sous le verrou (abonnements concurrents)"""
+        with self._lock:
+            return [s for s in self._subscribers if s.wants(server_id)]
+
+    @staticmethod
+    def _dispatch(subscribers, event, payload):
+        for subscriber in subscribers:
+            subscriber.push((event, payload))
+
+    @staticmethod
+    def _metric_delta(metric, previous):
+        """Champs modifiés depuis la dernière mesure publiée pour ce serveur"""
+        if previous is None:
+            return {k: v for k, v in metric.items() if k != "_id"}
+
+        delta = {k: metric[k] for k in DELTA_KEYS if k in metric}
+        for key, value in metric.items():
+            if key != "_id" and previous.get(key) != value:
+                delta[key] = value
+        return delta
+
+    def publish_metric(self, metric):
+        server_id = metric["server_id"]
+        with self._lock:
+            previous = self._last_metrics.get(server_id)
+            # Référence gardée même sans abonné pour que le prochain delta reste juste
+            self._last_metrics[server_id] = metric
+            subscribers = [s for s in self._subscribers if s.wants(server_id)]
+        if subscribers:
+            self._dispatch(subscribers, "metric", self._metric_delta(metric, previous))
+
+    def publish_alert(self, alert):
+        self._dispatch(self._subscribers_for(alert.get("server_id")), "alert", alert)
+
+    def forget_server(self, server_id):
+        with self._lock:
+            self._last_metrics.pop(server_id, None)
+
+
+live_broker = LiveBroker()
+
+
+def _watch(collection, publish, operations=("insert",)):
+    """Relayer les modifications d'une collection (change stream) vers le broker"""
+    while True:
+        try:
+            pipeline = [{"$match": {"operationType": {"$in": list(operations)}}}]
+            # Mises à jour : document complet relu après modification
+            full_document = "updateLookup" if "update" in operations else None
+            with collection.watch(pipeline, full_document=full_document) as stream:
+                for change in stream:
+                    if change.get("fullDocument") is not None:
+                        publish(change["fullDocument"])
+        except Exception as e:
+            print(f"Erreur change stream {collection.name}: {e}")
+            threading.Event().wait(5)
+
+
+def start_change_stream_source():
+    """LIVE_SOURCE=changestream : alimenter le broker depuis MongoDB"""
+    from db import db, metrics
+    from services.latest_cache import latest_cache
+
+    def publish_metric(metric):
+        # Mesures reçues par les autres workers : cache "latest" de ce processus à jour
+        latest_cache.update(metric)
+        live_broker.publish_metric(metric)
+
+    # Alertes : créations, mais aussi mises à jour, résolutions et acquittements
+    for collection, publish, operations in (
+        (metrics, publish_metric, ("insert",)),
+        (db["alerts"], live_broker.publish_alert, ("insert", "update", "replace")),
+    ):
+        thread = threading.Thread(
+            target=_watch, args=(collection, publish, operations),
+            name=f"live-{collection.name}", daemon=True
+        )
+        thread.start()
+
+
+def publish_local():
+    """Publier depuis le chemin d'ingestion de ce processus"""
+    return Config.LIVE_SOURCE == "local"
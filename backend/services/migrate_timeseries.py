@@ -0,0 +1,102 @@
+"""
+Migration des métriques existantes vers la collection time-series.
+
+Copie les documents de la collection "metrics" vers METRICS_TS_COLLECTION,
+serveur par serveur et par lots. La migration peut être relancée : après
+chaque lot entièrement écrit, la date de sa dernière mesure est enregistrée
+comme point de reprise (collection MIGRATION_COLLECTION). Un lot interrompu
+peut avoir été écrit en partie, et dans le désordre (insert_many non
+ordonné) : la reprise relit donc à partir du point de reprise inclus et
+ignore les _id déjà présents dans la collection time-series, qui
+n'impose pas l'unicité des _id.
+
+Usage :
+    python -m services.migrate_timeseries [--batch-size 5000] [--drop-source]
+
+Puis démarrer le backend avec METRICS_STORAGE=timeseries.
+"""
+
+import argparse
+from db import db, ensure_metrics_timeseries
+
+SOURCE_COLLECTION = "metrics"
+MIGRATION_COLLECTION = "metrics_ts_migration"
+
+
+def migrate_server(source, target, checkpoints, server_id, batch_size):
+    """Copier les mesures d'un serveur qui ne sont pas encore migrées"""
+    query = {"server_id": server_id}
+
+    checkpoint = checkpoints.find_one({"_id": server_id})
+    if checkpoint:
+        query["timestamp"] = {"$gte": checkpoint["timestamp"]}
+
+    # Mesures écrites après le dernier lot complet (lot interrompu) : au plus un lot
+    already_copied = {doc["_id"] for doc in target.find(query, {"_id": 1})}
+
+    cursor = source.find(query, sort=[("timestamp", 1), ("_id", 1)], batch_size=batch_size)
+
+    copied = 0
+    batch = []
+
+    def write(batch):
+        target.insert_many(batch, ordered=False)
+        # Lot entièrement écrit : nouveau point de reprise
+        checkpoints.update_one(
+            {"_id": server_id},
+            {"$set": {"timestamp": batch[-1]["timestamp"]}},
+            upsert=True
+        )
+        return len(batch)
+
+    for doc in cursor:
+        if doc["_id"] in already_copied:
+            continue
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            copied += write(batch)
+            batch = []
+
+    if batch:
+        copied += write(batch)
+
+    return copied
+
+
+def migrate(batch_size=5000, drop_source=False):
+    source = db[SOURCE_COLLECTION]
+    target = ensure_metrics_timeseries()
+
+    if source.name == target.name:
+        raise SystemExit("Erreur: la collection source et la collection time-series sont identiques")
+
+    checkpoints = db[MIGRATION_COLLECTION]
+    total = 0
+    for server_id in source.distinct("server_id"):
+        copied = migrate_server(source, target, checkpoints, server_id, batch_size)
+        total += copied
+        print(f"{server_id}: {copied} mesure(s) migrée(s)")
+
+    print(f"Migration terminée: {total} mesure(s) copiée(s) vers {target.name}")
+
+    if drop_source:
+        source_count = source.count_documents({})
+        target_count = target.count_documents({})
+        if target_count < source_count:
+            raise SystemExit(
+                f"Erreur: {target_count} mesures en time-series pour {source_count} en source, "
+                "collection source conservée"
+            )
+        source.drop()
+        checkpoints.drop()
+        print(f"Collection {SOURCE_COLLECTION} supprimée")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrer les métriques vers une collection time-series")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--drop-source", action="store_true",
+                        help="Supprimer la collection source après vérification des volumes")
+    args = parser.parse_args()
+
+    migrate(batch_size=args.batch_size, drop_source=args.drop_source)
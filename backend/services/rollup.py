@@ -0,0 +1,349 @@
+"""
+Agrégation des métriques brutes en paliers 1 minute, 1 heure et 1 jour.
+
+Chaque palier stocke, par serveur et par intervalle, le nombre de mesures et
+min/max/avg/p95 de chaque métrique. Le palier 1m est calculé depuis les
+mesures brutes, 1h depuis 1m et 1d depuis 1h (le p95 des paliers supérieurs
+est donc approché à partir des p95 du palier inférieur). Chaque palier a sa
+propre rétention via un index TTL.
+
+Chaque palier avance jusqu'à son watermark (début du premier intervalle non
+calculé) ; les lectures au-delà sont servies depuis les mesures brutes. Les
+mesures reçues en retard (date de collecte antérieure à now - ROLLUP_LAG_SECONDS)
+sont signalées à l'ingestion dans rollup_late : les intervalles qu'elles
+touchent sont recalculés, serveur par serveur, à la passe suivante.
+
+Usage :
+    python -m services.rollup          # boucle continue
+    python -m services.rollup --once   # une seule passe
+"""
+
+import sys
+import time
+import threading
+from datetime import datetime, timedelta
+from pymongo import UpdateOne, DeleteOne
+from config import Config
+from db import db, metrics_collection
+
+# Métriques numériques agrégées (les champs imbriqués, par cœur, disque ou
+# point de montage, ne sont conservés que dans les mesures brutes)
+ROLLUP_FIELDS = [
+    "cpu_usage", "memory_usage", "disk_usage", "cpu_temperature",
+    "network_rx", "network_tx", "network_rx_rate", "network_tx_rate",
+    "load_1", "load_5", "load_15", "swap_usage",
+    "disk_read_iops", "disk_write_iops", "disk_read_bps", "disk_write_bps",
+    "psi_cpu_some", "psi_memory_some", "psi_memory_full", "psi_io_some", "psi_io_full",
+]
+
+# Paliers du plus fin au plus grossier : (nom, durée en secondes, unité $dateTrunc, rétention en jours)
+TIERS = [
+    ("1m", 60, "minute", Config.ROLLUP_RETENTION_1M_DAYS),
+    ("1h", 3600, "hour", Config.ROLLUP_RETENTION_1H_DAYS),
+    ("1d", 86400, "day", Config.ROLLUP_RETENTION_1D_DAYS),
+]
+
+rollup_state_collection = db["rollup_state"]
+# Intervalles 1m touchés par des mesures tardives, à recalculer : _id = {server_id, timestamp}
+rollup_late_collection = db["rollup_late"]
+
+
+def tier_collection(name):
+    return db[f"metrics_{name}"]
+
+
+def percentile(values, q):
+    """Percentile par interpolation linéaire (q entre 0 et 100)"""
+    values = sorted(values)
+    if not values:
+        return None
+    rank = (len(values) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def truncate(dt, seconds):
+    """Début de l'intervalle de `seconds` secondes contenant dt"""
+    epoch = int(dt.timestamp()) if dt.tzinfo else int((dt - datetime(1970, 1, 1)).total_seconds())
+    return datetime(1970, 1, 1) + timedelta(seconds=epoch - epoch % seconds)
+
+
+def _range_match(start, end, server_id=None):
+    """Plage d'intervalles, tous serveurs (index timestamp) ou un seul (index server_id, timestamp)"""
+    match = {"timestamp": {"$gte": start, "$lt": end}}
+    if server_id is not None:
+        match["server_id"] = server_id
+    return match
+
+
+def _raw_pipeline(match, unit, fields=ROLLUP_FIELDS):
+    """Regrouper les mesures brutes : valeurs poussées pour calculer le p95"""
+    group = {
+        "_id": {
+            "server_id": "$server_id",
+            "timestamp": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}
+        },
+        "count": {"$sum": 1},
+    }
+    for field in fields:
+        group[field] = {"$push": f"${field}"}
+
+    return [
+        {"$match": match},
+        {"$group": group},
+    ]
+
+
+def _tier_pipeline(match, unit):
+    """Regrouper les intervalles d'un palier inférieur (moyenne pondérée par count)"""
+    group = {
+        "_id": {
+            "server_id": "$server_id",
+            "timestamp": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}
+        },
+        "count": {"$sum": "$count"},
+    }
+    for field in ROLLUP_FIELDS:
+        group[f"{field}__min"] = {"$min": f"${field}.min"}
+        group[f"{field}__max"] = {"$max": f"${field}.max"}
+        group[f"{field}__sum"] = {"$sum": {"$multiply": [f"${field}.avg", f"${field}.count"]}}
+        group[f"{field}__count"] = {"$sum": f"${field}.count"}
+        group[f"{field}__p95"] = {"$push": f"${field}.p95"}
+
+    return [
+        {"$match": match},
+        {"$group": group},
+    ]
+
+
+def _stats_from_raw(values):
+    values = [v for v in values if isinstance(v, (int, float))]
+    if not values:
+        return None
+    return {
+        "min": min(values),
+        "max": max(values),
+        "avg": sum(values) / len(values),
+        "p95": percentile(values, 95),
+        "count": len(values)
+    }
+
+
+def _stats_from_tier(group, field):
+    count = group.get(f"{field}__count") or 0
+    if not count:
+        return None
+    p95s = [v for v in group.get(f"{field}__p95", []) if v is not None]
+    return {
+        "min": group[f"{field}__min"],
+        "max": group[f"{field}__max"],
+        "avg": group[f"{field}__sum"] / count,
+        "p95": percentile(p95s, 95),
+        "count": count
+    }
+
+
+def _tier_document(group, from_raw, fields=ROLLUP_FIELDS):
+    doc = {
+        "server_id": group["_id"]["server_id"],
+        "timestamp": group["_id"]["timestamp"],
+        "count": group["count"],
+    }
+    for field in fields:
+        doc[field] = _stats_from_raw(group[field]) if from_raw else _stats_from_tier(group, field)
+    return doc
+
+
+def rollup_range(tier_index, start, end, server_id=None):
+    """Calculer les intervalles d'un palier entre start (inclus) et end (exclu)"""
+    name, _seconds, unit, _retention = TIERS[tier_index]
+    match = _range_match(start, end, server_id)
+
+    if tier_index == 0:
+        source = metrics_collection
+        pipeline = _raw_pipeline(match, unit)
+    else:
+        source = tier_collection(TIERS[tier_index - 1][0])
+        pipeline = _tier_pipeline(match, unit)
+
+    operations = []
+    for group in source.aggregate(pipeline, allowDiskUse=True):
+        doc = _tier_document(group, tier_index == 0)
+        operations.append(UpdateOne(
+            {"server_id": doc["server_id"], "timestamp": doc["timestamp"]},
+            {"$set": doc},
+            upsert=True
+        ))
+
+    if operations:
+        tier_collection(name).bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+def _first_source_timestamp(tier_index):
+    source = metrics_collection if tier_index == 0 else tier_collection(TIERS[tier_index - 1][0])
+    first = source.find_one({}, sort=[("timestamp", 1)], projection={"timestamp": 1})
+    return first["timestamp"] if first else None
+
+
+def mark_late_samples(documents, now=None):
+    """
+    Ingestion : signaler les mesures arrivées après le délai ROLLUP_LAG_SECONDS,
+    dont l'intervalle a pu déjà être agrégé
+    """
+    now = now or datetime.utcnow()
+    limit = now - timedelta(seconds=Config.ROLLUP_LAG_SECONDS)
+    buckets = {
+        (doc["server_id"], truncate(doc["timestamp"], TIERS[0][1]))
+        for doc in documents if doc["timestamp"] < limit
+    }
+    if not buckets:
+        return 0
+    rollup_late_collection.bulk_write([
+        UpdateOne(
+            {"_id": {"server_id": server_id, "timestamp": bucket}},
+            {"$max": {"marked_at": now}},
+            upsert=True
+        )
+        for server_id, bucket in buckets
+    ], ordered=False)
+    return len(buckets)
+
+
+def reroll_late(watermarks):
+    """Recalculer, palier par palier, les intervalles déjà agrégés touchés par des mesures tardives"""
+    marks = list(rollup_late_collection.find({}).limit(Config.ROLLUP_MAX_BUCKETS_PER_PASS))
+    if not marks:
+        return 0
+
+    rerolled = 0
+    # Du plus fin au plus grossier : chaque palier relit le palier inférieur déjà corrigé
+    for index, (name, seconds, _unit, _retention) in enumerate(TIERS):
+        watermark = watermarks.get(name)
+        if watermark is None:
+            continue
+        buckets = {
+            (mark["_id"]["server_id"], truncate(mark["_id"]["timestamp"], seconds))
+            for mark in marks
+        }
+        for server_id, bucket in sorted(buckets, key=lambda b: b[1]):
+            # Intervalle pas encore atteint : calculé normalement par run_once
+            if bucket < watermark:
+                rollup_range(index, bucket, bucket + timedelta(seconds=seconds), server_id)
+                rerolled += 1
+
+    # Une mesure tardive arrivée pendant le recalcul a avancé marked_at : marque conservée
+    rollup_late_collection.bulk_write([
+        DeleteOne({"_id": mark["_id"], "marked_at": mark["marked_at"]}) for mark in marks
+    ], ordered=False)
+    return rerolled
+
+
+def rollup_watermarks():
+    """Début du premier intervalle non calculé de chaque palier"""
+    return {doc["_id"]: doc["watermark"] for doc in rollup_state_collection.find({}, {"watermark": 1})}
+
+
+def run_once(now=None):
+    """Faire avancer chaque palier jusqu'au dernier intervalle complet"""
+    now = now or datetime.utcnow()
+    summary = {}
+
+    for index, (name, seconds, _unit, _retention) in enumerate(TIERS):
+        state = rollup_state_collection.find_one({"_id": name})
+        start = state["watermark"] if state else _first_source_timestamp(index)
+        if start is None:
+            continue
+        start = truncate(start, seconds)
+
+        # Laisser aux mesures tardives le temps d'arriver avant de figer un intervalle
+        end = truncate(now - timedelta(seconds=Config.ROLLUP_LAG_SECONDS), seconds)
+        if end <= start:
+            continue
+
+        # Découper les longs rattrapages pour borner la taille des agrégations
+        written = 0
+        chunk = timedelta(seconds=seconds * Config.ROLLUP_MAX_BUCKETS_PER_PASS)
+        cursor = start
+        while cursor < end:
+            chunk_end = min(end, cursor + chunk)
+            written += rollup_range(index, cursor, chunk_end)
+            cursor = chunk_end
+            rollup_state_collection.update_one(
+                {"_id": name},
+                {"$set": {"watermark": cursor, "updated_at": datetime.utcnow()}},
+                upsert=True
+            )
+
+        summary[name] = written
+
+    late = reroll_late(rollup_watermarks())
+    if late:
+        summary["late"] = late
+
+    return summary
+
+
+def run_forever():
+    """Boucle continue du service d'agrégation"""
+    while True:
+        try:
+            summary = run_once()
+            if summary:
+                print(f"Rollup: {summary}")
+        except Exception as e:
+            print(f"Erreur rollup: {e}")
+        time.sleep(Config.ROLLUP_INTERVAL_SECONDS)
+
+
+def start_background_rollup():
+    """Lancer l'agrégation dans un thread du backend"""
+    thread = threading.Thread(target=run_forever, name="metrics-rollup", daemon=True)
+    thread.start()
+    return thread
+
+
+def select_tier(start, resolution, watermarks=None):
+    """
+    Choisir le palier le plus grossier compatible avec la résolution demandée
+    (en secondes), dont la rétention couvre encore `start` et, si `watermarks`
+    est fourni, déjà calculé au moins une fois.
+    Retourne None si les mesures brutes sont nécessaires.
+    """
+    now = datetime.utcnow()
+    chosen = None
+
+    for name, seconds, _unit, retention_days in TIERS:
+        if seconds > resolution:
+            break
+        if start is not None and retention_days and start < now - timedelta(days=retention_days):
+            continue
+        if watermarks is not None and name not in watermarks:
+            continue
+        chosen = name
+
+    return chosen
+
+
+def tier_documents_from_raw(name, query, fields, descending, limit):
+    """
+    Intervalles d'un palier calculés à la lecture depuis les mesures brutes,
+    pour la partie d'une plage postérieure au watermark du palier
+    """
+    unit = next(tier_unit for tier_name, _seconds, tier_unit, _retention in TIERS if tier_name == name)
+    pipeline = _raw_pipeline(query, unit, fields) + [
+        {"$sort": {"_id.timestamp": -1 if descending else 1}},
+        {"$limit": limit},
+    ]
+    return [
+        _tier_document(group, True, fields)
+        for group in metrics_collection.aggregate(pipeline, allowDiskUse=True)
+    ]
+
+
+if __name__ == "__main__":
+    if "--once" in sys.argv:
+        print(f"Rollup: {run_once()}")
+    else:
+        run_forever()
@@ -0,0 +1,50 @@
+"""
+Sérialisation JSON des réponses de l'API (orjson).
+
+OrjsonProvider remplace l'encodeur par défaut de Flask : jsonify et les
+retours de dict/list des routes passent par orjson, qui encode nativement
+les datetime (ISO 8601, les dates naïves stockées sont en UTC) et les
+flottants, sans copie des documents. Les ObjectId sont convertis en chaîne
+par json_default : les routes n'ont plus à réécrire `_id` elles-mêmes.
+dumps() sert hors de jsonify (flux, exports, SSE).
+"""
+
+from datetime import datetime
+import orjson
+from bson.objectid import ObjectId
+from flask.json.provider import JSONProvider
+
+# Dates naïves considérées UTC, suffixe "Z" comme json_default
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z
+
+
+def json_default(value):
+    """Encoder ObjectId et datetime (les dates naïves stockées sont en UTC)"""
+    if isinstance(value, datetime):
+        return value.isoformat() + ('Z' if value.tzinfo is None else '')
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def dumps_bytes(obj):
+    return orjson.dumps(obj, default=json_default, option=ORJSON_OPTIONS)
+
+
+def dumps(obj):
+    return dumps_bytes(obj).decode('utf-8')
+
+
+class OrjsonProvider(JSONProvider):
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj)
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """Comme jsonify, mais le corps est écrit directement en bytes"""
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj), mimetype=self.mimetype)
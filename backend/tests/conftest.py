@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modules du backend importés à plat (from services.history import ...), comme dans app.py
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta
+
+from services.columnar import delta_encode, epoch_ms, is_integer_series, to_columnar
+
+START = datetime(2024, 6, 1, 12, 0)
+
+
+def docs(count, **fields):
+    return [
+        {'timestamp': START + timedelta(seconds=30 * i), **{k: v[i] for k, v in fields.items()}}
+        for i in range(count)
+    ]
+
+
+def test_epoch_ms():
+    assert epoch_ms(datetime(1970, 1, 1, 0, 0, 1)) == 1000
+    assert epoch_ms(START) == 1717243200000
+
+
+def test_delta_encode():
+    assert delta_encode([]) == []
+    assert delta_encode([5]) == [5]
+    assert delta_encode([100, 130, 160, 150]) == [100, 30, 30, -10]
+
+
+def test_is_integer_series():
+    assert is_integer_series([1, 2, 3])
+    assert not is_integer_series([])
+    assert not is_integer_series([1, 2.5])
+    assert not is_integer_series([1, None])
+    # bool est un int en Python mais pas une valeur de compteur
+    assert not is_integer_series([True, False])
+
+
+def test_parallel_arrays():
+    result = to_columnar(docs(3, cpu_usage=[1.5, 2.5, 3.5], network_rx=[10, 20, 30]), ['cpu_usage', 'network_rx'])
+    assert result == {
+        'timestamps': [epoch_ms(START), epoch_ms(START) + 30000, epoch_ms(START) + 60000],
+        'series': {'cpu_usage': [1.5, 2.5, 3.5], 'network_rx': [10, 20, 30]},
+        'delta': [],
+    }
+
+
+def test_missing_values_and_absent_fields():
+    result = to_columnar(docs(2, cpu_usage=[1.0, None], disk_usage=[None, None]), ['cpu_usage', 'disk_usage', 'load_1'])
+    assert result['series'] == {'cpu_usage': [1.0, None]}
+
+
+def test_tier_documents_use_average():
+    tier_docs = docs(2, cpu_usage=[{'avg': 10.0, 'max': 20.0}, {'avg': 12.0, 'max': 30.0}])
+    assert to_columnar(tier_docs, ['cpu_usage'])['series'] == {'cpu_usage': [10.0, 12.0]}
+
+
+def test_precision_rounds_floats_only():
+    result = to_columnar(docs(2, cpu_usage=[1.23456, 2.0], network_rx=[7, 8]), ['cpu_usage', 'network_rx'], precision=2)
+    assert result['series'] == {'cpu_usage': [1.23, 2.0], 'network_rx': [7, 8]}
+
+
+def test_delta_encodes_timestamps_and_integer_series():
+    result = to_columnar(docs(3, cpu_usage=[1.5, 2.5, 3.5], network_rx=[100, 150, 175]), ['cpu_usage', 'network_rx'], delta=True)
+    assert result['timestamps'] == [epoch_ms(START), 30000, 30000]
+    assert result['series'] == {'cpu_usage': [1.5, 2.5, 3.5], 'network_rx': [100, 50, 25]}
+    assert result['delta'] == ['timestamps', 'network_rx']
+
+
+def test_empty_history():
+    assert to_columnar([], ['cpu_usage'], delta=True) == {'timestamps': [], 'series': {}, 'delta': ['timestamps']}
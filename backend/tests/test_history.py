@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+
+from services.history import BIN_REFERENCE, align_to_step, bucket_pipeline, fill_bounds, split_at_watermark
+
+
+def stage(pipeline, name):
+    return next(s[name] for s in pipeline if name in s)
+
+
+def test_align_to_step_uses_datetrunc_reference():
+    assert align_to_step(datetime(2024, 6, 1, 12, 0, 47), 60) == datetime(2024, 6, 1, 12, 0)
+    # Pas qui ne divise pas une journée : grille calculée depuis 2000-01-01
+    value = datetime(2024, 6, 1, 12, 0, 47)
+    aligned = align_to_step(value, 7)
+    assert aligned <= value < aligned + timedelta(seconds=7)
+    assert (aligned - BIN_REFERENCE).total_seconds() % 7 == 0
+
+
+def test_align_to_step_keeps_aligned_values():
+    value = datetime(2024, 6, 1, 12, 5)
+    assert align_to_step(value, 300) == value
+
+
+def test_fill_bounds_start_on_bucket_grid():
+    start = datetime(2024, 6, 1, 12, 0, 47)
+    end = datetime(2024, 6, 1, 13, 0)
+    assert fill_bounds({"$gte": start, "$lt": end}, 60) == [datetime(2024, 6, 1, 12, 0), end]
+
+
+def test_fill_bounds_follow_cursor():
+    start = datetime(2024, 6, 1, 12, 0)
+    end = datetime(2024, 6, 1, 13, 0)
+    cursor = datetime(2024, 6, 1, 12, 30)
+
+    # Descendant : la page suivante s'arrête avant le curseur
+    assert fill_bounds({"$gte": start, "$lt": cursor}, 60) == [start, cursor]
+    # Ascendant : elle reprend après l'intervalle du curseur
+    after = cursor + timedelta(seconds=60)
+    assert fill_bounds({"$gte": after, "$lt": end}, 60) == [after, end]
+
+
+def test_fill_bounds_without_end_stop_now():
+    start = datetime(2024, 6, 1, 12, 0)
+    now = datetime(2024, 6, 1, 12, 10)
+    assert fill_bounds({"$gte": start}, 60, now=now) == [start, now]
+
+
+def test_bucket_pipeline_raw_average():
+    pipeline = bucket_pipeline({"server_id": "s1"}, 60, ["cpu_usage"], False, True, 10)
+
+    assert pipeline[0] == {"$match": {"server_id": "s1"}}
+    group = stage(pipeline, "$group")
+    assert group["_id"] == {"$dateTrunc": {"date": "$timestamp", "unit": "second", "binSize": 60}}
+    assert group["count"] == {"$sum": 1}
+    assert group["cpu_usage"] == {"$avg": "$cpu_usage"}
+    assert stage(pipeline, "$sort") == {"timestamp": -1}
+    assert pipeline[-1] == {"$limit": 10}
+    assert not any("$densify" in s for s in pipeline)
+
+
+def test_bucket_pipeline_tier_weighted_average():
+    pipeline = bucket_pipeline({}, 3600, ["cpu_usage"], True, False, 5)
+
+    group = stage(pipeline, "$group")
+    assert group["count"] == {"$sum": "$count"}
+    assert group["cpu_usage__sum"] == {"$sum": {"$multiply": ["$cpu_usage.avg", "$cpu_usage.count"]}}
+    assert group["cpu_usage__n"] == {"$sum": "$cpu_usage.count"}
+    assert stage(pipeline, "$sort") == {"timestamp": 1}
+
+
+def test_bucket_pipeline_densify_before_sort_and_limit():
+    bounds = [datetime(2024, 6, 1, 12, 0), datetime(2024, 6, 1, 13, 0)]
+    pipeline = bucket_pipeline({}, 60, ["cpu_usage"], False, True, 10, bounds)
+
+    names = [next(iter(s)) for s in pipeline]
+    assert names == ["$match", "$group", "$project", "$densify", "$sort", "$limit"]
+    assert stage(pipeline, "$densify") == {
+        "field": "timestamp",
+        "range": {"step": 60, "unit": "second", "bounds": bounds}
+    }
+
+
+WATERMARK = datetime(2024, 6, 1, 12, 0)
+
+
+def test_split_at_watermark_without_rollup_reads_raw():
+    time_range = {"$gte": datetime(2024, 6, 1)}
+    assert split_at_watermark(time_range, None) == (None, time_range)
+
+
+def test_split_at_watermark_range_before_or_after():
+    before = {"$gte": datetime(2024, 6, 1, 10), "$lt": datetime(2024, 6, 1, 11)}
+    assert split_at_watermark(before, WATERMARK) == (before, None)
+    after = {"$gt": datetime(2024, 6, 1, 12, 30)}
+    assert split_at_watermark(after, WATERMARK) == (None, after)
+
+
+def test_split_at_watermark_newest_points_from_raw():
+    start = datetime(2024, 6, 1, 10)
+    end = datetime(2024, 6, 1, 13)
+    assert split_at_watermark({"$gte": start, "$lt": end}, WATERMARK) == (
+        {"$gte": start, "$lt": WATERMARK},
+        {"$gte": WATERMARK, "$lt": end},
+    )
+    # Plage ouverte : tout ce qui suit le watermark
+    assert split_at_watermark({"$gte": start}, WATERMARK) == ({"$gte": start, "$lt": WATERMARK}, {"$gte": WATERMARK})
+
+
+def test_split_at_watermark_on_step_grid():
+    start = datetime(2024, 6, 1)
+    watermark = datetime(2024, 6, 1, 12, 7)
+    tier_range, raw_range = split_at_watermark({"$gte": start}, watermark, step=900)
+    assert tier_range == {"$gte": start, "$lt": datetime(2024, 6, 1, 12, 0)}
+    assert raw_range == {"$gte": datetime(2024, 6, 1, 12, 0)}
@@ -0,0 +1,110 @@
+"""
+Benchmark de l'évaluation des alertes d'un cycle : comparaison serveur par
+serveur (evaluate_alerts, chemin par défaut des threads de collecte) contre
+l'évaluation vectorisée de tout le cycle (alert_vector).
+
+Usage :
+    python benchmarks/bench_alerts.py --hosts 100,1000,10000
+
+Aucune connexion n'est ouverte : les mesures et les règles sont synthétiques.
+"""
+
+import os
+import io
+import sys
+import time
+import random
+import argparse
+import contextlib
+
+# Les modules du collector s'importent à plat depuis leur dossier
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'collector'))
+os.environ.setdefault('MONGODB_URI', 'mongodb://localhost:27017/bench')
+
+from alert_checker import evaluate_alerts, build_alert_payload  # noqa: E402
+from alert_vector import detect_fleet_alerts  # noqa: E402
+
+
+def make_samples(count):
+    samples = []
+    for i in range(count):
+        metrics = {
+            'cpu_usage': random.uniform(0, 100),
+            'memory_usage': random.uniform(0, 100),
+            'disk_usage': random.uniform(0, 100),
+        }
+        # Une partie du parc sans sonde de température
+        if i % 3:
+            metrics['cpu_temperature'] = random.uniform(30, 95)
+        samples.append((f"bench-{i}", metrics))
+    return samples
+
+
+def make_rules(samples):
+    rules = {}
+    for server_id, _metrics in samples:
+        rules[server_id] = {
+            'server_id': server_id,
+            'cpu_threshold': random.choice([70, 80, 90]),
+            'memory_threshold': 85,
+            'disk_threshold': 90,
+            'temperature_threshold': 85,
+            'enabled': True
+        }
+    return rules
+
+
+def run_per_host(samples, rules):
+    start = time.perf_counter()
+    payloads = []
+    # evaluate_alerts journalise chaque dépassement sur stdout
+    with contextlib.redirect_stdout(io.StringIO()):
+        for server_id, metrics in samples:
+            for alert in evaluate_alerts(server_id, metrics, rules[server_id]):
+                payloads.append(build_alert_payload(server_id, alert))
+    return time.perf_counter() - start, len(payloads)
+
+
+def run_vectorized(samples, rules):
+    start = time.perf_counter()
+    payloads = [
+        build_alert_payload(server_id, alert)
+        for server_id, alert in detect_fleet_alerts(samples, rules.get)
+    ]
+    return time.perf_counter() - start, len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hosts', default='100,1000,10000')
+    parser.add_argument('--cycles', type=int, default=5)
+    args = parser.parse_args()
+
+    counts = [int(c) for c in args.hosts.split(',')]
+
+    print(f"{'serveurs':>9} | {'par serveur (ms)':>17} | {'vectorisé (ms)':>15} | {'alertes':>8} | {'gain':>6}")
+    print("-" * 68)
+
+    for count in counts:
+        samples = make_samples(count)
+        rules = make_rules(samples)
+
+        per_host_time = 0.0
+        vector_time = 0.0
+        for _ in range(args.cycles):
+            elapsed, per_host_alerts = run_per_host(samples, rules)
+            per_host_time += elapsed
+            elapsed, vector_alerts = run_vectorized(samples, rules)
+            vector_time += elapsed
+
+        if per_host_alerts != vector_alerts:
+            print(f"Attention: {per_host_alerts} alertes par serveur contre {vector_alerts} vectorisées")
+
+        per_host_ms = per_host_time / args.cycles * 1000
+        vector_ms = vector_time / args.cycles * 1000
+        print(f"{count:>9} | {per_host_ms:>17.1f} | {vector_ms:>15.1f} | {vector_alerts:>8} | "
+              f"{per_host_ms / vector_ms:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
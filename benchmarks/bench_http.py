@@ -0,0 +1,182 @@
+"""
+Benchmark de charge HTTP du backend : requêtes/s et latences (p50, p95)
+pour l'ingestion (POST /api/metrics, POST /api/metrics/batch) et le
+tableau de bord (GET /api/metrics/latest), avec un nombre croissant de
+clients concurrents.
+
+Avec --workers, le backend est lancé par le benchmark sous gunicorn
+(gunicorn.conf.py) une fois par nombre de workers, pour mesurer le gain
+apporté par chaque worker supplémentaire :
+
+    cd backend && python ../benchmarks/bench_http.py --workers 1,2,4,8 --token <JWT>
+
+Au-delà d'un worker, le backend est lancé avec LIVE_SOURCE=changestream
+(replica set MongoDB) sauf si LIVE_SOURCE est déjà défini.
+
+Sans --workers, le backend déjà lancé à l'adresse --backend est mesuré :
+
+    python benchmarks/bench_http.py --backend http://localhost:5000 --token <JWT>
+
+Le tableau de bord n'est mesuré qu'avec --token (route protégée par JWT).
+
+Attention : les mesures synthétiques sont écrites dans la base ciblée
+(server_id préfixé par "bench-"), elles sont supprimées à la fin si --token
+est fourni.
+"""
+
+import os
+import sys
+import time
+import random
+import signal
+import argparse
+import threading
+import subprocess
+import requests
+
+from bench_ingest import make_sample, cleanup
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))]
+
+
+def run_load(make_request, clients, duration):
+    """Lancer `clients` threads pendant `duration` secondes ; retourne (req/s, p50 ms, p95 ms, erreurs)"""
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        session = requests.Session()
+        local = []
+        failed = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = make_request(session, index)
+                if response.status_code >= 400:
+                    failed += 1
+            except requests.RequestException:
+                failed += 1
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return (
+        len(latencies) / elapsed,
+        percentile(latencies, 50) * 1000,
+        percentile(latencies, 95) * 1000,
+        errors[0]
+    )
+
+
+def scenarios(backend, token, targets, batch_size):
+    """Scénarios mesurés : (nom, fonction de requête)"""
+    def ingest_single(session, index):
+        sample = make_sample(random.randrange(targets))
+        return session.post(f"{backend}/api/metrics", json=sample, timeout=30)
+
+    def ingest_batch(session, index):
+        samples = [make_sample(random.randrange(targets)) for _ in range(batch_size)]
+        return session.post(f"{backend}/api/metrics/batch", json=samples, timeout=60)
+
+    items = [('POST /metrics', ingest_single), (f'POST /metrics/batch ({batch_size})', ingest_batch)]
+
+    if token:
+        headers = {'Authorization': f"Bearer {token}"}
+
+        def dashboard_latest(session, index):
+            return session.get(f"{backend}/api/metrics/latest", headers=headers, timeout=30)
+
+        items.append(('GET /metrics/latest', dashboard_latest))
+
+    return items
+
+
+def wait_ready(backend, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"{backend}/api/metrics/latest", timeout=2)
+            return True
+        except requests.RequestException:
+            time.sleep(0.5)
+    return False
+
+
+def start_gunicorn(workers, port):
+    env = dict(os.environ, WEB_WORKERS=str(workers), PORT=str(port), WEB_ACCESS_LOG="false")
+    if workers > 1:
+        # gunicorn.conf.py refuse plusieurs workers avec le flux temps réel local
+        env.setdefault("LIVE_SOURCE", "changestream")
+    return subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:app'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def stop_gunicorn(process):
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def report(label, backend, args):
+    for name, make_request in scenarios(backend, args.token, args.targets, args.batch_size):
+        for clients in args.clients:
+            rate, p50, p95, errors = run_load(make_request, clients, args.duration)
+            print(f"{label:>8} | {name:<28} | {clients:>7} | {rate:>8.0f} | {p50:>8.1f} | {p95:>8.1f} | {errors:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='http://localhost:5000')
+    parser.add_argument('--workers', help="Nombres de workers gunicorn à comparer (ex. 1,2,4,8)")
+    parser.add_argument('--port', type=int, default=5055, help="Port du backend lancé avec --workers")
+    parser.add_argument('--clients', default='8,32', help="Nombres de clients concurrents")
+    parser.add_argument('--duration', type=float, default=10.0, help="Durée de chaque mesure (s)")
+    parser.add_argument('--targets', type=int, default=200, help="Nombre de serveurs simulés")
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--token', help="JWT pour le tableau de bord et la suppression des mesures de test")
+    args = parser.parse_args()
+    args.clients = [int(c) for c in args.clients.split(',')]
+
+    print(f"{'workers':>8} | {'scénario':<28} | {'clients':>7} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8} | {'erreurs':>7}")
+    print("-" * 92)
+
+    if not args.workers:
+        backend = args.backend.rstrip('/')
+        report('-', backend, args)
+        cleanup(requests.Session(), backend, args.token, args.targets)
+    else:
+        backend = f"http://127.0.0.1:{args.port}"
+        for workers in [int(w) for w in args.workers.split(',')]:
+            process = start_gunicorn(workers, args.port)
+            try:
+                if not wait_ready(backend):
+                    print(f"{workers:>8} | gunicorn n'a pas démarré")
+                    continue
+                report(str(workers), backend, args)
+                cleanup(requests.Session(), backend, args.token, args.targets)
+            finally:
+                stop_gunicorn(process)
+
+
+if __name__ == '__main__':
+    main()
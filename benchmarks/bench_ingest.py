@@ -0,0 +1,93 @@
+"""
+Benchmark d'ingestion des métriques : un POST par mesure (/api/metrics)
+contre un POST par cycle (/api/metrics/batch), pour un nombre croissant
+de serveurs simulés.
+
+Usage :
+    python benchmarks/bench_ingest.py --backend http://localhost:5000 --targets 10,100,500,1000
+
+Attention : les mesures synthétiques sont écrites dans la base ciblée
+(server_id préfixé par "bench-"), elles sont supprimées à la fin.
+"""
+
+import time
+import random
+import argparse
+import requests
+
+
+def make_sample(i):
+    server_id = f"bench-{i}"
+    return {
+        'server_id': server_id,
+        'ip': server_id,
+        'cpu_usage': round(random.uniform(0, 100), 2),
+        'memory_usage': round(random.uniform(0, 100), 2),
+        'disk_usage': round(random.uniform(0, 100), 2),
+        'cpu_temperature': round(random.uniform(30, 90), 1),
+        'network_rx': random.randint(0, 10**9),
+        'network_tx': random.randint(0, 10**9),
+        'uptime': random.randint(0, 10**6)
+    }
+
+
+def run_single(session, backend, samples):
+    start = time.perf_counter()
+    for sample in samples:
+        session.post(f"{backend}/api/metrics", json=sample, timeout=10).raise_for_status()
+    return time.perf_counter() - start
+
+
+def run_batch(session, backend, samples, batch_size):
+    start = time.perf_counter()
+    for i in range(0, len(samples), batch_size):
+        session.post(
+            f"{backend}/api/metrics/batch",
+            json=samples[i:i + batch_size],
+            timeout=60
+        ).raise_for_status()
+    return time.perf_counter() - start
+
+
+def cleanup(session, backend, token, count):
+    if not token:
+        return
+    headers = {'Authorization': f"Bearer {token}"}
+    for i in range(count):
+        session.delete(f"{backend}/api/metrics/bench-{i}", headers=headers, timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backend', default='http://localhost:5000')
+    parser.add_argument('--targets', default='10,100,500,1000')
+    parser.add_argument('--cycles', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--token', help="JWT pour supprimer les mesures de test à la fin")
+    args = parser.parse_args()
+
+    backend = args.backend.rstrip('/')
+    counts = [int(c) for c in args.targets.split(',')]
+    session = requests.Session()
+
+    print(f"{'serveurs':>9} | {'unitaire (mes/s)':>17} | {'lot (mes/s)':>12} | {'gain':>6}")
+    print("-" * 55)
+
+    for count in counts:
+        single_time = 0.0
+        batch_time = 0.0
+        for _ in range(args.cycles):
+            samples = [make_sample(i) for i in range(count)]
+            single_time += run_single(session, backend, samples)
+            batch_time += run_batch(session, backend, samples, args.batch_size)
+
+        total = count * args.cycles
+        single_rate = total / single_time
+        batch_rate = total / batch_time
+        print(f"{count:>9} | {single_rate:>17.0f} | {batch_rate:>12.0f} | {batch_rate / single_rate:>5.1f}x")
+
+    cleanup(session, backend, args.token, max(counts))
+
+
+if __name__ == '__main__':
+    main()
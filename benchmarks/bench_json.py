@@ -0,0 +1,103 @@
+"""
+Benchmark de sérialisation des réponses : ancien chemin (boucle de conversion
+des _id en chaîne puis jsonify avec le DefaultJSONProvider de Flask, json de
+la bibliothèque standard, dates au format HTTP) contre le nouveau
+(OrjsonProvider de services/serialization.py), sur un historique de mesures
+et une liste d'alertes synthétiques. Les deux chemins produisent la réponse
+Flask complète, à partir de documents neufs comme ceux d'un curseur.
+
+Usage :
+    python benchmarks/bench_json.py --points 1000,10000,50000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+from bson.objectid import ObjectId
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+from services.rollup import ROLLUP_FIELDS  # noqa: E402
+from services.serialization import OrjsonProvider  # noqa: E402
+
+# Application avec le fournisseur JSON par défaut de Flask (ancien backend)
+legacy_app = Flask('bench_json_legacy')
+orjson_app = Flask('bench_json_orjson')
+orjson_app.json = OrjsonProvider(orjson_app)
+
+
+def make_history(count):
+    start = datetime.utcnow() - timedelta(seconds=count * 30)
+    return [
+        {
+            '_id': ObjectId(),
+            'server_id': 'bench-0',
+            'timestamp': start + timedelta(seconds=i * 30),
+            **{field: round(random.uniform(0, 100), 2) for field in ROLLUP_FIELDS}
+        }
+        for i in range(count)
+    ]
+
+
+def make_alerts(count):
+    now = datetime.utcnow()
+    return [
+        {
+            '_id': ObjectId(),
+            'server_id': f"bench-{i % 50}",
+            'type': random.choice(['cpu', 'memory', 'disk', 'temperature']),
+            'value': round(random.uniform(80, 100), 2),
+            'threshold': 80,
+            'message': "CPU élevé",
+            'status': 'active',
+            'created_at': now - timedelta(minutes=i),
+            'updated_at': now
+        }
+        for i in range(count)
+    ]
+
+
+def encode_stdlib(docs):
+    """Ancien chemin des routes : _id converti sur place puis jsonify"""
+    for item in docs:
+        if '_id' in item:
+            item['_id'] = str(item['_id'])
+    return legacy_app.json.response({'data': docs}).get_data()
+
+
+def encode_orjson(docs):
+    return orjson_app.json.response({'data': docs}).get_data()
+
+
+def measure(encode, docs, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        # Documents neufs à chaque passe (l'ancien chemin les modifie sur place)
+        batch = [dict(doc) for doc in docs]
+        start = time.perf_counter()
+        encode(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', default='1000,10000,50000')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'charge':>16} | {'json (ms)':>10} | {'orjson (ms)':>11} | {'gain':>6}")
+    print("-" * 54)
+
+    for count in [int(c) for c in args.points.split(',')]:
+        for label, docs in ((f"historique {count}", make_history(count)), (f"alertes {count}", make_alerts(count))):
+            slow = measure(encode_stdlib, docs, args.repeat)
+            fast = measure(encode_orjson, docs, args.repeat)
+            print(f"{label:>16} | {slow * 1000:>10.1f} | {fast * 1000:>11.1f} | {slow / fast:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
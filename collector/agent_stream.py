@@ -0,0 +1,191 @@
+"""
+Mode "stream" : un agent résident par serveur, sur un canal SSH persistant.
+
+L'agent distant reste lancé et émet une ligne JSON par intervalle. Un seul
+thread lit tous les canaux via select() au fur et à mesure que les lignes
+arrivent, puis délègue le traitement de chaque mesure à un pool de workers.
+"""
+
+import json
+import time
+import select
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+from metrics_script import build_agent_script
+from sensor_cache import sensor_cache
+from ssh_pool import ssh_pool
+
+logger = logging.getLogger(__name__)
+
+
+class AgentStream:
+    """Canal SSH d'un agent résident et son tampon de lecture"""
+
+    def __init__(self, target, channel):
+        self.target = target
+        self.channel = channel
+        self.buffer = b''
+        self.opened_at = time.monotonic()
+        self.last_sample_at = None
+
+    @property
+    def ip(self):
+        return self.target['ip']
+
+    def is_alive(self):
+        return not self.channel.closed and not self.channel.exit_status_ready()
+
+    def close(self):
+        try:
+            self.channel.close()
+        except Exception:
+            pass
+
+
+class AgentStreamManager:
+    """Ouvre, surveille et lit les canaux des agents résidents"""
+
+    def __init__(self, on_sample, on_error=None, interval=None, allow=None):
+        self.on_sample = on_sample
+        self.on_error = on_error
+        # allow(ip) : faux tant que le disjoncteur du serveur est ouvert
+        self.allow = allow or (lambda ip: True)
+        self.interval = interval or Config.POLL_INTERVAL
+        self._streams = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._reader = None
+        self._executor = ThreadPoolExecutor(max_workers=Config.MAX_WORKERS)
+
+    def start(self):
+        """Démarrer le thread de lecture"""
+        self._reader = threading.Thread(target=self._read_loop, name="agent-reader", daemon=True)
+        self._reader.start()
+
+    def stop(self):
+        """Arrêter la lecture et fermer tous les canaux"""
+        self._stop.set()
+        if self._reader:
+            self._reader.join(timeout=5)
+        with self._lock:
+            streams = list(self._streams.values())
+            self._streams.clear()
+        for stream in streams:
+            stream.close()
+        self._executor.shutdown(wait=False)
+
+    def _open(self, target):
+        """Lancer l'agent résident sur un serveur"""
+        ip = target['ip']
+        port = target.get('port', 22)
+        username = target.get('username', Config.SSH_USER)
+
+        client = ssh_pool.get_client(ip, port, username)
+        channel = client.get_transport().open_session()
+        channel.exec_command('python3 -u -')
+        # L'agent garde ensuite son capteur en mémoire pendant toute sa durée de vie
+        script = build_agent_script(self.interval, sensor_cache.get(ip))
+        channel.sendall(script.encode('utf-8'))
+        channel.shutdown_write()
+
+        logger.info(f"Agent résident démarré sur {ip}")
+        return AgentStream(target, channel)
+
+    def sync(self, targets):
+        """Aligner les canaux ouverts sur la liste des serveurs à surveiller"""
+        wanted = {target['ip']: target for target in targets}
+
+        with self._lock:
+            current = dict(self._streams)
+
+        # Fermer les canaux des serveurs retirés ou morts
+        for ip, stream in current.items():
+            if ip not in wanted or not stream.is_alive():
+                if ip in wanted:
+                    logger.warning(f"Canal agent fermé pour {ip}, relance")
+                stream.close()
+                with self._lock:
+                    self._streams.pop(ip, None)
+
+        # Ouvrir les canaux manquants
+        with self._lock:
+            missing = [target for ip, target in wanted.items() if ip not in self._streams]
+        missing = [target for target in missing if self.allow(target['ip'])]
+
+        for target in missing:
+            try:
+                stream = self._open(target)
+            except Exception as e:
+                logger.error(f"Échec démarrage agent sur {target['ip']}: {e}")
+                if self.on_error:
+                    self.on_error(target, f"Agent start failed: {str(e)}")
+                continue
+            with self._lock:
+                self._streams[target['ip']] = stream
+
+        with self._lock:
+            return len(self._streams)
+
+    def _read_loop(self):
+        """Lire toutes les lignes disponibles sur l'ensemble des canaux"""
+        while not self._stop.is_set():
+            with self._lock:
+                streams = [s for s in self._streams.values() if not s.channel.closed]
+
+            if not streams:
+                self._stop.wait(0.5)
+                continue
+
+            try:
+                readable, _, _ = select.select([s.channel for s in streams], [], [], 1.0)
+            except (OSError, ValueError):
+                # Un canal a été fermé pendant l'attente : reprendre avec la liste à jour
+                continue
+
+            by_channel = {id(s.channel): s for s in streams}
+            for channel in readable:
+                stream = by_channel.get(id(channel))
+                if stream:
+                    self._drain(stream)
+
+    def _drain(self, stream):
+        """Consommer les données reçues d'un canal et traiter les lignes complètes"""
+        channel = stream.channel
+
+        while channel.recv_stderr_ready():
+            error = channel.recv_stderr(65536).decode('utf-8', 'replace').strip()
+            if error:
+                logger.error(f"Erreur agent {stream.ip}: {error[:200]}")
+
+        if not channel.recv_ready():
+            if channel.exit_status_ready() or channel.closed:
+                stream.close()
+            return
+
+        chunk = channel.recv(65536)
+        if not chunk:
+            stream.close()
+            return
+
+        stream.buffer += chunk
+        *lines, stream.buffer = stream.buffer.split(b'\n')
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                metrics = json.loads(line)
+            except json.JSONDecodeError as e:
+                logger.error(f"Erreur parsing JSON agent {stream.ip}: {e}")
+                continue
+            stream.last_sample_at = time.monotonic()
+            self._executor.submit(self._dispatch, stream.target, metrics)
+
+    def _dispatch(self, target, metrics):
+        try:
+            self.on_sample(target, metrics)
+        except Exception as e:
+            logger.error(f"Erreur traitement mesure agent {target['ip']}: {e}")
@@ -1,13 +1,78 @@
 import requests
 from datetime import datetime
 from config import Config
+from alert_engine import alert_engine
 
-def check_alerts(server_id, metrics, alert_rules):
-    """Vérifier si les métriques dépassent les seuils et créer des alertes"""
+# Serveurs dont la dernière mesure a dépassé un seuil (moteurs sans état)
+_alerting = set()
+
+def check_alerts(server_id, metrics, alert_rules, buffer=None):
+    """
+    Vérifier si les métriques dépassent les seuils et créer des alertes.
+    Avec un tampon, les alertes partent avec le lot du cycle (/api/alerts/batch).
+    """
+    alerts = detect_alerts(server_id, metrics, alert_rules)
+
+    # Envoyer les alertes au backend
+    if alerts:
+        print(f"{len(alerts)} changement(s) d'état d'alerte pour {server_id}")
+        for alert in alerts:
+            if buffer is not None:
+                buffer.add(build_alert_payload(server_id, alert))
+            else:
+                send_alert(server_id, alert)
+    else:
+        print(f"Aucune alerte pour {server_id}")
+
+
+def fleet_evaluation():
+    """Alertes évaluées pour tout le cycle à la fois (pas en modes stream et scheduled, sans cycle)"""
+    return Config.ALERT_ENGINE == "vectorized" and Config.COLLECTOR_MODE in ("poll", "async")
+
+
+def check_fleet_alerts(samples, get_rules, buffer=None):
+    """Évaluer en une fois les mesures d'un cycle [(server_id, metrics)] et envoyer les alertes"""
+    # Import local : NumPy n'est requis que pour ce moteur
+    from alert_vector import detect_fleet_alerts
+
+    alerts = detect_fleet_alerts(samples, get_rules)
+    print(f"{len(alerts)} alerte(s) détectée(s) sur {len(samples)} serveur(s)")
+
+    for server_id, alert in alerts:
+        if buffer is not None:
+            buffer.add(build_alert_payload(server_id, alert))
+        else:
+            send_alert(server_id, alert)
+    return alerts
+
+
+def detect_alerts(server_id, metrics, alert_rules):
+    """Alertes à envoyer pour une mesure, selon le moteur configuré"""
+    if Config.ALERT_ENGINE == "stateful":
+        # Uniquement les transitions (déclenchement, retour à la normale)
+        return alert_engine.evaluate(server_id, metrics, alert_rules)
+
+    alerts = evaluate_alerts(server_id, metrics, alert_rules)
+    if alerts:
+        _alerting.add(server_id)
+    else:
+        _alerting.discard(server_id)
+    return alerts
+
+
+def has_active_alerts(server_id):
+    """Le serveur est-il en alerte (pour accélérer sa collecte) ?"""
+    if Config.ALERT_ENGINE == "stateful":
+        return alert_engine.is_firing(server_id)
+    return server_id in _alerting
+
+
+def evaluate_alerts(server_id, metrics, alert_rules):
+    """Comparer une mesure aux seuils et retourner les dépassements"""
 
     if not alert_rules or not alert_rules.get('enabled'):
         print(f"Règles d'alerte désactivées pour {server_id}")
-        return
+        return []
 
     alerts = []
 
@@ -60,29 +125,28 @@ def check_alerts(server_id, metrics, alert_rules):
             })
             print(f"ALERTE TEMPÉRATURE: {temp:.1f}°C > {temp_threshold}°C")
 
-    # Envoyer les alertes au backend
-    if alerts:
-        print(f"{len(alerts)} alerte(s) détectée(s) pour {server_id}")
-        for alert in alerts:
-            send_alert(server_id, alert)
-    else:
-        print(f"Aucune alerte pour {server_id}")
+    return alerts
 
 
-def send_alert(server_id, alert_data):
+def build_alert_payload(server_id, alert_data):
+    """Construire le document d'alerte envoyé au backend"""
     from datetime import datetime, timezone
 
-    alert_payload = {
+    return {
         'server_id': server_id,
         'type': alert_data['type'],
-        'severity': get_severity(alert_data['value'], alert_data['threshold']),
+        'severity': alert_data.get('severity') or get_severity(alert_data['value'], alert_data['threshold']),
         'message': alert_data['message'],
         'value': float(alert_data['value']),
         'threshold': float(alert_data['threshold']),
-        'status': 'active',
-        'created_at': datetime.now(timezone.utc)
+        'status': 'resolved' if alert_data.get('state') == 'resolved' else 'active',
+        'created_at': datetime.now(timezone.utc).isoformat()
     }
 
+
+def send_alert(server_id, alert_data):
+    alert_payload = build_alert_payload(server_id, alert_data)
+
     try:
         response = requests.post(
             f"{Config.BACKEND_URL}/api/alerts/create",
@@ -91,13 +155,36 @@ def send_alert(server_id, alert_data):
         )
 
         if response.status_code in [200, 201]:
-            print(f"Alerte {alert_data['type']} envoyée au backend")
+            print(f"Alerte {alert_data['type']} ({alert_payload['status']}) envoyée au backend")
         else:
             print(f"Erreur envoi alerte: {response.status_code}")
 
     except Exception as e:
         print(f"Erreur envoi alerte: {e}")
 
+def send_alerts_batch(payloads):
+    """Envoyer en une requête les alertes d'un cycle"""
+    try:
+        response = requests.post(
+            f"{Config.BACKEND_URL}/api/alerts/batch",
+            json=payloads,
+            timeout=30
+        )
+
+        if response.status_code in [200, 207]:
+            result = response.json()
+            print(f"Lot d'alertes envoyé: {result.get('inserted', 0)} nouvelle(s), {result.get('updated', 0)} mise(s) à jour")
+            if result.get('rejected'):
+                # Alertes invalides : inutile de les renvoyer
+                print(f"{result['rejected']} alerte(s) refusée(s) par le backend")
+            return True
+        print(f"Erreur envoi lot d'alertes: {response.status_code}")
+        return False
+
+    except Exception as e:
+        print(f"Erreur envoi lot d'alertes: {e}")
+        return False
+
 def get_severity(value, threshold):
     """Déterminer la sévérité de l'alerte"""
     excess = value - threshold
@@ -0,0 +1,249 @@
+"""
+Moteur d'alertes avec état (ALERT_ENGINE=stateful).
+
+Pour chaque serveur et chaque métrique, les dernières mesures sont gardées
+dans un tampon circulaire. Chaque règle a un état (ok, pending, firing) :
+
+- hystérésis : l'alerte se déclenche au-dessus du seuil et ne retombe
+  qu'en dessous du seuil de retour (seuil - ALERT_HYSTERESIS par défaut) ;
+- durée : le dépassement doit durer `<type>_for_seconds` secondes avant
+  que l'alerte ne se déclenche ("au-dessus de X pendant N secondes") ;
+- moyenne glissante : la valeur comparée est la moyenne des
+  ALERT_AVG_SAMPLES dernières mesures ;
+- dérivée : le taux de remplissage du disque (en % par heure), calculé sur
+  la fenêtre du tampon, a sa propre règle (disk_fill_rate_threshold).
+
+Seules les transitions d'état sont retournées (déclenchement, retour à la
+normale), ce qui évite d'envoyer une alerte à chaque mesure. Un retour à la
+normale n'est émis que pour une règle déclenchée. Pour qu'un envoi perdu ne
+laisse pas le backend désynchronisé jusqu'au changement d'état suivant, une
+règle déclenchée est rappelée toutes les ALERT_REASSERT_SECONDS secondes, et
+un retour à la normale est répété une fois après ce délai.
+"""
+
+import time
+import threading
+from collections import deque
+from config import Config
+
+# Règles de seuil : (type, champ mesuré, clé du seuil, seuil par défaut, message, message de retour)
+THRESHOLD_RULES = [
+    ('cpu', 'cpu_usage', 'cpu_threshold', 80,
+     "CPU élevé: {value:.1f}%", "CPU revenu à la normale: {value:.1f}%"),
+    ('memory', 'memory_usage', 'memory_threshold', 85,
+     "RAM élevée: {value:.1f}%", "RAM revenue à la normale: {value:.1f}%"),
+    ('disk', 'disk_usage', 'disk_threshold', 90,
+     "Disque plein: {value:.1f}%", "Espace disque revenu à la normale: {value:.1f}%"),
+    ('temperature', 'cpu_temperature', 'temperature_threshold', 85,
+     "Température élevée: {value:.1f}°C", "Température revenue à la normale: {value:.1f}°C"),
+]
+
+OK, PENDING, FIRING = 'ok', 'pending', 'firing'
+
+
+class RuleState:
+    __slots__ = ('state', 'since', 'asserted_at', 'resolve_pending')
+
+    def __init__(self):
+        self.state = None
+        self.since = None
+        self.asserted_at = None
+        self.resolve_pending = False
+
+    def reassert_due(self, now):
+        return Config.ALERT_REASSERT_SECONDS > 0 and now - self.asserted_at >= Config.ALERT_REASSERT_SECONDS
+
+
+class HostState:
+    """Tampons et états des règles d'un serveur"""
+
+    def __init__(self, size):
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.rules = {}
+        self.size = size
+
+    def push(self, field, timestamp, value, horizon):
+        buffer = self.samples.get(field)
+        if buffer is None:
+            buffer = self.samples[field] = deque(maxlen=self.size)
+        buffer.append((timestamp, value))
+        # Ne garder que la fenêtre utile aux règles de durée et de dérivée
+        while buffer and timestamp - buffer[0][0] > horizon:
+            buffer.popleft()
+
+    def average(self, field, count):
+        buffer = self.samples.get(field)
+        if not buffer:
+            return None
+        values = [v for _, v in list(buffer)[-count:]]
+        return sum(values) / len(values)
+
+    def rate_per_hour(self, field, window):
+        """Pente (unités par heure) par moindres carrés sur la fenêtre"""
+        buffer = self.samples.get(field)
+        if not buffer:
+            return None
+        points = [(t, v) for t, v in buffer if buffer[-1][0] - t <= window]
+        if len(points) < 2 or points[-1][0] - points[0][0] <= 0:
+            return None
+        mean_t = sum(t for t, _ in points) / len(points)
+        mean_v = sum(v for _, v in points) / len(points)
+        variance = sum((t - mean_t) ** 2 for t, _ in points)
+        covariance = sum((t - mean_t) * (v - mean_v) for t, v in points)
+        return covariance / variance * 3600
+
+    def rule(self, name):
+        state = self.rules.get(name)
+        if state is None:
+            state = self.rules[name] = RuleState()
+        return state
+
+
+class AlertEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def _host(self, server_id):
+        with self._lock:
+            host = self._hosts.get(server_id)
+            if host is None:
+                host = self._hosts[server_id] = HostState(Config.ALERT_WINDOW_SIZE)
+            return host
+
+    def forget(self, server_id):
+        with self._lock:
+            self._hosts.pop(server_id, None)
+
+    def is_firing(self, server_id):
+        """Le serveur a-t-il au moins une règle déclenchée ?"""
+        with self._lock:
+            host = self._hosts.get(server_id)
+        if host is None:
+            return False
+        with host.lock:
+            return any(rule.state == FIRING for rule in host.rules.values())
+
+    def retain(self, server_ids):
+        """Oublier les serveurs qui ne sont plus surveillés"""
+        server_ids = set(server_ids)
+        with self._lock:
+            for server_id in list(self._hosts):
+                if server_id not in server_ids:
+                    del self._hosts[server_id]
+
+    def _transition(self, rule, active, cleared, now, for_seconds):
+        """
+        Faire évoluer l'état d'une règle.
+        Retourne FIRING ou OK lors d'une transition à publier, sinon None.
+        """
+        previous = rule.state
+
+        if rule.state in (None, OK, PENDING) and active:
+            if rule.state != PENDING:
+                rule.state, rule.since = PENDING, now
+            if now - rule.since >= for_seconds:
+                rule.state = FIRING
+        elif rule.state == FIRING and cleared:
+            rule.state, rule.since = OK, now
+        elif rule.state != FIRING and not active:
+            rule.state, rule.since = OK, now
+
+        if rule.state == FIRING:
+            if previous != FIRING or rule.reassert_due(now):
+                rule.asserted_at = now
+                return FIRING
+            return None
+
+        if rule.state == OK and previous == FIRING:
+            rule.asserted_at = now
+            rule.resolve_pending = True
+            return OK
+        if rule.state == OK and rule.resolve_pending and rule.reassert_due(now):
+            # Retour à la normale répété une fois
+            rule.resolve_pending = False
+            return OK
+        return None
+
+    def evaluate(self, server_id, metrics, alert_rules, now=None):
+        """
+        Ajouter une mesure et retourner les transitions d'alerte :
+        [{type, message, value, threshold, state}] avec state "firing" ou "resolved".
+        """
+        if not alert_rules or not alert_rules.get('enabled'):
+            return []
+
+        now = now if now is not None else time.time()
+        horizon = Config.ALERT_WINDOW_SECONDS
+        host = self._host(server_id)
+        transitions = []
+
+        with host.lock:
+            for name, field, key, default, message, clear_message in THRESHOLD_RULES:
+                value = metrics.get(field)
+                if value is None:
+                    continue
+                host.push(field, now, value, horizon)
+
+                threshold = alert_rules.get(key, default)
+                clear = alert_rules.get(f'{name}_clear_threshold', threshold - Config.ALERT_HYSTERESIS)
+                for_seconds = alert_rules.get(f'{name}_for_seconds', Config.ALERT_FOR_SECONDS)
+                smoothed = host.average(field, Config.ALERT_AVG_SAMPLES)
+
+                change = self._transition(
+                    host.rule(name), smoothed > threshold, smoothed <= clear, now, for_seconds
+                )
+                if change == FIRING:
+                    transitions.append({
+                        'type': name,
+                        'message': message.format(value=smoothed),
+                        'value': smoothed,
+                        'threshold': threshold,
+                        'state': 'firing'
+                    })
+                elif change == OK:
+                    transitions.append({
+                        'type': name,
+                        'message': clear_message.format(value=smoothed),
+                        'value': smoothed,
+                        'threshold': threshold,
+                        'state': 'resolved'
+                    })
+
+            fill_threshold = alert_rules.get('disk_fill_rate_threshold', Config.ALERT_DISK_FILL_RATE)
+            if fill_threshold:
+                transitions.extend(self._evaluate_fill_rate(host, fill_threshold, now))
+
+        return transitions
+
+    def _evaluate_fill_rate(self, host, threshold, now):
+        """Règle dérivée : vitesse de remplissage du disque en % par heure"""
+        rate = host.rate_per_hour('disk_usage', Config.ALERT_RATE_WINDOW_SECONDS)
+        if rate is None:
+            return []
+
+        change = self._transition(
+            host.rule('disk_fill'), rate > threshold,
+            rate <= threshold * Config.ALERT_RATE_CLEAR_RATIO, now, 0
+        )
+        if change == FIRING:
+            return [{
+                'type': 'disk_fill',
+                'message': f"Disque en remplissage rapide: {rate:.1f}%/h",
+                'value': rate,
+                'threshold': threshold,
+                'state': 'firing'
+            }]
+        if change == OK:
+            return [{
+                'type': 'disk_fill',
+                'message': f"Remplissage du disque revenu à la normale: {rate:.1f}%/h",
+                'value': rate,
+                'threshold': threshold,
+                'state': 'resolved'
+            }]
+        return []
+
+
+alert_engine = AlertEngine()
@@ -0,0 +1,89 @@
+"""
+Évaluation vectorisée des alertes de tout un cycle (ALERT_ENGINE=vectorized).
+
+Au lieu de comparer chaque mesure à ses seuils dans le thread de collecte du
+serveur, les résultats du cycle sont rassemblés en une matrice colonnaire
+serveurs × métriques (NumPy) et comparés en une fois à la matrice des seuils
+de chaque serveur. Les sévérités sont calculées sur le même tableau. Seules
+les cases en dépassement sont ensuite transformées en alertes.
+"""
+
+import numpy as np
+from alert_engine import THRESHOLD_RULES
+
+TYPES = [name for name, _field, _key, _default, _message, _clear in THRESHOLD_RULES]
+FIELDS = [field for _name, field, _key, _default, _message, _clear in THRESHOLD_RULES]
+KEYS = [key for _name, _field, key, _default, _message, _clear in THRESHOLD_RULES]
+DEFAULTS = np.array([default for _name, _field, _key, default, _message, _clear in THRESHOLD_RULES], dtype=float)
+MESSAGES = [message for _name, _field, _key, _default, message, _clear in THRESHOLD_RULES]
+
+# Bornes de dépassement (valeur - seuil) des sévérités, comme get_severity
+SEVERITY_LEVELS = np.array(['low', 'medium', 'high', 'critical'])
+SEVERITY_BOUNDS = np.array([5, 10, 20], dtype=float)
+
+
+def build_batch(samples):
+    """
+    Matrice des valeurs d'un cycle à partir de [(server_id, metrics)].
+    Les métriques absentes (ex: pas de sonde de température) valent NaN.
+    """
+    server_ids = [server_id for server_id, _metrics in samples]
+    values = np.full((len(samples), len(FIELDS)), np.nan)
+    for row, (_server_id, metrics) in enumerate(samples):
+        for column, field in enumerate(FIELDS):
+            value = metrics.get(field)
+            if value is not None:
+                values[row, column] = value
+    return server_ids, values
+
+
+def build_rule_matrix(server_ids, get_rules):
+    """Seuils serveurs × métriques et masque des serveurs dont les alertes sont actives"""
+    thresholds = np.tile(DEFAULTS, (len(server_ids), 1))
+    enabled = np.zeros(len(server_ids), dtype=bool)
+    for row, server_id in enumerate(server_ids):
+        rules = get_rules(server_id)
+        if not rules or not rules.get('enabled'):
+            continue
+        enabled[row] = True
+        for column, key in enumerate(KEYS):
+            if key in rules:
+                thresholds[row, column] = rules[key]
+    return thresholds, enabled
+
+
+def evaluate_batch(values, thresholds, enabled):
+    """
+    Comparer toute la matrice aux seuils.
+    Retourne (masque des dépassements, indices de sévérité).
+    """
+    # NaN > seuil vaut False : une métrique absente ne déclenche rien
+    with np.errstate(invalid='ignore'):
+        exceeded = (values > thresholds) & enabled[:, None]
+    severity = np.searchsorted(SEVERITY_BOUNDS, values - thresholds, side='left')
+    return exceeded, severity
+
+
+def detect_fleet_alerts(samples, get_rules):
+    """
+    Alertes d'un cycle complet : [(server_id, alerte)], où l'alerte a la forme
+    de evaluate_alerts plus sa sévérité précalculée.
+    """
+    if not samples:
+        return []
+
+    server_ids, values = build_batch(samples)
+    thresholds, enabled = build_rule_matrix(server_ids, get_rules)
+    exceeded, severity = evaluate_batch(values, thresholds, enabled)
+
+    alerts = []
+    for row, column in zip(*np.nonzero(exceeded)):
+        value = float(values[row, column])
+        alerts.append((server_ids[row], {
+            'type': TYPES[column],
+            'message': MESSAGES[column].format(value=value),
+            'value': value,
+            'threshold': float(thresholds[row, column]),
+            'severity': str(SEVERITY_LEVELS[severity[row, column]])
+        }))
+    return alerts
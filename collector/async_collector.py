@@ -0,0 +1,331 @@
+"""
+Moteur de collecte asyncio (COLLECTOR_MODE=async).
+
+Une seule boucle d'événements pilote des milliers de sessions SSH (asyncssh)
+et d'appels HTTP (aiohttp) en parallèle. La concurrence est bornée par un
+sémaphore et chaque serveur dispose de son propre timeout, sans être limité
+par le nombre de threads de POLL_MAX_WORKERS.
+"""
+
+import json
+import time
+import asyncio
+import logging
+import aiohttp
+import asyncssh
+from config import Config
+from metrics_script import build_remote_script
+from payload import build_metrics_payload
+from alert_checker import detect_alerts, build_alert_payload, fleet_evaluation
+from alert_engine import alert_engine
+from counter_rates import counter_rates
+from sensor_cache import sensor_cache
+from circuit_breaker import breakers
+from rules_cache import rules_cache
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncCollector:
+    """Collecte asynchrone de tous les serveurs, un cycle à la fois"""
+
+    def __init__(self, load_targets, on_error=None, on_cycle=None):
+        # Fonctions bloquantes (pymongo) exécutées dans un thread
+        self.load_targets = load_targets
+        self.on_error = on_error
+        self.on_cycle = on_cycle
+        self.semaphore = asyncio.Semaphore(Config.ASYNC_CONCURRENCY)
+        self._connections = {}
+        self._session = None
+        self._pending_metrics = []
+        self._pending_alerts = []
+
+    async def _log_error(self, ip, message):
+        if self.on_error:
+            try:
+                await asyncio.to_thread(self.on_error, ip, ip, message)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'enregistrement de l'erreur: {e}")
+
+    async def _get_connection(self, ip, port, username):
+        """Réutiliser la connexion SSH d'un serveur ou en ouvrir une nouvelle"""
+        key = (ip, port, username)
+        conn = self._connections.get(key)
+        if conn is not None:
+            return conn
+
+        conn = await asyncssh.connect(
+            ip,
+            port=port,
+            username=username,
+            client_keys=[Config.SSH_KEY_PATH],
+            known_hosts=None,
+            connect_timeout=15,
+            keepalive_interval=Config.SSH_KEEPALIVE or None
+        )
+        self._connections[key] = conn
+        return conn
+
+    def _drop_connection(self, ip, port, username):
+        conn = self._connections.pop((ip, port, username), None)
+        if conn is not None:
+            conn.close()
+
+    async def _run_remote_script(self, conn, ip):
+        """Exécuter le script de collecte et décoder sa sortie JSON"""
+        script = build_remote_script(sensor_cache.get(ip))
+        result = await conn.run('python3', input=script, timeout=30)
+
+        output = (result.stdout or '').strip()
+        error = (result.stderr or '').strip()
+
+        if error and not output:
+            logger.error(f"Erreur script distant {ip}: {error}")
+            return None
+
+        if not output:
+            logger.error(f"Aucune sortie du script distant {ip}")
+            return None
+
+        try:
+            return json.loads(output)
+        except json.JSONDecodeError as e:
+            logger.error(f"Erreur parsing JSON {ip}: {e}")
+            return None
+
+    async def _send_metrics(self, ip, metrics):
+        """True si la mesure est acceptée, None si elle part avec le lot du cycle"""
+        payload = build_metrics_payload(ip, ip, metrics)
+
+        if Config.METRICS_BATCHING:
+            # Envoyé avec le lot du cycle par _flush_metrics, alertes vérifiées après
+            self._pending_metrics.append((payload, ip, metrics))
+            return None
+
+        try:
+            async with self._session.post(f"{Config.BACKEND_URL}/api/metrics", json=payload) as response:
+                response.raise_for_status()
+            logger.info(f"Métriques envoyées pour {ip}")
+            return True
+        except aiohttp.ClientError as e:
+            logger.error(f"Erreur envoi métriques pour {ip}: {e}")
+            return False
+
+    async def _flush_metrics(self):
+        """Envoyer les mesures du cycle à /api/metrics/batch ; retourne les mesures acceptées"""
+        pending, self._pending_metrics = self._pending_metrics, []
+        size = Config.METRICS_BATCH_SIZE
+        accepted = []
+
+        for start in range(0, len(pending), size):
+            chunk = pending[start:start + size]
+            try:
+                async with self._session.post(
+                    f"{Config.BACKEND_URL}/api/metrics/batch",
+                    json=[payload for payload, _ip, _metrics in chunk]
+                ) as response:
+                    response.raise_for_status()
+                logger.info(f"Lot de {len(chunk)} mesure(s) envoyé au backend")
+                accepted.extend((ip, metrics) for _payload, ip, metrics in chunk)
+            except aiohttp.ClientError as e:
+                logger.error(f"Erreur envoi lot de {len(chunk)} mesure(s): {e}")
+        return accepted
+
+    async def _flush_alerts(self):
+        """Envoyer les alertes du cycle à /api/alerts/batch"""
+        pending, self._pending_alerts = self._pending_alerts, []
+        size = Config.METRICS_BATCH_SIZE
+
+        for start in range(0, len(pending), size):
+            chunk = pending[start:start + size]
+            try:
+                async with self._session.post(f"{Config.BACKEND_URL}/api/alerts/batch", json=chunk) as response:
+                    if response.status in (200, 207):
+                        continue
+                    logger.error(f"Erreur envoi lot de {len(chunk)} alerte(s): {response.status}")
+            except aiohttp.ClientError as e:
+                logger.error(f"Erreur envoi lot de {len(chunk)} alerte(s): {e}")
+
+            # Transitions gardées pour le cycle suivant (les plus récentes si le tampon déborde)
+            self._pending_alerts = (pending[start:] + self._pending_alerts)[-Config.ALERT_MAX_PENDING:]
+            break
+
+    async def _check_alerts(self, ip, metrics):
+        # Cache rafraîchi une fois par cycle dans collect_all_targets
+        rules = rules_cache.get(ip, refresh=False)
+        if not rules:
+            logger.warning(f"Impossible de récupérer les règles pour {ip}")
+            return
+
+        alerts = detect_alerts(ip, metrics, rules)
+        if Config.METRICS_BATCHING:
+            # Envoyées avec le lot du cycle par _flush_alerts
+            self._pending_alerts.extend(build_alert_payload(ip, alert) for alert in alerts)
+            return
+
+        try:
+            for alert in alerts:
+                async with self._session.post(
+                    f"{Config.BACKEND_URL}/api/alerts/create",
+                    json=build_alert_payload(ip, alert)
+                ) as response:
+                    if response.status not in (200, 201):
+                        logger.error(f"Erreur envoi alerte: {response.status}")
+        except aiohttp.ClientError as e:
+            logger.error(f"Erreur alertes pour {ip}: {e}")
+
+    async def _check_fleet_alerts(self, samples):
+        """Moteur vectorisé : toutes les mesures du cycle évaluées en une fois"""
+        from alert_vector import detect_fleet_alerts
+
+        alerts = detect_fleet_alerts(samples, lambda server_id: rules_cache.get(server_id, refresh=False))
+        logger.info(f"{len(alerts)} alerte(s) détectée(s) sur {len(samples)} serveur(s)")
+        payloads = [build_alert_payload(server_id, alert) for server_id, alert in alerts]
+
+        if Config.METRICS_BATCHING:
+            self._pending_alerts.extend(payloads)
+            return
+
+        for payload in payloads:
+            try:
+                async with self._session.post(f"{Config.BACKEND_URL}/api/alerts/create", json=payload) as response:
+                    if response.status not in (200, 201):
+                        logger.error(f"Erreur envoi alerte: {response.status}")
+            except aiohttp.ClientError as e:
+                logger.error(f"Erreur alertes pour {payload['server_id']}: {e}")
+
+    async def _collect_one(self, target):
+        ip = target['ip']
+        port = target.get('port', 22)
+        username = target.get('username', Config.SSH_USER)
+
+        try:
+            conn = await self._get_connection(ip, port, username)
+        except (OSError, asyncssh.Error, asyncio.TimeoutError) as ssh_error:
+            logger.error(f"Échec connexion SSH à {ip}: {ssh_error}")
+            await self._log_error(ip, f"SSH connection failed: {str(ssh_error)}")
+            return None
+
+        try:
+            metrics = await self._run_remote_script(conn, ip)
+        except (OSError, asyncssh.Error, asyncio.TimeoutError) as e:
+            logger.error(f"Erreur exécution script {ip}: {e}")
+            self._drop_connection(ip, port, username)
+            await self._log_error(ip, str(e))
+            return None
+
+        if not metrics:
+            logger.warning(f"Aucune métrique collectée pour {ip}")
+            await self._log_error(ip, "No metrics collected")
+            return None
+
+        breakers.success(ip)
+        sensor_cache.remember(ip, metrics)
+
+        sent = await self._send_metrics(ip, metrics)
+        if sent and not fleet_evaluation():
+            await self._check_alerts(ip, metrics)
+
+        return {
+            'ip': ip,
+            'alias': target.get('alias', ip),
+            'status': 'success',
+            'metrics': metrics,
+            'sent': sent
+        }
+
+    async def collect_from_server(self, target):
+        """Collecter un serveur sous le sémaphore, avec un timeout par hôte"""
+        # Disjoncteur ouvert : aucune place du sémaphore ni connexion pour un serveur injoignable
+        if not breakers.allow(target['ip']):
+            return None
+
+        async with self.semaphore:
+            try:
+                return await asyncio.wait_for(self._collect_one(target), Config.ASYNC_HOST_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.error(f"Timeout collecte pour {target['ip']}")
+                self._drop_connection(
+                    target['ip'], target.get('port', 22), target.get('username', Config.SSH_USER)
+                )
+                await self._log_error(target['ip'], "Collection timeout")
+                return None
+            except Exception as e:
+                logger.error(f"Erreur collecte pour {target['ip']}: {e}")
+                await self._log_error(target['ip'], str(e))
+                return None
+
+    async def collect_all_targets(self):
+        """Un cycle de collecte sur tous les serveurs"""
+        targets = await asyncio.to_thread(self.load_targets)
+
+        if not targets:
+            logger.warning("Aucun serveur à surveiller")
+            return
+
+        logger.info(f"{len(targets)} serveur(s) à surveiller")
+
+        await asyncio.to_thread(rules_cache.refresh_if_stale)
+        results = await asyncio.gather(*(self.collect_from_server(t) for t in targets))
+
+        # Alertes évaluées sur les seules mesures acceptées par le backend
+        accepted = [(r['ip'], r['metrics']) for r in results if r and r['sent']]
+        if Config.METRICS_BATCHING:
+            accepted = await self._flush_metrics()
+            if not fleet_evaluation():
+                for ip, metrics in accepted:
+                    await self._check_alerts(ip, metrics)
+        if fleet_evaluation():
+            await self._check_fleet_alerts(accepted)
+        await self._flush_alerts()
+        if self.on_cycle:
+            try:
+                await asyncio.to_thread(self.on_cycle)
+            except Exception as e:
+                logger.error(f"Erreur fin de cycle: {e}")
+
+        success_count = sum(1 for r in results if r)
+        error_count = len(results) - success_count
+        logger.info(f"Collecte terminée: {success_count} succès, {error_count} échecs")
+
+        # Oublier les connexions des serveurs retirés
+        alert_engine.retain(t['ip'] for t in targets)
+        counter_rates.retain(t['ip'] for t in targets)
+        sensor_cache.retain(t['ip'] for t in targets)
+        breakers.retain(t['ip'] for t in targets)
+        wanted = {(t['ip'], t.get('port', 22), t.get('username', Config.SSH_USER)) for t in targets}
+        for key in list(self._connections):
+            if key not in wanted:
+                self._drop_connection(*key)
+
+    async def run(self):
+        """Boucle principale du moteur asyncio"""
+        timeout = aiohttp.ClientTimeout(total=10)
+        connector = aiohttp.TCPConnector(limit=Config.ASYNC_HTTP_CONNECTIONS)
+
+        async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+            self._session = session
+            try:
+                while True:
+                    start_time = time.time()
+                    logger.info("=" * 60)
+                    try:
+                        await self.collect_all_targets()
+                    except Exception as e:
+                        logger.error(f"Erreur lors de la collecte: {e}")
+
+                    elapsed = time.time() - start_time
+                    sleep_time = max(0, Config.POLL_INTERVAL - elapsed)
+                    logger.info(f"Pause de {sleep_time:.1f}s avant la prochaine collecte")
+                    await asyncio.sleep(sleep_time)
+            finally:
+                for key in list(self._connections):
+                    self._drop_connection(*key)
+
+
+def run_async_mode(load_targets, on_error=None, on_cycle=None):
+    """Démarrer le moteur asyncio (bloquant)"""
+    async def _main():
+        await AsyncCollector(load_targets, on_error, on_cycle).run()
+
+    asyncio.run(_main())
@@ -0,0 +1,171 @@
+"""
+Disjoncteur par serveur et compteur agrégé des erreurs de collecte.
+
+Après BREAKER_FAILURE_THRESHOLD échecs consécutifs, le disjoncteur d'un
+serveur s'ouvre : les collectes sont refusées immédiatement, sans connexion
+SSH ni thread bloqué. Passé le délai d'ouverture, une seule collecte d'essai
+est autorisée (semi-ouvert) : si elle réussit le disjoncteur se ferme, sinon
+il se rouvre avec un délai doublé (jusqu'à BREAKER_OPEN_MAX).
+
+Les erreurs ne sont plus insérées une par une dans poll_errors : elles sont
+comptées en mémoire puis écrites en un bulk_write, un document par serveur.
+"""
+
+import time
+import threading
+from datetime import datetime
+from pymongo import UpdateOne
+from config import Config
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class _Breaker:
+    __slots__ = ('state', 'failures', 'opens', 'retry_at')
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self.retry_at = 0.0
+
+
+class CircuitBreakers:
+    """Disjoncteurs de tous les serveurs"""
+
+    def __init__(self, threshold=None, open_seconds=None, open_max=None):
+        self.threshold = threshold or Config.BREAKER_FAILURE_THRESHOLD
+        self.open_seconds = open_seconds or Config.BREAKER_OPEN_SECONDS
+        self.open_max = open_max or Config.BREAKER_OPEN_MAX
+        self._lock = threading.Lock()
+        self._breakers = {}
+
+    def _get(self, server_id):
+        breaker = self._breakers.get(server_id)
+        if breaker is None:
+            breaker = self._breakers[server_id] = _Breaker()
+        return breaker
+
+    def allow(self, server_id):
+        """Une collecte peut-elle être tentée maintenant ?"""
+        with self._lock:
+            breaker = self._get(server_id)
+            if breaker.state == CLOSED:
+                return True
+            if breaker.state == OPEN and time.monotonic() >= breaker.retry_at:
+                # Une seule collecte d'essai à la fois
+                breaker.state = HALF_OPEN
+                return True
+            return False
+
+    def success(self, server_id):
+        with self._lock:
+            breaker = self._get(server_id)
+            breaker.state = CLOSED
+            breaker.failures = 0
+            breaker.opens = 0
+
+    def failure(self, server_id):
+        """Enregistrer un échec ; retourne True si le disjoncteur vient de s'ouvrir"""
+        with self._lock:
+            breaker = self._get(server_id)
+            breaker.failures += 1
+            if breaker.state == HALF_OPEN or breaker.failures >= self.threshold:
+                was_open = breaker.state == OPEN
+                breaker.opens += 1
+                delay = min(self.open_seconds * (2 ** min(breaker.opens - 1, 16)), self.open_max)
+                breaker.state = OPEN
+                breaker.retry_at = time.monotonic() + delay
+                return not was_open
+            return False
+
+    def state(self, server_id):
+        with self._lock:
+            breaker = self._breakers.get(server_id)
+            return breaker.state if breaker else CLOSED
+
+    def retry_in(self, server_id):
+        with self._lock:
+            breaker = self._breakers.get(server_id)
+            if breaker is None or breaker.state != OPEN:
+                return 0.0
+            return max(0.0, breaker.retry_at - time.monotonic())
+
+    def retain(self, server_ids):
+        """Oublier les serveurs qui ne sont plus surveillés"""
+        server_ids = set(server_ids)
+        with self._lock:
+            for server_id in list(self._breakers):
+                if server_id not in server_ids:
+                    del self._breakers[server_id]
+
+    def stats(self):
+        with self._lock:
+            states = [b.state for b in self._breakers.values()]
+        return {state: states.count(state) for state in (CLOSED, OPEN, HALF_OPEN)}
+
+
+class ErrorCounter:
+    """Erreurs de collecte agrégées par serveur, écrites périodiquement"""
+
+    def __init__(self, collection, breakers=None):
+        self.collection = collection
+        self.breakers = breakers
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def record(self, server_id, ip, message):
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._pending.get(server_id)
+            if entry is None:
+                entry = self._pending[server_id] = {'ip': ip, 'count': 0, 'first_at': now}
+            entry['count'] += 1
+            entry['last_error'] = message
+            entry['last_at'] = now
+
+    def flush(self):
+        """Écrire les compteurs en attente : un document par serveur (_id = server_id)"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        operations = []
+        for server_id, entry in pending.items():
+            fields = {
+                'server_id': server_id,
+                'ip': entry['ip'],
+                'last_error': entry['last_error'],
+                'timestamp': entry['last_at'],
+            }
+            if self.breakers is not None:
+                fields['breaker'] = self.breakers.state(server_id)
+            operations.append(UpdateOne(
+                {'_id': server_id},
+                {
+                    '$inc': {'count': entry['count']},
+                    '$set': fields,
+                    '$setOnInsert': {'first_at': entry['first_at']}
+                },
+                upsert=True
+            ))
+
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except Exception:
+            # Garder les compteurs pour la prochaine écriture
+            with self._lock:
+                for server_id, entry in pending.items():
+                    current = self._pending.get(server_id)
+                    if current is None:
+                        self._pending[server_id] = entry
+                    else:
+                        current['count'] += entry['count']
+                        current['first_at'] = entry['first_at']
+            raise
+        return len(operations)
+
+
+breakers = CircuitBreakers()
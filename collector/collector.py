@@ -4,13 +4,25 @@ import json
 import pytz
 import logging
 import requests
-import paramiko
 from datetime import datetime, timezone
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from pymongo import MongoClient
 from config import Config
-from metrics_script import REMOTE_SCRIPT
-from alert_checker import check_alerts, get_alert_rules
+from metrics_script import build_remote_script
+from payload import build_metrics_payload
+from ssh_pool import ssh_pool
+from agent_stream import AgentStreamManager
+from metrics_buffer import MetricsBuffer
+from alert_checker import check_alerts, check_fleet_alerts, fleet_evaluation, has_active_alerts, send_alerts_batch
+from alert_engine import alert_engine
+from counter_rates import counter_rates
+from sensor_cache import sensor_cache
+from scheduler import PollScheduler
+from circuit_breaker import breakers, ErrorCounter, OPEN
+from sharding import ShardCoordinator
+from target_registry import TargetRegistry
+from rules_cache import rules_cache
 
 # Configuration du logging
 logging.basicConfig(
@@ -30,19 +42,38 @@ try:
     db = client.get_database()
     targets_collection = db["targets"]
     errors_collection = db["poll_errors"]
+    collectors_collection = db["collectors"]
     logger.info("Connecté à MongoDB Atlas")
 except Exception as e:
     logger.error(f"Erreur de connexion MongoDB: {e}")
     raise SystemExit(1)
 
-def execute_remote_script(ssh_client):
+# Cibles actives tenues à jour en mémoire (aucune lecture MongoDB par cycle)
+target_registry = TargetRegistry(targets_collection)
+
+# Répartition des serveurs entre les instances du collector
+shard = ShardCoordinator(collectors_collection) if Config.SHARDING_ENABLED else None
+
+# Erreurs de collecte comptées par serveur, écrites en un lot dans poll_errors
+error_counter = ErrorCounter(errors_collection, breakers)
+
+# Tampon des mesures envoyées par lots à /api/metrics/batch
+metrics_buffer = MetricsBuffer()
+
+# Tampon des alertes du cycle envoyées à /api/alerts/batch
+alerts_buffer = MetricsBuffer(sender=send_alerts_batch, max_pending=Config.ALERT_MAX_PENDING)
+
+# Mesures acceptées par le backend, en attente de l'évaluation vectorisée du cycle
+accepted_samples = deque()
+
+def execute_remote_script(ssh_client, script):
     """Exécuter le script de collecte sur le serveur distant"""
     try:
         # Configuration du stdin
         stdin, stdout, stderr = ssh_client.exec_command('python3', timeout=30)
 
         # Envoyer le script via stdin
-        stdin.write(REMOTE_SCRIPT)
+        stdin.write(script)
         stdin.channel.shutdown_write()
 
         output = stdout.read().decode('utf-8').strip()
@@ -71,22 +102,7 @@ def execute_remote_script(ssh_client):
 def send_metrics_to_backend(server_id, ip, metrics):
     """Envoyer les métriques au backend"""
     try:
-        # Préparer les données
-        network = metrics.get('network', {})
-        total_rx = sum(iface['rx_bytes'] for iface in network.values())
-        total_tx = sum(iface['tx_bytes'] for iface in network.values())
-
-        payload = {
-            'server_id': server_id,
-            'ip': ip,
-            'cpu_usage': metrics.get('cpu_usage', 0),
-            'memory_usage': metrics.get('memory_usage', 0),
-            'disk_usage': metrics.get('disk_usage', 0),
-            'cpu_temperature': metrics.get('cpu_temperature'),
-            'network_rx': total_rx,
-            'network_tx': total_tx,
-            'uptime': metrics.get('uptime', 0)
-        }
+        payload = build_metrics_payload(server_id, ip, metrics)
 
         # Envoyer au backend
         response = requests.post(
@@ -104,17 +120,64 @@ def send_metrics_to_backend(server_id, ip, metrics):
         return False
 
 def log_error(server_id, ip, error_message):
-    """Enregistrer une erreur dans MongoDB"""
+    """Compter une erreur de collecte (écrite par flush_errors) et alimenter le disjoncteur"""
+    error_counter.record(server_id, ip, error_message)
+    if breakers.failure(server_id):
+        logger.warning(
+            f"Disjoncteur ouvert pour {ip}: collectes suspendues "
+            f"{breakers.retry_in(server_id):.0f}s ({error_message})"
+        )
+
+def flush_errors():
+    """Écrire en un lot les compteurs d'erreurs en attente"""
     try:
-        error_doc = {
-            'server_id': server_id,
-            'ip': ip,
-            'error': error_message,
-            'timestamp': datetime.utcnow()
-        }
-        errors_collection.insert_one(error_doc)
+        written = error_counter.flush()
+        if written:
+            logger.info(f"Erreurs de collecte enregistrées pour {written} serveur(s)")
     except Exception as e:
-        logger.error(f"Erreur lors de l'enregistrement de l'erreur: {e}")
+        logger.error(f"Erreur lors de l'enregistrement des erreurs: {e}")
+
+def load_targets():
+    """Serveurs à collecter par cette instance"""
+    targets = target_registry.targets()
+    if shard is not None:
+        return shard.assigned(targets)
+    return targets
+
+def forget_removed_targets(targets):
+    """Oublier l'état en mémoire des serveurs retirés"""
+    ips = [target['ip'] for target in targets]
+    for cache in (alert_engine, counter_rates, sensor_cache, breakers):
+        cache.retain(ips)
+
+def evaluate_alerts(ip, metrics):
+    """Vérifier les alertes d'une mesure acceptée par le backend"""
+    if fleet_evaluation():
+        # Évaluées en une fois en fin de cycle (check_fleet_alerts)
+        accepted_samples.append((ip, metrics))
+        return
+
+    # Règles servies depuis le cache local, sans appel réseau en régime établi
+    alert_rules = rules_cache.get(ip)
+    if alert_rules:
+        check_alerts(ip, metrics, alert_rules, alerts_buffer if Config.METRICS_BATCHING else None)
+
+def process_metrics(ip, metrics):
+    """Envoyer une mesure au backend ; les alertes ne sont vérifiées que si elle est acceptée"""
+    sensor_cache.remember(ip, metrics)
+
+    if Config.METRICS_BATCHING:
+        # Envoi différé : la mesure part avec le lot du cycle, alertes après l'envoi du lot
+        metrics_buffer.add(
+            build_metrics_payload(ip, ip, metrics),
+            on_sent=lambda: evaluate_alerts(ip, metrics)
+        )
+        return True
+
+    success = send_metrics_to_backend(ip, ip, metrics)
+    if success:
+        evaluate_alerts(ip, metrics)
+    return success
 
 def collect_from_server(target):
     """Collecter les métriques d'un serveur"""
@@ -123,51 +186,36 @@ def collect_from_server(target):
     username = target.get('username', Config.SSH_USER)
     alias = target.get('alias', target.get('description', ip))  # Support alias/description
 
+    # Disjoncteur ouvert : serveur injoignable, aucune tentative avant le délai
+    if not breakers.allow(ip):
+        logger.debug(f"Collecte ignorée pour {ip}: disjoncteur ouvert")
+        return None
+
     logger.info(f"Collecte pour {alias} ({ip}:{port})")
 
-    ssh_client = None
     try:
-        # Connexion SSH
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-
-        # Tentative avec clé SSH
+        # Connexion SSH (réutilisée depuis le pool si le transport est actif)
         try:
-            ssh_client.connect(
-                hostname=ip,
-                port=port,
-                username=username,
-                key_filename=Config.SSH_KEY_PATH,
-                timeout=15,
-                banner_timeout=10
-            )
-            logger.info(f"Connecté en SSH à {ip}")
-
+            ssh_client = ssh_pool.get_client(ip, port, username)
         except Exception as ssh_error:
             logger.error(f"Échec connexion SSH à {ip}: {ssh_error}")
             log_error(ip, ip, f"SSH connection failed: {str(ssh_error)}")
             return None
 
-        # VÉRIFIER que ssh_client est bien connecté avant d'exécuter le script
-        if ssh_client.get_transport() is None or not ssh_client.get_transport().is_active():
-            logger.error(f"SSH transport non actif pour {ip}")
-            return None
-
         # Exécuter le script de collecte
-        metrics = execute_remote_script(ssh_client)
+        metrics = execute_remote_script(ssh_client, build_remote_script(sensor_cache.get(ip)))
 
         if not metrics:
             logger.warning(f"Aucune métrique collectée pour {ip}")
             log_error(ip, ip, "No metrics collected")
+            # Repartir d'une connexion neuve au prochain cycle
+            ssh_pool.invalidate(ip, port, username)
             return None
 
-        # Envoyer au backend
-        success = send_metrics_to_backend(ip, ip, metrics)
+        breakers.success(ip)
 
-        if success:
-            alert_rules = get_alert_rules(ip)
-            if alert_rules:
-                check_alerts(ip, metrics, alert_rules)
+        # Envoyer au backend et vérifier les alertes
+        process_metrics(ip, metrics)
 
         return {
             'ip': ip,
@@ -179,26 +227,21 @@ def collect_from_server(target):
     except Exception as e:
         logger.error(f"Erreur collecte pour {ip}: {e}")
         log_error(ip, ip, str(e))
+        ssh_pool.invalidate(ip, port, username)
         return None
 
-    finally:
-        if ssh_client:
-            try:
-                ssh_client.close()
-            except Exception:
-                pass
-
 def collect_all_targets():
     """Collecter les métriques de tous les serveurs actifs"""
     try:
-        # Chercher tous les targets (pas seulement enabled:True)
-        targets = list(targets_collection.find({}))
+        # Cibles actives du registre en mémoire (attribuées à cette instance)
+        targets = load_targets()
 
         if not targets:
             logger.warning("Aucun serveur à surveiller")
             return
 
         logger.info(f"{len(targets)} serveur(s) à surveiller")
+        forget_removed_targets(targets)
 
         # Collecte parallèle
         with ThreadPoolExecutor(max_workers=Config.MAX_WORKERS) as executor:
@@ -211,41 +254,184 @@ def collect_all_targets():
             error_count = 0
 
             for future in as_completed(futures):
-                result = future.result()
-                if result:
+                if future.result():
                     success_count += 1
                 else:
                     error_count += 1
 
             logger.info(f"Collecte terminée: {success_count} succès, {error_count} échecs")
 
+        # Un seul envoi pour toutes les mesures du cycle
+        metrics_buffer.flush()
+
+        if fleet_evaluation():
+            # Seules les mesures acceptées par le backend sont évaluées
+            samples = []
+            while accepted_samples:
+                samples.append(accepted_samples.popleft())
+            rules_cache.refresh_if_stale()
+            check_fleet_alerts(
+                samples,
+                lambda server_id: rules_cache.get(server_id, refresh=False),
+                alerts_buffer if Config.METRICS_BATCHING else None
+            )
+
+        alerts_buffer.flush()
+        flush_errors()
+        log_pool_stats()
+
     except Exception as e:
         logger.error(f"Erreur lors de la collecte: {e}")
 
+def log_pool_stats(evict=True):
+    """Fermer les connexions SSH inactives et journaliser l'état du pool"""
+    try:
+        evicted = ssh_pool.evict_idle() if evict else 0
+        stats = ssh_pool.stats()
+
+        handshakes = sum(s['handshakes'] for s in stats.values())
+        reuses = sum(s['reuses'] for s in stats.values())
+        connected = sum(1 for s in stats.values() if s['connected'])
+
+        logger.info(
+            f"Pool SSH: {connected} connexion(s) active(s), "
+            f"{handshakes} handshake(s), {reuses} réutilisation(s), {evicted} fermée(s)"
+        )
+        for host, host_stats in stats.items():
+            logger.debug(
+                f"Pool SSH {host}: {host_stats['handshakes']} handshake(s), "
+                f"{host_stats['reuses']} réutilisation(s)"
+            )
+
+    except Exception as e:
+        logger.error(f"Erreur statistiques pool SSH: {e}")
+
+def run_poll_mode():
+    """Mode "poll" : un cycle de collecte complet toutes les POLL_INTERVAL secondes"""
+    while True:
+        start_time = time.time()
+        logger.info("=" * 60)
+        collect_all_targets()
+
+        elapsed = time.time() - start_time
+        sleep_time = max(0, Config.POLL_INTERVAL - elapsed)
+        logger.info(f"Pause de {sleep_time:.1f}s avant la prochaine collecte")
+        time.sleep(sleep_time)
+
+def run_scheduled_mode():
+    """Mode "scheduled" : chaque serveur collecté à sa propre échéance"""
+    scheduler = PollScheduler(
+        collect=collect_from_server,
+        is_alerting=has_active_alerts,
+        retry_in=breakers.retry_in
+    )
+    scheduler.start()
+
+    try:
+        while True:
+            try:
+                targets = load_targets()
+                count = scheduler.sync(targets)
+                forget_removed_targets(targets)
+                flush_errors()
+                stats = scheduler.stats()
+                logger.info(
+                    f"{count} serveur(s) planifié(s), {stats['running']} collecte(s) en cours, "
+                    f"{stats['backing_off']} en recul, {breakers.stats()[OPEN]} disjoncteur(s) ouvert(s)"
+                )
+                log_pool_stats()
+            except Exception as e:
+                logger.error(f"Erreur synchronisation de l'ordonnanceur: {e}")
+
+            time.sleep(Config.SCHEDULER_SYNC_INTERVAL)
+    finally:
+        scheduler.stop()
+
+def run_stream_mode():
+    """Mode "stream" : agents résidents lus en continu, synchronisés périodiquement"""
+    def on_sample(target, metrics):
+        breakers.success(target['ip'])
+        process_metrics(target['ip'], metrics)
+
+    manager = AgentStreamManager(
+        on_sample=on_sample,
+        on_error=lambda target, message: log_error(target['ip'], target['ip'], message),
+        allow=breakers.allow
+    )
+    manager.start()
+
+    try:
+        while True:
+            try:
+                targets = load_targets()
+                active = manager.sync(targets)
+                forget_removed_targets(targets)
+                flush_errors()
+                logger.info(f"{active}/{len(targets)} agent(s) résident(s) actif(s)")
+                # Les connexions des agents restent ouvertes : pas d'éviction
+                log_pool_stats(evict=False)
+            except Exception as e:
+                logger.error(f"Erreur synchronisation des agents: {e}")
+
+            time.sleep(Config.STREAM_SYNC_INTERVAL)
+    finally:
+        manager.stop()
+
 def main():
     """Boucle principale du collector"""
     logger.info("Démarrage du Server Monitor Collector")
+    logger.info(f"Mode de collecte: {Config.COLLECTOR_MODE}")
     logger.info(f"Intervalle de collecte: {Config.POLL_INTERVAL}s")
-    logger.info(f"Workers max: {Config.MAX_WORKERS}")
+    if Config.COLLECTOR_MODE == 'async':
+        logger.info(f"Concurrence max: {Config.ASYNC_CONCURRENCY}")
+    else:
+        logger.info(f"Workers max: {Config.MAX_WORKERS}")
     logger.info(f"Clé SSH: {Config.SSH_KEY_PATH}")
     logger.info(f"Backend: {Config.BACKEND_URL}")
+    logger.info(f"Moteur d'alertes: {Config.ALERT_ENGINE}")
+    if Config.METRICS_BATCHING:
+        logger.info(
+            f"Envoi par lots: {Config.METRICS_BATCH_SIZE} mesures / "
+            f"{Config.METRICS_BATCH_MAX_DELAY_MS}ms"
+        )
 
-    try:
-        while True:
-            start_time = time.time()
-            logger.info("=" * 60)
-            collect_all_targets()
+    target_registry.start()
+    if shard is not None:
+        shard.start()
 
-            elapsed = time.time() - start_time
-            sleep_time = max(0, Config.POLL_INTERVAL - elapsed)
-            logger.info(f"Pause de {sleep_time:.1f}s avant la prochaine collecte")
-            time.sleep(sleep_time)
+    try:
+        if Config.COLLECTOR_MODE == 'scheduled':
+            metrics_buffer.start()
+            alerts_buffer.start()
+            run_scheduled_mode()
+        elif Config.COLLECTOR_MODE == 'stream':
+            metrics_buffer.start()
+            alerts_buffer.start()
+            run_stream_mode()
+        elif Config.COLLECTOR_MODE == 'async':
+            # Import local : asyncssh/aiohttp ne sont requis que pour ce mode
+            from async_collector import run_async_mode
+            run_async_mode(
+                load_targets=load_targets,
+                on_error=log_error,
+                on_cycle=flush_errors
+            )
+        else:
+            run_poll_mode()
 
     except KeyboardInterrupt:
         logger.info("\nArrêt du collector (Ctrl+C)")
     except Exception as e:
         logger.error(f"Erreur fatale: {e}")
         raise
+    finally:
+        metrics_buffer.stop()
+        alerts_buffer.stop()
+        flush_errors()
+        if shard is not None:
+            shard.stop()
+        target_registry.stop()
+        ssh_pool.close_all()
 
 if __name__ == '__main__':
     main()
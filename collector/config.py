@@ -17,9 +17,80 @@ class Config:
     SSH_USER = os.getenv("SSH_USER", "ben")
     SSH_KEY_PATH = os.path.expanduser(os.getenv("SSH_KEY_PATH", "~/.ssh/apmf_key"))
 
+    # Pool de connexions SSH persistantes
+    SSH_IDLE_TIMEOUT = int(os.getenv("SSH_IDLE_TIMEOUT", "300"))
+    SSH_KEEPALIVE = int(os.getenv("SSH_KEEPALIVE", "30"))
+    SSH_BACKOFF_BASE = float(os.getenv("SSH_BACKOFF_BASE", "5"))
+    SSH_BACKOFF_MAX = float(os.getenv("SSH_BACKOFF_MAX", "300"))
+
     # Polling
     POLL_INTERVAL = int(os.getenv("POLL_INTERVAL_SECONDS", "5"))
     MAX_WORKERS = int(os.getenv("POLL_MAX_WORKERS", "5"))
 
+    # Mode de collecte: "poll" (cycle global sur tous les serveurs, par défaut comme
+    # avant), "scheduled" (échéance propre à chaque serveur), "stream" (agent résident)
+    # ou "async" (moteur asyncio)
+    COLLECTOR_MODE = os.getenv("COLLECTOR_MODE", "poll").lower()
+    STREAM_SYNC_INTERVAL = int(os.getenv("STREAM_SYNC_INTERVAL", "30"))
+
+    # Ordonnanceur par serveur (mode "scheduled")
+    ALERT_POLL_INTERVAL = float(os.getenv("ALERT_POLL_INTERVAL_SECONDS", str(max(1, POLL_INTERVAL // 2))))
+    SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+    SCHEDULER_BACKOFF_MAX = float(os.getenv("SCHEDULER_BACKOFF_MAX", "300"))
+    SCHEDULER_SYNC_INTERVAL = int(os.getenv("SCHEDULER_SYNC_INTERVAL", "30"))
+
+    # Cache des règles d'alerte
+    RULES_REFRESH_SECONDS = int(os.getenv("RULES_REFRESH_SECONDS", "30"))
+    RULES_FULL_REFRESH_SECONDS = int(os.getenv("RULES_FULL_REFRESH_SECONDS", "600"))
+
+    # Registre des cibles : change stream MongoDB, sinon rechargement périodique
+    TARGETS_CHANGE_STREAM = os.getenv("TARGETS_CHANGE_STREAM", "true").lower() in ("1", "true", "yes")
+    TARGETS_REFRESH_SECONDS = int(os.getenv("TARGETS_REFRESH_SECONDS", "30"))
+
+    # Plusieurs collectors : serveurs répartis par hachage cohérent
+    SHARDING_ENABLED = os.getenv("SHARDING_ENABLED", "false").lower() in ("1", "true", "yes")
+    COLLECTOR_ID = os.getenv("COLLECTOR_ID")
+    SHARD_HEARTBEAT_INTERVAL = float(os.getenv("SHARD_HEARTBEAT_INTERVAL", "10"))
+    SHARD_HEARTBEAT_TIMEOUT = float(os.getenv("SHARD_HEARTBEAT_TIMEOUT", "30"))
+    SHARD_VNODES = int(os.getenv("SHARD_VNODES", "100"))
+
+    # Disjoncteur par serveur
+    BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    BREAKER_OPEN_MAX = float(os.getenv("BREAKER_OPEN_MAX", "900"))
+
+    # Capteur de température découvert une fois par serveur, redécouvert après ce délai
+    SENSOR_CACHE_TTL = int(os.getenv("SENSOR_CACHE_TTL", "86400"))
+
+    # Évaluation des alertes: "stateless" (seuil par mesure, par défaut comme avant),
+    # "stateful" (hystérésis, durée, dérivée) ou "vectorized" (seuils évalués en une
+    # fois sur tout le cycle avec NumPy)
+    ALERT_ENGINE = os.getenv("ALERT_ENGINE", "stateless").lower()
+    ALERT_HYSTERESIS = float(os.getenv("ALERT_HYSTERESIS", "5"))
+    ALERT_FOR_SECONDS = float(os.getenv("ALERT_FOR_SECONDS", "0"))
+    ALERT_AVG_SAMPLES = int(os.getenv("ALERT_AVG_SAMPLES", "1"))
+    ALERT_WINDOW_SIZE = int(os.getenv("ALERT_WINDOW_SIZE", "720"))
+    ALERT_WINDOW_SECONDS = float(os.getenv("ALERT_WINDOW_SECONDS", "3600"))
+    # Règle de remplissage du disque en % par heure (0 pour la désactiver)
+    ALERT_DISK_FILL_RATE = float(os.getenv("ALERT_DISK_FILL_RATE", "0"))
+    ALERT_RATE_WINDOW_SECONDS = float(os.getenv("ALERT_RATE_WINDOW_SECONDS", "900"))
+    ALERT_RATE_CLEAR_RATIO = float(os.getenv("ALERT_RATE_CLEAR_RATIO", "0.5"))
+    # Rappel de l'état d'une alerte déclenchée (et d'un retour à la normale, une fois)
+    # si son envoi a été perdu (0 pour le désactiver)
+    ALERT_REASSERT_SECONDS = float(os.getenv("ALERT_REASSERT_SECONDS", "300"))
+    # Alertes non envoyées gardées pour le lot suivant (backend indisponible)
+    ALERT_MAX_PENDING = int(os.getenv("ALERT_MAX_PENDING", "5000"))
+
+    # Envoi des métriques par lots (/api/metrics/batch), désactivé par défaut :
+    # une requête par mesure comme avant
+    METRICS_BATCHING = os.getenv("METRICS_BATCHING", "false").lower() in ("1", "true", "yes")
+    METRICS_BATCH_SIZE = int(os.getenv("METRICS_BATCH_SIZE", "500"))
+    METRICS_BATCH_MAX_DELAY_MS = int(os.getenv("METRICS_BATCH_MAX_DELAY_MS", "1000"))
+
+    # Moteur asyncio
+    ASYNC_CONCURRENCY = int(os.getenv("ASYNC_CONCURRENCY", "500"))
+    ASYNC_HOST_TIMEOUT = float(os.getenv("ASYNC_HOST_TIMEOUT", "45"))
+    ASYNC_HTTP_CONNECTIONS = int(os.getenv("ASYNC_HTTP_CONNECTIONS", "100"))
+
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
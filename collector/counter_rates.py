@@ -0,0 +1,92 @@
+"""
+Conversion des compteurs cumulés du script distant en débits (par seconde).
+
+Le collector garde, par serveur, la dernière valeur de chaque compteur, la
+date de la mesure et l'uptime. Un compteur qui diminue sans redémarrage
+n'est un rebouclage (32 ou 64 bits) que si sa valeur précédente était dans
+le dernier quart de sa plage et la nouvelle dans le premier ; sinon c'est
+une remise à zéro (interface recréée, pilote rechargé, conteneur redémarré)
+et le compteur repart comme nouvelle référence, sans débit. Une baisse de
+l'uptime signale un redémarrage : aucun débit n'est calculé.
+"""
+
+import time
+import threading
+from datetime import datetime
+
+WRAP_32 = 2 ** 32
+WRAP_64 = 2 ** 64
+
+
+def sample_time(metrics):
+    """Date de la mesure côté serveur distant, à défaut date de réception"""
+    try:
+        return datetime.fromisoformat(metrics['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        return time.time()
+
+
+def counter_delta(previous, current):
+    """Écart entre deux lectures d'un compteur, rebouclage compris (None si remis à zéro)"""
+    if current >= previous:
+        return current - previous
+    wrap = WRAP_32 if previous < WRAP_32 else WRAP_64
+    if previous >= wrap - wrap // 4 and current < wrap // 4:
+        return current + wrap - previous
+    return None
+
+
+class CounterRates:
+    """Derniers compteurs de chaque serveur"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous = {}
+
+    def forget(self, server_id):
+        with self._lock:
+            self._previous.pop(server_id, None)
+
+    def retain(self, server_ids):
+        """Oublier les serveurs qui ne sont plus surveillés"""
+        server_ids = set(server_ids)
+        with self._lock:
+            for server_id in list(self._previous):
+                if server_id not in server_ids:
+                    del self._previous[server_id]
+
+    def rates(self, server_id, counters, timestamp, uptime=None):
+        """
+        Débits par seconde des compteurs {nom: valeur} depuis la mesure précédente.
+        Retourne None pour la première mesure, après un redémarrage ou si la
+        mesure n'est pas plus récente que la précédente.
+        """
+        with self._lock:
+            previous = self._previous.get(server_id)
+            self._previous[server_id] = {'time': timestamp, 'uptime': uptime, 'counters': counters}
+
+        if previous is None:
+            return None
+
+        elapsed = timestamp - previous['time']
+        if elapsed <= 0:
+            return None
+
+        # Uptime qui recule : le serveur a redémarré et ses compteurs sont repartis de zéro
+        if uptime is not None and previous['uptime'] is not None and uptime < previous['uptime']:
+            return None
+
+        rates = {}
+        for name, value in counters.items():
+            before = previous['counters'].get(name)
+            # Nouvelle interface ou nouveau disque : pas encore de référence
+            if before is None:
+                continue
+            delta = counter_delta(before, value)
+            if delta is None:
+                continue
+            rates[name] = delta / elapsed
+        return rates
+
+
+counter_rates = CounterRates()
@@ -0,0 +1,121 @@
+"""
+Tampon d'écriture des métriques côté collector.
+
+Les mesures d'un cycle sont regroupées et envoyées en une seule requête à
+/api/metrics/batch, dès que le lot atteint METRICS_BATCH_SIZE mesures ou que
+la plus ancienne attend depuis METRICS_BATCH_MAX_DELAY_MS millisecondes.
+Le même tampon, avec un autre `sender`, regroupe les alertes du cycle.
+Une mesure peut être accompagnée d'un rappel `on_sent`, exécuté seulement
+quand le lot qui la contient a été accepté par le backend.
+"""
+
+import time
+import logging
+import threading
+import requests
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def send_metrics_batch(payloads):
+    """Envoyer un lot de mesures au backend"""
+    try:
+        response = requests.post(
+            f"{Config.BACKEND_URL}/api/metrics/batch",
+            json=payloads,
+            timeout=30
+        )
+        response.raise_for_status()
+        logger.info(f"Lot de {len(payloads)} mesure(s) envoyé au backend")
+        return True
+
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Erreur envoi lot de {len(payloads)} mesure(s): {e}")
+        return False
+
+
+class MetricsBuffer:
+    """Accumule les mesures et les envoie par lots"""
+
+    def __init__(self, max_size=None, max_delay_ms=None, sender=send_metrics_batch, max_pending=None):
+        self.max_size = max_size or Config.METRICS_BATCH_SIZE
+        self.max_delay = (max_delay_ms or Config.METRICS_BATCH_MAX_DELAY_MS) / 1000.0
+        self.sender = sender
+        # Avec max_pending, un lot refusé est remis en tête du tampon (dans la limite de max_pending)
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._items = []
+        self._first_at = None
+        self._stop = threading.Event()
+        self._timer = None
+
+    def add(self, payload, on_sent=None):
+        """Ajouter une mesure, et envoyer le lot s'il est plein"""
+        with self._lock:
+            if not self._items:
+                self._first_at = time.monotonic()
+            self._items.append((payload, on_sent))
+            full = len(self._items) >= self.max_size
+
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Envoyer immédiatement les mesures en attente"""
+        with self._lock:
+            items, self._items = self._items, []
+            self._first_at = None
+
+        if not items:
+            return True
+
+        # Respecter la taille maximale même si le tampon a débordé entre-temps
+        ok = True
+        for start in range(0, len(items), self.max_size):
+            chunk = items[start:start + self.max_size]
+            if not self.sender([payload for payload, _on_sent in chunk]):
+                ok = False
+                if self.max_pending:
+                    # Backend indisponible : ce lot et les suivants repartiront plus tard
+                    self._requeue(items[start:])
+                    break
+                continue
+            for _payload, on_sent in chunk:
+                if on_sent is None:
+                    continue
+                try:
+                    on_sent()
+                except Exception as e:
+                    logger.error(f"Erreur après envoi du lot: {e}")
+        return ok
+
+    def _requeue(self, items):
+        with self._lock:
+            pending = items + self._items
+            dropped = len(pending) - self.max_pending
+            if dropped > 0:
+                # Garder les plus récents
+                logger.warning(f"Tampon plein: {dropped} élément(s) non envoyé(s) abandonné(s)")
+                pending = pending[dropped:]
+            self._items = pending
+            self._first_at = time.monotonic()
+
+    def _flush_when_due(self):
+        while not self._stop.wait(min(self.max_delay, 0.5)):
+            with self._lock:
+                due = self._first_at is not None and time.monotonic() - self._first_at >= self.max_delay
+            if due:
+                self.flush()
+
+    def start(self):
+        """Démarrer l'envoi périodique (délai maximal d'attente d'une mesure)"""
+        self._timer = threading.Thread(target=self._flush_when_due, name="metrics-buffer", daemon=True)
+        self._timer.start()
+
+    def stop(self):
+        """Arrêter l'envoi périodique et vider le tampon"""
+        self._stop.set()
+        if self._timer:
+            self._timer.join(timeout=5)
+        self.flush()
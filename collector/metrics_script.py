@@ -3,34 +3,37 @@ Script exécuté à distance sur les serveurs Linux pour collecter les métrique
 Ce script est autonome et ne nécessite aucune dépendance externe.
 """
 
-REMOTE_SCRIPT = r"""
+REMOTE_FUNCTIONS = r"""
 import os
 import time
 import json
 import subprocess
 from datetime import datetime, timezone
 
-def cpu_percent(interval=0.7):
-    '''Calculer l'utilisation CPU'''
-    def read_cpu():
-        with open("/proc/stat") as f:
-            for line in f:
-                if line.startswith("cpu "):
-                    parts = line.split()
-                    # user, nice, system, idle, iowait, irq, softirq, steal
-                    return {
-                        'user': int(parts[1]),
-                        'nice': int(parts[2]),
-                        'system': int(parts[3]),
-                        'idle': int(parts[4]),
-                        'iowait': int(parts[5]) if len(parts) > 5 else 0,
-                    }
-        return None
-
-    cpu1 = read_cpu()
-    time.sleep(interval)
-    cpu2 = read_cpu()
-
+def read_cpu_snapshot():
+    '''Lire les compteurs CPU de /proc/stat : agrégé ("cpu") et par cœur ("cpu0", ...)'''
+    snapshot = {}
+    with open("/proc/stat") as f:
+        for line in f:
+            if not line.startswith("cpu"):
+                break
+            parts = line.split()
+            # user, nice, system, idle, iowait, irq, softirq, steal
+            snapshot[parts[0]] = {
+                'user': int(parts[1]),
+                'nice': int(parts[2]),
+                'system': int(parts[3]),
+                'idle': int(parts[4]),
+                'iowait': int(parts[5]) if len(parts) > 5 else 0,
+            }
+    return snapshot
+
+def read_cpu_times():
+    '''Lire les compteurs CPU agrégés de /proc/stat'''
+    return read_cpu_snapshot().get('cpu')
+
+def cpu_percent_between(cpu1, cpu2):
+    '''Utilisation CPU entre deux lectures de /proc/stat'''
     if not cpu1 or not cpu2:
         return 0.0
 
@@ -40,22 +43,46 @@ def cpu_percent(interval=0.7):
     idle_delta = cpu2['idle'] - cpu1['idle']
     total_delta = total2 - total1
 
-    if total_delta == 0:
+    if total_delta <= 0:
         return 0.0
 
     usage = 100.0 * (1.0 - idle_delta / total_delta)
     return round(usage, 2)
 
-def memory_percent():
-    '''Calculer l'utilisation mémoire'''
+def cpu_cores_between(snapshot1, snapshot2):
+    '''Utilisation de chaque cœur entre deux lectures, dans l'ordre cpu0, cpu1...'''
+    cores = sorted((k for k in snapshot2 if k != 'cpu'), key=lambda k: int(k[3:]))
+    return [cpu_percent_between(snapshot1.get(core), snapshot2[core]) for core in cores]
+
+def cpu_percent(interval=0.7):
+    '''Calculer l'utilisation CPU'''
+    cpu1 = read_cpu_times()
+    time.sleep(interval)
+    cpu2 = read_cpu_times()
+    return cpu_percent_between(cpu1, cpu2)
+
+def load_average():
+    '''Charge moyenne sur 1, 5 et 15 minutes'''
+    try:
+        with open("/proc/loadavg") as f:
+            parts = f.read().split()
+        return float(parts[0]), float(parts[1]), float(parts[2])
+    except Exception:
+        return None, None, None
+
+def read_meminfo():
+    '''Lire /proc/meminfo (valeurs en ko)'''
+    meminfo = {}
     with open("/proc/meminfo") as f:
-        meminfo = {}
         for line in f:
             parts = line.split()
             if len(parts) >= 2:
-                key = parts[0].rstrip(':')
-                value = int(parts[1])
-                meminfo[key] = value
+                meminfo[parts[0].rstrip(':')] = int(parts[1])
+    return meminfo
+
+def memory_percent(meminfo=None):
+    '''Calculer l'utilisation mémoire'''
+    meminfo = meminfo or read_meminfo()
 
     total = meminfo.get('MemTotal', 1)
     available = meminfo.get('MemAvailable', meminfo.get('MemFree', 0))
@@ -65,6 +92,15 @@ def memory_percent():
 
     return round(percent, 2)
 
+def swap_percent(meminfo=None):
+    '''Calculer l'utilisation du swap (None sans swap)'''
+    meminfo = meminfo or read_meminfo()
+    total = meminfo.get('SwapTotal', 0)
+    if total <= 0:
+        return None
+    used = total - meminfo.get('SwapFree', 0)
+    return round(used / total * 100, 2)
+
 def disk_usage(path='/'):
     '''Calculer l'utilisation disque'''
     try:
@@ -77,10 +113,127 @@ def disk_usage(path='/'):
     except Exception:
         return 0.0
 
-def cpu_temperature():
-    '''Lire la température CPU'''
-    temp = None
+# Systèmes de fichiers réels (les pseudo-systèmes comme proc, tmpfs, overlay sont ignorés)
+REAL_FILESYSTEMS = ('ext2', 'ext3', 'ext4', 'xfs', 'btrfs', 'zfs', 'vfat', 'exfat', 'ntfs', 'f2fs', 'jfs', 'reiserfs')
+
+def mount_usage():
+    '''Utilisation de chaque point de montage d'un système de fichiers réel'''
+    mounts = []
+    seen = set()
+    try:
+        with open("/proc/mounts") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 3 or parts[2] not in REAL_FILESYSTEMS or parts[0] in seen:
+                    continue
+                seen.add(parts[0])
+                # Les espaces des chemins sont encodés en octal (\040)
+                mount = parts[1].replace('\\040', ' ')
+                try:
+                    stat = os.statvfs(mount)
+                except OSError:
+                    continue
+                total = stat.f_blocks * stat.f_frsize
+                if total <= 0:
+                    continue
+                free = stat.f_bavail * stat.f_frsize
+                mounts.append({
+                    'mount': mount,
+                    'device': parts[0],
+                    'fstype': parts[2],
+                    'total': total,
+                    'used': total - free,
+                    'percent': round((total - free) / total * 100, 2)
+                })
+    except Exception:
+        pass
+    return mounts
+
+def disk_io_counters():
+    '''Compteurs cumulés de /proc/diskstats pour les disques entiers (pas les partitions)'''
+    counters = {}
+    try:
+        disks = set(os.listdir("/sys/block"))
+        with open("/proc/diskstats") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) < 14:
+                    continue
+                name = parts[2]
+                if name not in disks or name.startswith(('loop', 'ram', 'zram')):
+                    continue
+                counters[name] = {
+                    'reads': int(parts[3]),
+                    'read_bytes': int(parts[5]) * 512,
+                    'writes': int(parts[7]),
+                    'write_bytes': int(parts[9]) * 512,
+                    'io_ms': int(parts[12])
+                }
+    except Exception:
+        pass
+    return counters
+
+def pressure_stall():
+    '''Pression (PSI) cpu, mémoire et E/S : moyennes 10s/60s et total cumulé (µs)'''
+    pressure = {}
+    for resource in ('cpu', 'memory', 'io'):
+        try:
+            with open(f"/proc/pressure/{resource}") as f:
+                for line in f:
+                    parts = line.split()
+                    values = dict(p.split('=') for p in parts[1:])
+                    pressure.setdefault(resource, {})[parts[0]] = {
+                        'avg10': float(values['avg10']),
+                        'avg60': float(values['avg60']),
+                        'total': int(values['total'])
+                    }
+        except Exception:
+            continue
+    return pressure
+
+def read_temperature_file(path):
+    '''Lire un fichier de température sysfs (millidegrés), None si invalide'''
+    try:
+        with open(path) as f:
+            temp = int(f.read().strip()) / 1000.0
+        if 0 < temp < 150:  # Validation
+            return round(temp, 1)
+    except Exception:
+        pass
+    return None
+
+def read_lm_sensors():
+    '''Température via lm-sensors (commande sensors -A)'''
+    try:
+        result = subprocess.run(
+            ['sensors', '-A'],
+            capture_output=True,
+            text=True,
+            timeout=2
+        )
+
+        if result.returncode == 0:
+            for line in result.stdout.split('\n'):
+                if 'Package id 0:' in line or 'Tdie:' in line or 'Core 0:' in line:
+                    parts = line.split('+')
+                    if len(parts) > 1:
+                        temp_str = parts[1].split('°')[0].strip()
+                        try:
+                            temp = float(temp_str)
+                            if 0 < temp < 150:
+                                return round(temp, 1)
+                        except ValueError:
+                            continue
+    except Exception:
+        pass
+
+    return None
 
+def discover_temperature_sensor():
+    '''
+    Chercher le capteur de température CPU une fois pour toutes.
+    Retourne le chemin du fichier sysfs, "sensors" (lm-sensors) ou "none".
+    '''
     # Méthode 1: hwmon (la plus fiable)
     hwmon_base = "/sys/class/hwmon"
     if os.path.exists(hwmon_base):
@@ -95,17 +248,10 @@ def cpu_temperature():
 
                 # Chercher les capteurs CPU
                 if any(x in name.lower() for x in ['coretemp', 'k10temp', 'cpu', 'package']):
-                    # Chercher temp1_input ou temp2_input
                     for temp_file in ['temp1_input', 'temp2_input', 'temp3_input']:
                         temp_path = os.path.join(hwmon_path, temp_file)
-                        if os.path.exists(temp_path):
-                            try:
-                                with open(temp_path) as f:
-                                    temp = int(f.read().strip()) / 1000.0
-                                    if 0 < temp < 150:  # Validation
-                                        return round(temp, 1)
-                            except Exception:
-                                continue
+                        if read_temperature_file(temp_path) is not None:
+                            return temp_path
 
     # Méthode 2: thermal_zone
     thermal_base = "/sys/class/thermal"
@@ -119,40 +265,36 @@ def cpu_temperature():
                     try:
                         with open(type_file) as f:
                             zone_type = f.read().strip().lower()
-
-                        if any(x in zone_type for x in ['cpu', 'x86_pkg', 'package', 'core']):
-                            with open(temp_file) as f:
-                                temp = int(f.read().strip()) / 1000.0
-                                if 0 < temp < 150:
-                                    return round(temp, 1)
                     except Exception:
                         continue
 
+                    if any(x in zone_type for x in ['cpu', 'x86_pkg', 'package', 'core']):
+                        if read_temperature_file(temp_file) is not None:
+                            return temp_file
+
     # Méthode 3: lm-sensors (via commande)
-    try:
-        result = subprocess.run(
-            ['sensors', '-A'],
-            capture_output=True,
-            text=True,
-            timeout=2
-        )
+    if read_lm_sensors() is not None:
+        return "sensors"
 
-        if result.returncode == 0:
-            for line in result.stdout.split('\n'):
-                if 'Package id 0:' in line or 'Tdie:' in line or 'Core 0:' in line:
-                    parts = line.split('+')
-                    if len(parts) > 1:
-                        temp_str = parts[1].split('°')[0].strip()
-                        try:
-                            temp = float(temp_str)
-                            if 0 < temp < 150:
-                                return round(temp, 1)
-                        except ValueError:
-                            continue
-    except Exception:
-        pass
+    return "none"
 
-    return None
+def cpu_temperature(sensor=None):
+    '''
+    Lire la température CPU depuis le capteur connu (découvert si None).
+    Retourne (température, capteur) ; le capteur vaut None s'il ne répond
+    plus, pour qu'il soit recherché à nouveau.
+    '''
+    if sensor is None:
+        sensor = discover_temperature_sensor()
+
+    if sensor == "none":
+        return None, sensor
+    if sensor == "sensors":
+        temp = read_lm_sensors()
+    else:
+        temp = read_temperature_file(sensor)
+
+    return temp, (sensor if temp is not None else None)
 
 def network_stats():
     '''Lire les statistiques réseau'''
@@ -191,20 +333,91 @@ def get_uptime():
     except Exception:
         return 0
 
-def collect_metrics():
-    '''Collecter toutes les métriques'''
+def collect_metrics(cpu_before=None, cpu_after=None):
+    '''
+    Collecter toutes les métriques en une passe.
+    Le CPU est calculé entre deux lectures de /proc/stat : fournies par
+    l'agent résident, ou faites ici à 0.7s d'intervalle.
+    '''
+    if cpu_before is None or cpu_after is None:
+        cpu_before = read_cpu_snapshot()
+        time.sleep(0.7)
+        cpu_after = read_cpu_snapshot()
+
+    meminfo = read_meminfo()
+    load_1, load_5, load_15 = load_average()
+    temperature, sensor = cpu_temperature(globals().get('SENSOR_HINT'))
+
     return {
         'timestamp': datetime.now(timezone.utc).isoformat(),
-        'cpu_usage': cpu_percent(interval=0.7),
-        'memory_usage': memory_percent(),
+        'cpu_usage': cpu_percent_between(cpu_before.get('cpu'), cpu_after.get('cpu')),
+        'cpu_cores': cpu_cores_between(cpu_before, cpu_after),
+        'load_1': load_1,
+        'load_5': load_5,
+        'load_15': load_15,
+        'memory_usage': memory_percent(meminfo),
+        'swap_usage': swap_percent(meminfo),
         'disk_usage': disk_usage('/'),
-        'cpu_temperature': cpu_temperature(),
+        'mounts': mount_usage(),
+        'disk_io': disk_io_counters(),
+        'pressure': pressure_stall(),
+        'cpu_temperature': temperature,
+        'temperature_sensor': sensor,
         'network': network_stats(),
         'uptime': get_uptime()
     }
+"""
 
+# Exécution unique : une mesure par connexion (mode "poll").
+# SENSOR_HINT (capteur de température déjà découvert) est ajouté par build_remote_script.
+REMOTE_SCRIPT = REMOTE_FUNCTIONS + r"""
 # Point d'entrée
 if __name__ == '__main__':
     metrics = collect_metrics()
     print(json.dumps(metrics))
 """
+
+# Agent résident : une ligne JSON par intervalle sur le même canal (mode "stream").
+# Le CPU est calculé entre deux lectures successives de /proc/stat, sans sleep bloquant.
+AGENT_SCRIPT_TEMPLATE = REMOTE_FUNCTIONS + r"""
+import sys
+
+def run_agent(interval):
+    previous = read_cpu_snapshot()
+    time.sleep(min(interval, 1.0))
+
+    while True:
+        started = time.time()
+        current = read_cpu_snapshot()
+        metrics = collect_metrics(cpu_before=previous, cpu_after=current)
+        previous = current
+        # Capteur découvert une fois, puis simple lecture de fichier
+        globals()['SENSOR_HINT'] = metrics['temperature_sensor']
+
+        try:
+            sys.stdout.write(json.dumps(metrics) + "\n")
+            sys.stdout.flush()
+        except (BrokenPipeError, OSError):
+            # Le collector a fermé le canal
+            break
+
+        time.sleep(max(0.0, interval - (time.time() - started)))
+
+if __name__ == '__main__':
+    run_agent(AGENT_INTERVAL)
+"""
+
+
+def sensor_prefix(sensor):
+    """Capteur de température connu transmis au script (None : à découvrir)"""
+    return f"SENSOR_HINT = {sensor!r}\n" if sensor else ""
+
+
+def build_remote_script(sensor=None):
+    """Script de collecte unique, avec le capteur de température déjà découvert"""
+    return sensor_prefix(sensor) + REMOTE_SCRIPT
+
+
+def build_agent_script(interval, sensor=None):
+    """Script de l'agent résident avec son intervalle d'émission"""
+    return f"AGENT_INTERVAL = {float(interval)!r}\n" + sensor_prefix(sensor) + AGENT_SCRIPT_TEMPLATE
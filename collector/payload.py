@@ -0,0 +1,113 @@
+"""
+Mise en forme des mesures brutes du script distant pour l'API du backend.
+Partagé par tous les moteurs de collecte (poll, stream, async).
+
+Les compteurs cumulés (réseau, E/S disque, PSI) sont convertis en débits
+depuis la mesure précédente du même serveur. Les autres champs du script
+distant sont transmis tels quels et stockés par le backend, qui n'admet que
+des valeurs numériques ou textes courts, éventuellement dans des listes ou
+objets peu imbriqués (build_metric_document de routes/metrics.py).
+"""
+
+from datetime import datetime, timezone
+from counter_rates import counter_rates, sample_time
+
+# Champs bruts remplacés par leurs débits, les champs psi_* (ou par la date de collecte)
+RAW_FIELDS = ('timestamp', 'network', 'disk_io', 'pressure')
+
+# Débits par disque : (compteur de /proc/diskstats, champ produit)
+DISK_RATES = (
+    ('reads', 'read_iops'),
+    ('writes', 'write_iops'),
+    ('read_bytes', 'read_bps'),
+    ('write_bytes', 'write_bps'),
+)
+
+
+def field_key(name):
+    # Les points sont interdits dans les noms de champs interrogeables (eth0.100)
+    return name.replace('.', '_')
+
+
+def gather_counters(metrics):
+    """Tous les compteurs cumulés d'une mesure, pour un seul calcul de débits"""
+    counters = {}
+    for iface, stats in metrics.get('network', {}).items():
+        counters[('net', iface, 'rx')] = stats['rx_bytes']
+        counters[('net', iface, 'tx')] = stats['tx_bytes']
+    for disk, stats in metrics.get('disk_io', {}).items():
+        for name, value in stats.items():
+            counters[('disk', disk, name)] = value
+    for resource, kinds in metrics.get('pressure', {}).items():
+        for kind, stats in kinds.items():
+            counters[('psi', resource, kind)] = stats['total']
+    return counters
+
+
+def derived_rates(server_id, metrics):
+    """Champs de débit calculés depuis la mesure précédente (vides à la première)"""
+    rates = counter_rates.rates(
+        server_id, gather_counters(metrics), sample_time(metrics), metrics.get('uptime')
+    )
+    if rates is None:
+        rates = {}
+
+    interfaces = {}
+    disks = {}
+    fields = {}
+
+    for (kind, name, counter), rate in rates.items():
+        if kind == 'net':
+            interfaces.setdefault(field_key(name), {})[f'{counter}_rate'] = round(rate, 1)
+        elif kind == 'disk':
+            disk = disks.setdefault(field_key(name), {})
+            if counter == 'io_ms':
+                # Temps d'activité du disque en % de l'intervalle
+                disk['util'] = round(min(rate / 10.0, 100.0), 2)
+            for source, target in DISK_RATES:
+                if counter == source:
+                    disk[target] = round(rate, 1)
+        elif kind == 'psi':
+            # Total en µs de blocage : µs/s -> % du temps
+            fields[f'psi_{name}_{counter}'] = round(rate / 10000.0, 2)
+
+    # Premier échantillon : moyennes 10s fournies par le noyau
+    for resource, kinds in metrics.get('pressure', {}).items():
+        for kind, stats in kinds.items():
+            fields.setdefault(f'psi_{resource}_{kind}', stats['avg10'])
+
+    has_rates = bool(rates)
+    fields.update({
+        'network_rx_rate': round(sum(i.get('rx_rate', 0) for i in interfaces.values()), 1) if has_rates else None,
+        'network_tx_rate': round(sum(i.get('tx_rate', 0) for i in interfaces.values()), 1) if has_rates else None,
+        'network_interfaces': interfaces,
+        'disks': disks,
+    })
+    for _source, target in DISK_RATES:
+        fields[f'disk_{target}'] = round(sum(d.get(target, 0) for d in disks.values()), 1) if has_rates else None
+    return fields
+
+
+def build_metrics_payload(server_id, ip, metrics):
+    """Construire le document envoyé à /api/metrics"""
+    network = metrics.get('network', {})
+
+    payload = {k: v for k, v in metrics.items() if k not in RAW_FIELDS}
+    payload.update({
+        'server_id': server_id,
+        'ip': ip,
+        'cpu_usage': metrics.get('cpu_usage', 0),
+        'memory_usage': metrics.get('memory_usage', 0),
+        'disk_usage': metrics.get('disk_usage', 0),
+        'cpu_temperature': metrics.get('cpu_temperature'),
+        # Compteurs cumulés (octets depuis le démarrage)
+        'network_rx': sum(iface['rx_bytes'] for iface in network.values()),
+        'network_tx': sum(iface['tx_bytes'] for iface in network.values()),
+        'uptime': metrics.get('uptime', 0),
+        # Date de collecte (horloge du collector) : conservée par le backend
+        # même si la mesure part plus tard avec un lot
+        'timestamp': datetime.now(timezone.utc).isoformat()
+    })
+    # Débits (par seconde) depuis la mesure précédente
+    payload.update(derived_rates(server_id, metrics))
+    return payload
@@ -0,0 +1,95 @@
+"""
+Cache des règles d'alerte côté collector.
+
+Toutes les règles sont chargées en une requête (/api/alerts/rules), puis
+seules les règles modifiées depuis la dernière version sont redemandées
+toutes les RULES_REFRESH_SECONDS. Un rechargement complet a lieu toutes les
+RULES_FULL_REFRESH_SECONDS. Entre deux rafraîchissements, l'évaluation des
+alertes ne fait aucun appel réseau.
+"""
+
+import time
+import logging
+import threading
+import requests
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class AlertRulesCache:
+    def __init__(self, refresh_interval=None, full_refresh_interval=None):
+        self.refresh_interval = refresh_interval or Config.RULES_REFRESH_SECONDS
+        self.full_refresh_interval = full_refresh_interval or Config.RULES_FULL_REFRESH_SECONDS
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self._rules = {}
+        self._defaults = None
+        self._version = None
+        self._refreshed_at = None
+        self._full_refreshed_at = None
+        self._retry_at = 0.0
+
+    def _fetch(self, since=None):
+        params = {'since': since} if since else None
+        response = requests.get(f"{Config.BACKEND_URL}/api/alerts/rules", params=params, timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    def refresh(self, full=False):
+        """Recharger les règles (complètement ou depuis la dernière version)"""
+        since = None if full else self._version
+        data = self._fetch(since)
+
+        with self._lock:
+            if data.get('full'):
+                self._rules = {}
+                self._full_refreshed_at = time.monotonic()
+            for rule in data.get('rules', []):
+                self._rules[rule['server_id']] = rule
+            self._defaults = data.get('defaults') or self._defaults
+            self._version = data.get('version') or self._version
+            self._refreshed_at = time.monotonic()
+
+        logger.debug(f"Règles d'alerte {'rechargées' if data.get('full') else 'mises à jour'}: "
+                     f"{len(data.get('rules', []))} règle(s)")
+
+    def refresh_if_stale(self):
+        """Rafraîchir si nécessaire ; en cas d'erreur, garder les règles connues"""
+        now = time.monotonic()
+        if now < self._retry_at:
+            return
+
+        full_due = self._full_refreshed_at is None or now - self._full_refreshed_at > self.full_refresh_interval
+        due = self._refreshed_at is None or now - self._refreshed_at > self.refresh_interval
+
+        if not (full_due or due):
+            return
+
+        # Un seul thread rafraîchit, les autres utilisent les règles en cache
+        if not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            self.refresh(full=full_due)
+        except Exception as e:
+            logger.error(f"Erreur récupération règles: {e}")
+            # Ne pas réessayer à chaque mesure tant que le backend est indisponible
+            self._retry_at = now + min(self.refresh_interval, 30)
+        finally:
+            self._refreshing.release()
+
+    def get(self, server_id, refresh=True):
+        """Règles d'un serveur (règles par défaut s'il n'en a pas)"""
+        if refresh:
+            self.refresh_if_stale()
+
+        with self._lock:
+            rules = self._rules.get(server_id)
+            if rules is not None:
+                return rules
+            if self._defaults is not None:
+                return {'server_id': server_id, **self._defaults}
+        return None
+
+
+rules_cache = AlertRulesCache()
@@ -0,0 +1,197 @@
+"""
+Ordonnanceur de collecte par serveur (COLLECTOR_MODE=scheduled).
+
+Chaque serveur a sa propre échéance dans une file de priorité, au lieu d'un
+cycle global où tous les serveurs sont interrogés en même temps et où le
+plus lent retarde les autres :
+
+- intervalle propre à chaque cible (champ `poll_interval` du document
+  target, POLL_INTERVAL par défaut) ;
+- premier passage décalé aléatoirement dans l'intervalle, puis une gigue de
+  ±SCHEDULER_JITTER sur chaque échéance pour ne pas se resynchroniser ;
+- intervalle réduit (`alert_poll_interval`, ALERT_POLL_INTERVAL par défaut)
+  tant que le serveur a des alertes actives ;
+- recul exponentiel, jusqu'à SCHEDULER_BACKOFF_MAX, pour un serveur
+  injoignable ;
+- disjoncteur ouvert (retry_in) : la collecte n'est pas tentée ni comptée
+  comme un échec, l'échéance est reportée à la fin du délai d'ouverture.
+"""
+
+import time
+import heapq
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TargetSchedule:
+    """Échéance et état de collecte d'un serveur"""
+
+    def __init__(self, target):
+        self.target = target
+        self.failures = 0
+        self.running = False
+        self.due = 0.0
+        self.version = 0
+
+    @property
+    def ip(self):
+        return self.target['ip']
+
+    def base_interval(self, alerting):
+        interval = self.target.get('poll_interval') or Config.POLL_INTERVAL
+        if alerting:
+            fast = self.target.get('alert_poll_interval') or Config.ALERT_POLL_INTERVAL
+            interval = min(interval, fast)
+        return float(interval)
+
+    def next_interval(self, alerting):
+        interval = self.base_interval(alerting)
+        if self.failures:
+            interval = min(interval * (2 ** min(self.failures, 16)), max(interval, Config.SCHEDULER_BACKOFF_MAX))
+        jitter = interval * Config.SCHEDULER_JITTER
+        return max(0.1, interval + random.uniform(-jitter, jitter))
+
+
+class PollScheduler:
+    def __init__(self, collect, is_alerting=None, max_workers=None, retry_in=None):
+        # collect(target) -> résultat ou None en cas d'échec
+        self.collect = collect
+        self.is_alerting = is_alerting or (lambda ip: False)
+        # retry_in(ip) -> secondes avant que le disjoncteur accepte une collecte
+        self.retry_in = retry_in or (lambda ip: 0.0)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or Config.MAX_WORKERS)
+        self._condition = threading.Condition()
+        self._heap = []
+        self._schedules = {}
+        self._stop = threading.Event()
+        self._sequence = 0
+
+    def _push(self, schedule):
+        """Insérer l'échéance courante (les anciennes entrées sont ignorées via version)"""
+        schedule.version += 1
+        self._sequence += 1
+        heapq.heappush(self._heap, (schedule.due, self._sequence, schedule.ip, schedule.version))
+        self._condition.notify()
+
+    def sync(self, targets):
+        """Aligner les échéances sur la liste des serveurs à surveiller"""
+        now = time.monotonic()
+        wanted = {target['ip']: target for target in targets}
+
+        with self._condition:
+            for ip in list(self._schedules):
+                if ip not in wanted:
+                    del self._schedules[ip]
+
+            for ip, target in wanted.items():
+                schedule = self._schedules.get(ip)
+                if schedule is not None:
+                    schedule.target = target
+                    continue
+                schedule = self._schedules[ip] = TargetSchedule(target)
+                # Premier passage étalé sur l'intervalle du serveur
+                schedule.due = now + random.uniform(0, schedule.base_interval(False))
+                self._push(schedule)
+
+            return len(self._schedules)
+
+    def _breaker_delay(self, ip):
+        try:
+            return max(0.0, float(self.retry_in(ip) or 0.0))
+        except Exception:
+            return 0.0
+
+    def _reschedule(self, schedule, delay):
+        with self._condition:
+            schedule.running = False
+            if self._schedules.get(schedule.ip) is not schedule:
+                return False  # Serveur retiré pendant la collecte
+            schedule.due = time.monotonic() + delay
+            self._push(schedule)
+            return True
+
+    def _run(self, schedule):
+        # Disjoncteur ouvert : refus attendu, pas un échec du serveur
+        wait = self._breaker_delay(schedule.ip)
+        if wait > 0:
+            self._reschedule(schedule, wait)
+            return
+
+        try:
+            ok = self.collect(schedule.target) is not None
+        except Exception as e:
+            logger.error(f"Erreur collecte pour {schedule.ip}: {e}")
+            ok = False
+
+        try:
+            alerting = self.is_alerting(schedule.ip)
+        except Exception:
+            alerting = False
+
+        with self._condition:
+            schedule.failures = 0 if ok else schedule.failures + 1
+            interval = schedule.next_interval(alerting)
+        if not ok:
+            # Disjoncteur (ré)ouvert par cet échec : son délai fait foi
+            wait = self._breaker_delay(schedule.ip)
+            if wait > 0:
+                interval = wait
+        if not self._reschedule(schedule, interval):
+            return
+
+        if not ok and schedule.failures > 1:
+            logger.info(f"{schedule.ip} injoignable ({schedule.failures} échecs), "
+                        f"prochaine tentative dans {schedule.due - time.monotonic():.0f}s")
+
+    def _next_due(self):
+        """Serveur suivant à collecter, en attendant son échéance"""
+        with self._condition:
+            while not self._stop.is_set():
+                if not self._heap:
+                    self._condition.wait(1.0)
+                    continue
+
+                due, _sequence, ip, version = self._heap[0]
+                schedule = self._schedules.get(ip)
+                if schedule is None or schedule.version != version:
+                    heapq.heappop(self._heap)
+                    continue
+
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._condition.wait(min(delay, 1.0))
+                    continue
+
+                heapq.heappop(self._heap)
+                schedule.running = True
+                return schedule
+        return None
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            schedule = self._next_due()
+            if schedule is not None:
+                self._executor.submit(self._run, schedule)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._dispatch_loop, name="poll-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify_all()
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        with self._condition:
+            return {
+                'targets': len(self._schedules),
+                'running': sum(1 for s in self._schedules.values() if s.running),
+                'backing_off': sum(1 for s in self._schedules.values() if s.failures),
+            }
@@ -0,0 +1,62 @@
+"""
+Capteur de température découvert sur chaque serveur.
+
+Le script distant ne parcourt /sys/class/hwmon, /sys/class/thermal et
+lm-sensors qu'en l'absence de capteur connu. Le résultat (chemin du
+fichier, "sensors" ou "none") est gardé ici et retransmis aux exécutions
+suivantes, qui se limitent alors à une lecture de fichier. La découverte
+est refaite toutes les SENSOR_CACHE_TTL secondes ou quand le capteur ne
+répond plus.
+"""
+
+import time
+import threading
+from config import Config
+
+
+class SensorCache:
+    def __init__(self, ttl=None):
+        self.ttl = ttl if ttl is not None else Config.SENSOR_CACHE_TTL
+        self._lock = threading.Lock()
+        self._sensors = {}
+
+    def get(self, server_id):
+        """Capteur connu du serveur, None s'il faut (re)lancer la découverte"""
+        with self._lock:
+            entry = self._sensors.get(server_id)
+        if entry is None:
+            return None
+        sensor, discovered_at = entry
+        if self._expired(discovered_at, time.monotonic()):
+            return None
+        return sensor
+
+    def _expired(self, discovered_at, now):
+        return bool(self.ttl) and now - discovered_at > self.ttl
+
+    def remember(self, server_id, metrics):
+        """Retirer le capteur de la mesure et le mémoriser pour les exécutions suivantes"""
+        sensor = metrics.pop('temperature_sensor', None)
+        with self._lock:
+            if not isinstance(sensor, str):
+                self._sensors.pop(server_id, None)
+                return
+            current = self._sensors.get(server_id)
+            now = time.monotonic()
+            # Garder la date de découverte tant que le capteur connu est encore
+            # valide ; une entrée expirée a déclenché une nouvelle découverte,
+            # dont le résultat repart pour SENSOR_CACHE_TTL secondes même s'il
+            # désigne le même capteur
+            if current is None or current[0] != sensor or self._expired(current[1], now):
+                self._sensors[server_id] = (sensor, now)
+
+    def retain(self, server_ids):
+        """Oublier les serveurs qui ne sont plus surveillés"""
+        server_ids = set(server_ids)
+        with self._lock:
+            for server_id in list(self._sensors):
+                if server_id not in server_ids:
+                    del self._sensors[server_id]
+
+
+sensor_cache = SensorCache()
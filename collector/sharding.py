@@ -0,0 +1,118 @@
+"""
+Répartition des serveurs entre plusieurs collectors (SHARDING_ENABLED=true).
+
+Chaque instance s'enregistre dans la collection `collectors` et y met à jour
+son heartbeat toutes les SHARD_HEARTBEAT_INTERVAL secondes. Les instances
+dont le heartbeat date de moins de SHARD_HEARTBEAT_TIMEOUT secondes forment
+un anneau de hachage cohérent (SHARD_VNODES points virtuels par instance) :
+chaque serveur est collecté par l'instance qui suit son hash sur l'anneau.
+Quand une instance arrive ou disparaît, seuls les serveurs de ses segments
+changent de collector.
+"""
+
+import bisect
+import socket
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(value):
+    return int(hashlib.md5(value.encode('utf-8')).hexdigest()[:16], 16)
+
+
+class ConsistentHashRing:
+    def __init__(self, members, vnodes=None):
+        vnodes = vnodes or Config.SHARD_VNODES
+        self.members = frozenset(members)
+        points = sorted((_hash(f"{member}#{i}"), member) for member in self.members for i in range(vnodes))
+        self._hashes = [h for h, _member in points]
+        self._owners = [member for _h, member in points]
+
+    def owner(self, key):
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+class ShardCoordinator:
+    def __init__(self, collection, instance_id=None):
+        self.collection = collection
+        self.instance_id = instance_id or Config.COLLECTOR_ID or socket.gethostname()
+        self._lock = threading.Lock()
+        self._ring = ConsistentHashRing([self.instance_id])
+        self._assigned = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def heartbeat(self):
+        """Signaler que l'instance est vivante et relire les instances actives"""
+        now = datetime.utcnow()
+        self.collection.update_one(
+            {'_id': self.instance_id},
+            {
+                '$set': {'heartbeat_at': now, 'hostname': socket.gethostname()},
+                '$setOnInsert': {'started_at': now}
+            },
+            upsert=True
+        )
+
+        since = now - timedelta(seconds=Config.SHARD_HEARTBEAT_TIMEOUT)
+        members = {doc['_id'] for doc in self.collection.find({'heartbeat_at': {'$gte': since}}, {'_id': 1})}
+        members.add(self.instance_id)
+
+        with self._lock:
+            if members != self._ring.members:
+                logger.info(
+                    f"Collectors actifs: {len(members)} ({', '.join(sorted(members))}), "
+                    f"répartition des serveurs recalculée"
+                )
+                self._ring = ConsistentHashRing(members)
+
+    def owns(self, ip):
+        with self._lock:
+            return self._ring.owner(ip) == self.instance_id
+
+    def assigned(self, targets):
+        """Serveurs de la liste attribués à cette instance"""
+        with self._lock:
+            ring = self._ring
+        mine = [target for target in targets if ring.owner(target['ip']) == self.instance_id]
+
+        ips = {target['ip'] for target in mine}
+        if self._assigned is not None and ips != self._assigned:
+            gained = len(ips - self._assigned)
+            lost = len(self._assigned - ips)
+            logger.info(f"Rééquilibrage: {gained} serveur(s) reçu(s), {lost} cédé(s)")
+        self._assigned = ips
+        return mine
+
+    def _heartbeat_loop(self):
+        while not self._stop.wait(Config.SHARD_HEARTBEAT_INTERVAL):
+            try:
+                self.heartbeat()
+            except Exception as e:
+                # Garder la dernière répartition connue
+                logger.error(f"Erreur heartbeat collector: {e}")
+
+    def start(self):
+        """Enregistrer l'instance et lancer le heartbeat périodique"""
+        self.heartbeat()
+        self._thread = threading.Thread(target=self._heartbeat_loop, name="shard-heartbeat", daemon=True)
+        self._thread.start()
+        logger.info(f"Collector {self.instance_id} enregistré")
+
+    def stop(self):
+        """Se désinscrire : les autres instances reprennent ses serveurs sans attendre le timeout"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+        try:
+            self.collection.delete_one({'_id': self.instance_id})
+        except Exception as e:
+            logger.error(f"Erreur désinscription collector: {e}")
@@ -0,0 +1,189 @@
+"""
+Pool de connexions SSH persistantes, une par serveur surveillé.
+
+Au lieu de refaire un échange de clés et une authentification à chaque
+collecte, le transport paramiko est conservé entre deux cycles : une collecte
+en régime établi ne coûte plus que l'ouverture d'un canal.
+"""
+
+import time
+import logging
+import threading
+import paramiko
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class _PoolEntry:
+    """État d'une connexion du pool pour un serveur donné"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.client = None
+        self.last_used = 0.0
+        self.handshakes = 0
+        self.reuses = 0
+        self.failures = 0
+        self.retry_at = 0.0
+
+
+class SSHConnectionPool:
+    """Pool de clients SSH indexés par (ip, port, utilisateur)"""
+
+    def __init__(self, idle_timeout=None, backoff_base=None, backoff_max=None):
+        self.idle_timeout = idle_timeout if idle_timeout is not None else Config.SSH_IDLE_TIMEOUT
+        self.backoff_base = backoff_base if backoff_base is not None else Config.SSH_BACKOFF_BASE
+        self.backoff_max = backoff_max if backoff_max is not None else Config.SSH_BACKOFF_MAX
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def _entry(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _PoolEntry()
+                self._entries[key] = entry
+            return entry
+
+    @staticmethod
+    def _is_alive(client):
+        """Vérifier que le transport SSH est toujours actif"""
+        if client is None:
+            return False
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    @staticmethod
+    def _close(client):
+        if client is None:
+            return
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    def _connect(self, ip, port, username):
+        """Ouvrir une nouvelle connexion SSH (échange de clés + authentification)"""
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(
+                hostname=ip,
+                port=port,
+                username=username,
+                key_filename=Config.SSH_KEY_PATH,
+                timeout=15,
+                banner_timeout=10
+            )
+        except Exception:
+            self._close(client)
+            raise
+        transport = client.get_transport()
+        if transport is not None and Config.SSH_KEEPALIVE > 0:
+            transport.set_keepalive(Config.SSH_KEEPALIVE)
+        return client
+
+    def get_client(self, ip, port=22, username=None):
+        """
+        Retourner un client SSH connecté pour ce serveur.
+
+        Réutilise le transport existant s'il est actif, sinon reconnecte.
+        Après un échec, les nouvelles tentatives sont différées avec un
+        backoff exponentiel (ConnectionError levée pendant l'attente).
+        """
+        username = username or Config.SSH_USER
+        entry = self._entry((ip, port, username))
+
+        with entry.lock:
+            now = time.monotonic()
+
+            if self._is_alive(entry.client):
+                entry.reuses += 1
+                entry.last_used = now
+                return entry.client
+
+            if entry.client is not None:
+                logger.info(f"Transport SSH inactif pour {ip}, reconnexion")
+                self._close(entry.client)
+                entry.client = None
+
+            if now < entry.retry_at:
+                raise ConnectionError(
+                    f"Reconnexion SSH différée ({entry.retry_at - now:.0f}s restantes)"
+                )
+
+            try:
+                client = self._connect(ip, port, username)
+            except Exception:
+                entry.failures += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** (entry.failures - 1)))
+                entry.retry_at = now + delay
+                raise
+
+            entry.client = client
+            entry.handshakes += 1
+            entry.failures = 0
+            entry.retry_at = 0.0
+            entry.last_used = time.monotonic()
+            return client
+
+    def invalidate(self, ip, port=22, username=None):
+        """Fermer la connexion d'un serveur (ex: après une erreur d'exécution)"""
+        username = username or Config.SSH_USER
+        entry = self._entry((ip, port, username))
+        with entry.lock:
+            self._close(entry.client)
+            entry.client = None
+
+    def evict_idle(self):
+        """Fermer les connexions inutilisées depuis plus de idle_timeout secondes"""
+        now = time.monotonic()
+        evicted = 0
+
+        with self._lock:
+            entries = list(self._entries.items())
+
+        for key, entry in entries:
+            # Ne pas bloquer sur une connexion en cours d'utilisation
+            if not entry.lock.acquire(blocking=False):
+                continue
+            try:
+                if entry.client is not None and now - entry.last_used > self.idle_timeout:
+                    self._close(entry.client)
+                    entry.client = None
+                    evicted += 1
+                    logger.info(f"Connexion SSH inactive fermée pour {key[0]}")
+            finally:
+                entry.lock.release()
+
+        return evicted
+
+    def stats(self):
+        """Compteurs de handshakes et de réutilisations par serveur"""
+        with self._lock:
+            entries = list(self._entries.items())
+
+        return {
+            f"{ip}:{port}": {
+                'connected': self._is_alive(entry.client),
+                'handshakes': entry.handshakes,
+                'reuses': entry.reuses,
+                'failures': entry.failures
+            }
+            for (ip, port, _username), entry in entries
+        }
+
+    def close_all(self):
+        """Fermer toutes les connexions du pool"""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+
+        for entry in entries:
+            with entry.lock:
+                self._close(entry.client)
+                entry.client = None
+
+
+ssh_pool = SSHConnectionPool()
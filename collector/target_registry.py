@@ -0,0 +1,139 @@
+"""
+Registre en mémoire des serveurs à surveiller.
+
+Les cibles actives (enabled différent de false) sont chargées une seule
+fois, limitées aux champs utiles à la collecte, puis tenues à jour par un
+change stream MongoDB. Si les change streams ne sont pas disponibles
+(serveur MongoDB autonome, sans replica set), le registre est rechargé
+toutes les TARGETS_REFRESH_SECONDS secondes. Les cycles de collecte lisent
+le registre sans aucune requête MongoDB.
+"""
+
+import logging
+import threading
+from pymongo.errors import PyMongoError, OperationFailure
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Champs lus par les moteurs de collecte et l'ordonnanceur
+TARGET_FIELDS = ('ip', 'port', 'username', 'alias', 'description', 'enabled',
+                 'poll_interval', 'alert_poll_interval')
+
+PROJECTION = {field: 1 for field in TARGET_FIELDS}
+
+# Les anciennes cibles sans champ enabled restent surveillées
+ENABLED_FILTER = {'enabled': {'$ne': False}}
+
+
+def is_enabled(doc):
+    return doc is not None and doc.get('enabled', True) is not False and bool(doc.get('ip'))
+
+
+class TargetRegistry:
+    def __init__(self, collection):
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._targets = {}
+        self._loaded = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.source = None
+
+    def load(self):
+        """(Re)charger toutes les cibles actives"""
+        targets = {doc['_id']: doc for doc in self.collection.find(ENABLED_FILTER, PROJECTION)}
+        with self._lock:
+            self._targets = targets
+        self._loaded.set()
+        return len(targets)
+
+    def targets(self):
+        """Cibles actives connues (chargées à la première demande)"""
+        if not self._loaded.is_set():
+            self.load()
+        with self._lock:
+            return list(self._targets.values())
+
+    def _apply(self, change):
+        """Appliquer un événement du change stream"""
+        key = change['documentKey']['_id']
+        operation = change['operationType']
+
+        with self._lock:
+            if operation == 'delete':
+                self._targets.pop(key, None)
+                return
+            doc = change.get('fullDocument')
+            if is_enabled(doc):
+                self._targets[key] = doc
+            else:
+                # Cible désactivée (ou supprimée avant la relecture du document)
+                self._targets.pop(key, None)
+
+    def _watch(self):
+        """Suivre les modifications ; retourne False si les change streams sont indisponibles"""
+        pipeline = [
+            {'$match': {'operationType': {'$in': ['insert', 'update', 'replace', 'delete']}}},
+            {'$project': {
+                'operationType': 1,
+                'documentKey': 1,
+                **{f'fullDocument.{field}': 1 for field in TARGET_FIELDS}
+            }},
+        ]
+        resume_token = None
+
+        while not self._stop.is_set():
+            try:
+                with self.collection.watch(pipeline, full_document='updateLookup',
+                                           resume_after=resume_token) as stream:
+                    # Recharger après l'ouverture : aucune modification n'est perdue entre les deux
+                    if resume_token is None:
+                        self.load()
+                    while not self._stop.is_set():
+                        change = stream.try_next()
+                        if change is None:
+                            self._stop.wait(0.5)
+                            continue
+                        resume_token = stream.resume_token
+                        self._apply(change)
+            except OperationFailure as e:
+                # 40573 : change streams réservés aux replica sets
+                if e.code in (40573, 40324, 136):
+                    logger.warning(f"Change streams indisponibles ({e}), rechargement périodique des cibles")
+                    return False
+                logger.error(f"Erreur change stream targets: {e}")
+                resume_token = None
+                self._stop.wait(5)
+            except PyMongoError as e:
+                logger.error(f"Erreur change stream targets: {e}")
+                resume_token = None
+                self._stop.wait(5)
+        return True
+
+    def _poll(self):
+        while not self._stop.wait(Config.TARGETS_REFRESH_SECONDS):
+            try:
+                self.load()
+            except PyMongoError as e:
+                logger.error(f"Erreur rechargement des cibles: {e}")
+
+    def _run(self):
+        if Config.TARGETS_CHANGE_STREAM:
+            self.source = 'changestream'
+            if self._watch():
+                return
+        self.source = 'polling'
+        self._poll()
+
+    def start(self):
+        """Charger les cibles puis les suivre en arrière-plan"""
+        count = self.load()
+        logger.info(f"{count} cible(s) active(s) chargée(s)")
+        self._thread = threading.Thread(target=self._run, name="target-registry", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
@@ -0,0 +1,32 @@
+import os
+import sys
+import time
+
+import pytest
+
+# config.py exige MONGODB_URI ; aucune connexion n'est ouverte par les modules testés
+os.environ.setdefault("MONGODB_URI", "mongodb://localhost:27017/apmf_test")
+
+# Modules du collector importés à plat (from config import Config), comme dans collector.py
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+
+class FakeClock:
+    """time.monotonic piloté par les tests"""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge monotone figée, avancée explicitement par le test (clock.advance)"""
+    fake = FakeClock()
+    monkeypatch.setattr(time, 'monotonic', fake)
+    return fake
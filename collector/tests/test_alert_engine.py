@@ -0,0 +1,120 @@
+import pytest
+
+from config import Config
+from alert_engine import AlertEngine
+
+RULES = {'enabled': True, 'cpu_threshold': 80}
+
+
+@pytest.fixture(autouse=True)
+def engine_config(monkeypatch):
+    monkeypatch.setattr(Config, 'ALERT_HYSTERESIS', 5)
+    monkeypatch.setattr(Config, 'ALERT_FOR_SECONDS', 0)
+    monkeypatch.setattr(Config, 'ALERT_AVG_SAMPLES', 1)
+    monkeypatch.setattr(Config, 'ALERT_DISK_FILL_RATE', 0)
+    monkeypatch.setattr(Config, 'ALERT_REASSERT_SECONDS', 300)
+
+
+def cpu(engine, value, now, rules=RULES):
+    return [(t['type'], t['state']) for t in engine.evaluate('s1', {'cpu_usage': value}, rules, now=now)]
+
+
+def test_first_evaluation_below_threshold_is_silent():
+    engine = AlertEngine()
+    assert engine.evaluate('s1', {'cpu_usage': 10, 'memory_usage': 10, 'disk_usage': 10}, RULES, now=0) == []
+
+
+def test_fires_once_then_resolves_once():
+    engine = AlertEngine()
+    assert cpu(engine, 90, 0) == [('cpu', 'firing')]
+    assert cpu(engine, 95, 5) == []
+    assert engine.is_firing('s1')
+    assert cpu(engine, 50, 10) == [('cpu', 'resolved')]
+    assert cpu(engine, 50, 15) == []
+    assert not engine.is_firing('s1')
+
+
+def test_hysteresis_keeps_firing_until_clear_threshold():
+    engine = AlertEngine()
+    assert cpu(engine, 90, 0) == [('cpu', 'firing')]
+    # Sous le seuil mais au-dessus du seuil de retour (80 - 5)
+    assert cpu(engine, 78, 5) == []
+    assert engine.is_firing('s1')
+    assert cpu(engine, 74, 10) == [('cpu', 'resolved')]
+
+
+def test_for_seconds_delays_firing():
+    engine = AlertEngine()
+    rules = {**RULES, 'cpu_for_seconds': 30}
+    assert cpu(engine, 90, 0, rules) == []
+    assert cpu(engine, 90, 20, rules) == []
+    assert cpu(engine, 90, 30, rules) == [('cpu', 'firing')]
+
+
+def test_short_spike_is_ignored_with_for_seconds():
+    engine = AlertEngine()
+    rules = {**RULES, 'cpu_for_seconds': 30}
+    assert cpu(engine, 90, 0, rules) == []
+    # Retour sous le seuil : aucun retour à la normale pour une règle jamais déclenchée
+    assert cpu(engine, 50, 10, rules) == []
+    assert cpu(engine, 90, 20, rules) == []
+    assert cpu(engine, 90, 40, rules) == []
+    assert cpu(engine, 90, 50, rules) == [('cpu', 'firing')]
+
+
+def test_firing_state_is_reasserted():
+    engine = AlertEngine()
+    assert cpu(engine, 90, 0) == [('cpu', 'firing')]
+    assert cpu(engine, 90, 299) == []
+    assert cpu(engine, 90, 300) == [('cpu', 'firing')]
+    assert cpu(engine, 90, 310) == []
+
+
+def test_resolution_is_repeated_once():
+    engine = AlertEngine()
+    cpu(engine, 90, 0)
+    assert cpu(engine, 50, 10) == [('cpu', 'resolved')]
+    assert cpu(engine, 50, 200) == []
+    assert cpu(engine, 50, 310) == [('cpu', 'resolved')]
+    assert cpu(engine, 50, 1000) == []
+
+
+def test_reassert_disabled(monkeypatch):
+    monkeypatch.setattr(Config, 'ALERT_REASSERT_SECONDS', 0)
+    engine = AlertEngine()
+    cpu(engine, 90, 0)
+    assert cpu(engine, 90, 10000) == []
+
+
+def test_average_over_samples(monkeypatch):
+    monkeypatch.setattr(Config, 'ALERT_AVG_SAMPLES', 3)
+    engine = AlertEngine()
+    assert cpu(engine, 100, 0) == [('cpu', 'firing')]
+    engine.forget('s1')
+    assert cpu(engine, 10, 0) == []
+    assert cpu(engine, 10, 5) == []
+    # Moyenne (10 + 10 + 100) / 3 = 40
+    assert cpu(engine, 100, 10) == []
+
+
+def test_disk_fill_rate_rule():
+    engine = AlertEngine()
+    rules = {**RULES, 'disk_threshold': 99, 'disk_fill_rate_threshold': 10}
+    transitions = []
+    # +1 % toutes les 60 s : 60 %/h
+    for i in range(5):
+        transitions += engine.evaluate('s1', {'disk_usage': 50 + i}, rules, now=i * 60)
+    assert [(t['type'], t['state']) for t in transitions] == [('disk_fill', 'firing')]
+    assert transitions[0]['value'] == pytest.approx(60)
+
+
+def test_disabled_rules_return_nothing():
+    engine = AlertEngine()
+    assert engine.evaluate('s1', {'cpu_usage': 99}, {'enabled': False}, now=0) == []
+
+
+def test_retain_forgets_removed_servers():
+    engine = AlertEngine()
+    cpu(engine, 90, 0)
+    engine.retain(['other'])
+    assert not engine.is_firing('s1')
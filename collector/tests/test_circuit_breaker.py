@@ -0,0 +1,68 @@
+import pytest
+
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakers
+
+
+@pytest.fixture
+def breakers(clock):
+    return CircuitBreakers(threshold=3, open_seconds=30, open_max=100)
+
+
+def test_opens_after_threshold(breakers):
+    assert breakers.failure('s1') is False
+    assert breakers.failure('s1') is False
+    assert breakers.failure('s1') is True
+    assert breakers.state('s1') == OPEN
+    assert breakers.allow('s1') is False
+    assert breakers.retry_in('s1') == 30
+
+
+def test_half_open_single_probe_after_delay(breakers, clock):
+    for _ in range(3):
+        breakers.failure('s1')
+    clock.advance(30)
+    assert breakers.retry_in('s1') == 0.0
+    assert breakers.allow('s1') is True
+    assert breakers.state('s1') == HALF_OPEN
+    # Une seule collecte d'essai à la fois
+    assert breakers.allow('s1') is False
+
+
+def test_failed_probe_reopens_with_doubled_delay(breakers, clock):
+    for _ in range(3):
+        breakers.failure('s1')
+    clock.advance(30)
+    breakers.allow('s1')
+    assert breakers.failure('s1') is True
+    assert breakers.retry_in('s1') == 60
+    clock.advance(60)
+    breakers.allow('s1')
+    breakers.failure('s1')
+    # Plafonné à open_max
+    assert breakers.retry_in('s1') == 100
+
+
+def test_success_closes(breakers, clock):
+    for _ in range(3):
+        breakers.failure('s1')
+    clock.advance(30)
+    breakers.allow('s1')
+    breakers.success('s1')
+    assert breakers.state('s1') == CLOSED
+    assert breakers.retry_in('s1') == 0.0
+    assert breakers.failure('s1') is False
+
+
+def test_unknown_server_is_closed(breakers):
+    assert breakers.state('s1') == CLOSED
+    assert breakers.retry_in('s1') == 0.0
+    assert breakers.allow('s1') is True
+
+
+def test_retain_and_stats(breakers):
+    for _ in range(3):
+        breakers.failure('s1')
+    breakers.allow('s2')
+    assert breakers.stats() == {CLOSED: 1, OPEN: 1, HALF_OPEN: 0}
+    breakers.retain(['s2'])
+    assert breakers.stats() == {CLOSED: 1, OPEN: 0, HALF_OPEN: 0}
@@ -0,0 +1,75 @@
+from counter_rates import WRAP_32, WRAP_64, CounterRates, counter_delta, sample_time
+
+
+def test_counter_delta_increase():
+    assert counter_delta(100, 250) == 150
+
+
+def test_counter_delta_32_bit_wrap():
+    assert counter_delta(WRAP_32 - 100, 50) == 150
+
+
+def test_counter_delta_64_bit_wrap():
+    assert counter_delta(WRAP_64 - 10, 5) == 15
+
+
+def test_counter_delta_reset_is_not_a_wrap():
+    # Interface recréée : le compteur repart de zéro loin de la limite des 32 bits
+    assert counter_delta(1_000_000, 10) is None
+    # Compteur 64 bits qui redescend : jamais proche de 2^64 en pratique
+    assert counter_delta(5 * WRAP_32, 1000) is None
+
+
+def test_first_sample_has_no_rate():
+    rates = CounterRates()
+    assert rates.rates('s1', {'rx': 100}, 0.0, uptime=10) is None
+
+
+def test_rate_per_second():
+    rates = CounterRates()
+    rates.rates('s1', {'rx': 1000, 'tx': 0}, 0.0, uptime=10)
+    assert rates.rates('s1', {'rx': 3000, 'tx': 500}, 10.0, uptime=20) == {'rx': 200.0, 'tx': 50.0}
+
+
+def test_wrap_gives_plausible_rate():
+    rates = CounterRates()
+    rates.rates('s1', {'rx': WRAP_32 - 1000}, 0.0, uptime=10)
+    assert rates.rates('s1', {'rx': 1000}, 10.0, uptime=20) == {'rx': 200.0}
+
+
+def test_reset_counter_is_skipped_then_used_as_reference():
+    rates = CounterRates()
+    rates.rates('s1', {'rx': 5_000_000, 'tx': 100}, 0.0, uptime=10)
+    assert rates.rates('s1', {'rx': 100, 'tx': 200}, 10.0, uptime=20) == {'tx': 10.0}
+    assert rates.rates('s1', {'rx': 1100, 'tx': 300}, 20.0, uptime=30) == {'rx': 100.0, 'tx': 10.0}
+
+
+def test_reboot_resets_reference():
+    rates = CounterRates()
+    rates.rates('s1', {'rx': 5_000_000}, 0.0, uptime=1000)
+    assert rates.rates('s1', {'rx': 100}, 10.0, uptime=5) is None
+    assert rates.rates('s1', {'rx': 600}, 20.0, uptime=15) == {'rx': 50.0}
+
+
+def test_out_of_order_sample_has_no_rate():
+    rates = CounterRates()
+    rates.rates('s1', {'rx': 100}, 10.0)
+    assert rates.rates('s1', {'rx': 200}, 10.0) is None
+
+
+def test_new_counter_waits_for_reference():
+    rates = CounterRates()
+    rates.rates('s1', {'rx': 100}, 0.0)
+    assert rates.rates('s1', {'rx': 200, 'eth1': 50}, 10.0) == {'rx': 10.0}
+
+
+def test_retain_forgets_removed_servers():
+    rates = CounterRates()
+    rates.rates('s1', {'rx': 100}, 0.0)
+    rates.retain(['s2'])
+    assert rates.rates('s1', {'rx': 200}, 10.0) is None
+
+
+def test_sample_time_parses_remote_timestamp():
+    assert sample_time({'timestamp': '2024-06-01T00:00:00+00:00'}) == 1717200000.0
+    assert sample_time({'timestamp': 'invalide'}) > 1717200000.0
@@ -0,0 +1,84 @@
+import pytest
+
+from config import Config
+from scheduler import PollScheduler, TargetSchedule
+
+
+@pytest.fixture(autouse=True)
+def scheduler_config(monkeypatch):
+    monkeypatch.setattr(Config, 'POLL_INTERVAL', 10)
+    monkeypatch.setattr(Config, 'ALERT_POLL_INTERVAL', 2)
+    monkeypatch.setattr(Config, 'SCHEDULER_JITTER', 0)
+    monkeypatch.setattr(Config, 'SCHEDULER_BACKOFF_MAX', 300)
+
+
+def make_scheduler(collect, retry_in=None):
+    scheduler = PollScheduler(collect=collect, max_workers=1, retry_in=retry_in)
+    scheduler.sync([{'ip': '10.0.0.1'}])
+    return scheduler, scheduler._schedules['10.0.0.1']
+
+
+def test_interval_per_target_and_when_alerting():
+    schedule = TargetSchedule({'ip': '10.0.0.1', 'poll_interval': 20})
+    assert schedule.next_interval(False) == 20
+    assert schedule.next_interval(True) == 2
+
+
+def test_backoff_doubles_up_to_max():
+    schedule = TargetSchedule({'ip': '10.0.0.1'})
+    schedule.failures = 1
+    assert schedule.next_interval(False) == 20
+    schedule.failures = 3
+    assert schedule.next_interval(False) == 80
+    schedule.failures = 10
+    assert schedule.next_interval(False) == 300
+
+
+def test_failed_collect_backs_off(clock):
+    scheduler, schedule = make_scheduler(lambda target: None)
+    scheduler._run(schedule)
+    scheduler._run(schedule)
+    assert schedule.failures == 2
+    assert schedule.due == clock.now + 40
+    scheduler.stop()
+
+
+def test_success_resets_failures(clock):
+    results = iter([None, {'status': 'success'}])
+    scheduler, schedule = make_scheduler(lambda target: next(results))
+    scheduler._run(schedule)
+    scheduler._run(schedule)
+    assert schedule.failures == 0
+    assert schedule.due == clock.now + 10
+    scheduler.stop()
+
+
+def test_open_breaker_is_not_a_failure(clock):
+    calls = []
+    scheduler, schedule = make_scheduler(lambda target: calls.append(target), retry_in=lambda ip: 45.0)
+    for _ in range(5):
+        scheduler._run(schedule)
+    # Refus du disjoncteur : aucune collecte, pas de recul, reprise à la fin du délai
+    assert calls == []
+    assert schedule.failures == 0
+    assert schedule.due == clock.now + 45
+    assert schedule.running is False
+    scheduler.stop()
+
+
+def test_breaker_opened_by_failure_sets_next_attempt(clock):
+    delays = iter([0.0, 30.0])
+    scheduler, schedule = make_scheduler(lambda target: None, retry_in=lambda ip: next(delays))
+    scheduler._run(schedule)
+    assert schedule.failures == 1
+    assert schedule.due == clock.now + 30
+    scheduler.stop()
+
+
+def test_removed_target_is_not_rescheduled(clock):
+    scheduler, schedule = make_scheduler(lambda target: {'status': 'success'})
+    scheduler.sync([])
+    heap_size = len(scheduler._heap)
+    scheduler._run(schedule)
+    assert len(scheduler._heap) == heap_size
+    scheduler.stop()
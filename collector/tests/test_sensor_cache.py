@@ -0,0 +1,56 @@
+from sensor_cache import SensorCache
+
+
+def test_remember_pops_sensor_from_metrics(clock):
+    cache = SensorCache(ttl=60)
+    metrics = {'cpu_percent': 5, 'temperature_sensor': '/sys/class/hwmon/hwmon0/temp1_input'}
+    cache.remember('s1', metrics)
+    assert 'temperature_sensor' not in metrics
+    assert cache.get('s1') == '/sys/class/hwmon/hwmon0/temp1_input'
+
+
+def test_missing_sensor_forgets_server(clock):
+    cache = SensorCache(ttl=60)
+    cache.remember('s1', {'temperature_sensor': 'sensors'})
+    cache.remember('s1', {})
+    assert cache.get('s1') is None
+
+
+def test_same_sensor_keeps_discovery_time_within_ttl(clock):
+    cache = SensorCache(ttl=60)
+    cache.remember('s1', {'temperature_sensor': 'sensors'})
+    clock.advance(40)
+    cache.remember('s1', {'temperature_sensor': 'sensors'})
+    clock.advance(30)
+    # 70 s depuis la découverte : l'entrée expire malgré la seconde mesure
+    assert cache.get('s1') is None
+
+
+def test_rediscovery_after_ttl_refreshes_same_sensor(clock):
+    cache = SensorCache(ttl=60)
+    cache.remember('s1', {'temperature_sensor': 'sensors'})
+    clock.advance(61)
+    assert cache.get('s1') is None
+    # La découverte relancée retrouve le même capteur : nouveau délai complet
+    cache.remember('s1', {'temperature_sensor': 'sensors'})
+    assert cache.get('s1') == 'sensors'
+    clock.advance(59)
+    assert cache.get('s1') == 'sensors'
+
+
+def test_changed_sensor_restarts_ttl(clock):
+    cache = SensorCache(ttl=60)
+    cache.remember('s1', {'temperature_sensor': 'sensors'})
+    clock.advance(50)
+    cache.remember('s1', {'temperature_sensor': 'none'})
+    clock.advance(50)
+    assert cache.get('s1') == 'none'
+
+
+def test_retain_drops_unmonitored_servers(clock):
+    cache = SensorCache(ttl=60)
+    cache.remember('s1', {'temperature_sensor': 'sensors'})
+    cache.remember('s2', {'temperature_sensor': 'none'})
+    cache.retain(['s2'])
+    assert cache.get('s1') is None
+    assert cache.get('s2') == 'none'
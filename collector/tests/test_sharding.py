@@ -0,0 +1,51 @@
+from sharding import ConsistentHashRing
+
+KEYS = [f"10.0.{i // 256}.{i % 256}" for i in range(2000)]
+
+
+def owners(ring):
+    return {key: ring.owner(key) for key in KEYS}
+
+
+def test_empty_ring_has_no_owner():
+    assert ConsistentHashRing([], vnodes=8).owner('10.0.0.1') is None
+
+
+def test_single_member_owns_everything():
+    ring = ConsistentHashRing(['a'], vnodes=8)
+    assert set(owners(ring).values()) == {'a'}
+
+
+def test_owner_is_deterministic_and_order_independent():
+    first = ConsistentHashRing(['a', 'b', 'c'], vnodes=64)
+    second = ConsistentHashRing(['c', 'a', 'b'], vnodes=64)
+    assert owners(first) == owners(second)
+
+
+def test_keys_spread_across_members():
+    ring = ConsistentHashRing(['a', 'b', 'c', 'd'], vnodes=128)
+    counts = {}
+    for owner in owners(ring).values():
+        counts[owner] = counts.get(owner, 0) + 1
+    assert set(counts) == {'a', 'b', 'c', 'd'}
+    # Points virtuels : aucune instance ne reçoit le double de sa part
+    assert max(counts.values()) < 2 * len(KEYS) / 4
+
+
+def test_adding_member_only_moves_keys_to_it():
+    before = owners(ConsistentHashRing(['a', 'b', 'c'], vnodes=128))
+    after = owners(ConsistentHashRing(['a', 'b', 'c', 'd'], vnodes=128))
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert moved
+    assert all(after[key] == 'd' for key in moved)
+    assert len(moved) < len(KEYS) / 2
+
+
+def test_removing_member_only_moves_its_keys():
+    before = owners(ConsistentHashRing(['a', 'b', 'c'], vnodes=128))
+    after = owners(ConsistentHashRing(['a', 'b'], vnodes=128))
+    for key in KEYS:
+        if before[key] != 'c':
+            assert after[key] == before[key]
+        else:
+            assert after[key] in ('a', 'b')
@@ -174,7 +174,11 @@ export default function AlertsPanel({ isOpen, onClose }) {
                           : "bg-gray-500 text-white"
                       }`}
                     >
-                      {alert.status === "active" ? "Active" : "Acquittée"}
+                      {alert.status === "active"
+                        ? "Active"
+                        : alert.status === "resolved"
+                        ? "Résolue"
+                        : "Acquittée"}
                     </span>
                   </div>
 
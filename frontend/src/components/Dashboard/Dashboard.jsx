@@ -2,12 +2,13 @@ import { useState, useEffect, useRef } from "react";
 import { useAuth } from "../../contexts/AuthContext";
 import {
   getServers,
-  getLatestMetric,
+  getLatestMetrics,
   addServer,
   deleteServer,
   updateServer,
   getActiveAlerts,
 } from "../../services/api";
+import { subscribeLive, applyMetricDelta } from "../../services/live";
 import toast from "react-hot-toast";
 import ServerCard from "./ServerCard";
 import AddServerModal from "../Servers/AddServerModal";
@@ -45,35 +46,38 @@ export default function Dashboard() {
   const overlayOpen =
     showAddModal || !!selectedServer || deleteConfirm.show || !!editingServer;
 
+  const refreshAlertsCount = async () => {
+    try {
+      const alertsResponse = await getActiveAlerts();
+      setAlertsCount(alertsResponse.data.length);
+    } catch (error) {
+      console.error("Erreur alertes:", error);
+    }
+  };
+
   const fetchServersAndMetrics = async () => {
     try {
       const response = await getServers();
       const serversList = response.data;
       setServers(serversList);
 
-      const metricsPromises = serversList.map(async (server) => {
-        try {
-          const metricResponse = await getLatestMetric(server.ip);
-          return { ip: server.ip, data: metricResponse.data };
-        } catch (error) {
-          return { ip: server.ip, data: null };
-        }
-      });
+      // Une seule requête pour tous les serveurs (servie depuis le cache du backend)
+      let latest = {};
+      try {
+        const metricsResponse = await getLatestMetrics();
+        latest = metricsResponse.data || {};
+      } catch (error) {
+        console.error("Erreur métriques:", error);
+      }
 
-      const metricsResults = await Promise.all(metricsPromises);
       const metricsMap = {};
-      metricsResults.forEach(({ ip, data }) => {
-        metricsMap[ip] = data;
+      serversList.forEach((server) => {
+        metricsMap[server.ip] = latest[server.ip] || null;
       });
 
       setMetrics(metricsMap);
 
-      try {
-        const alertsResponse = await getActiveAlerts();
-        setAlertsCount(alertsResponse.data.length);
-      } catch (error) {
-        console.error("Erreur alertes:", error);
-      }
+      await refreshAlertsCount();
     } catch (error) {
       toast.error("Erreur lors du chargement des serveurs");
     } finally {
@@ -84,8 +88,24 @@ export default function Dashboard() {
 
   useEffect(() => {
     fetchServersAndMetrics();
-    const interval = setInterval(fetchServersAndMetrics, 10000);
-    return () => clearInterval(interval);
+
+    // Mesures et alertes poussées par le backend : le polling ne sert plus que de filet
+    const unsubscribe = subscribeLive({
+      onSnapshot: (latest) => setMetrics((prev) => ({ ...prev, ...latest })),
+      onMetric: (delta) =>
+        setMetrics((prev) => ({
+          ...prev,
+          [delta.server_id]: applyMetricDelta(prev[delta.server_id], delta),
+        })),
+      onAlert: refreshAlertsCount,
+      onResync: fetchServersAndMetrics,
+    });
+
+    const interval = setInterval(fetchServersAndMetrics, 60000);
+    return () => {
+      unsubscribe();
+      clearInterval(interval);
+    };
   }, []);
 
   const handleRefresh = () => {
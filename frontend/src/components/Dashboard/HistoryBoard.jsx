@@ -15,6 +15,8 @@ import {
 import { getMetricHistory } from "../../services/api";
 import { format, addHours } from "date-fns";
 import { fr } from "date-fns/locale";
+import { subscribeLive } from "../../services/live";
+import { decodeColumnar, reverseColumnar } from "../../services/columnar";
 import toast from "react-hot-toast";
 import { FiRefreshCw } from "react-icons/fi";
 
@@ -30,10 +32,36 @@ ChartJS.register(
   ArcElement
 );
 
+// Nombre de mesures affichées dans le graphique et le tableau
+const DISPLAYED_MEASURES = 10;
+
+// Champs affichés (une série par champ, format colonnes)
+const HISTORY_FIELDS = ["cpu_usage", "memory_usage", "disk_usage"];
+
+const EMPTY_HISTORY = { timestamps: [], series: {} };
+
+// Ajouter une mesure poussée par le flux temps réel (les champs absents du delta n'ont pas changé)
+const appendMeasure = (history, delta) => {
+  const last = history.timestamps.length - 1;
+  const series = {};
+  for (const field of HISTORY_FIELDS) {
+    const values = history.series[field] || [];
+    const value = field in delta ? delta[field] : values[last];
+    series[field] = [...values, value].slice(-DISPLAYED_MEASURES);
+  }
+  return {
+    timestamps: [
+      ...history.timestamps,
+      new Date(delta.timestamp).getTime(),
+    ].slice(-DISPLAYED_MEASURES),
+    series,
+  };
+};
+
 export default function HistoryBoard({ servers }) {
   const [selectedServer, setSelectedServer] = useState(servers?.[0]?.ip || "");
   const [period, setPeriod] = useState("1h");
-  const [history, setHistory] = useState([]);
+  const [history, setHistory] = useState(EMPTY_HISTORY);
   const [loading, setLoading] = useState(false);
   const [lastUpdate, setLastUpdate] = useState(null);
 
@@ -46,12 +74,25 @@ export default function HistoryBoard({ servers }) {
     return addHours(utcDate, TIMEZONE_OFFSET_HOURS);
   };
 
-  // Rafraîchissement automatique toutes les 10 secondes
+  // Nouvelles mesures poussées par le backend, rechargement complet en secours
   useEffect(() => {
     if (selectedServer) {
       fetchHistory();
-      const interval = setInterval(fetchHistory, 10000);
-      return () => clearInterval(interval);
+
+      const unsubscribe = subscribeLive({
+        servers: [selectedServer],
+        onMetric: (delta) => {
+          setHistory((prev) => appendMeasure(prev, delta));
+          setLastUpdate(new Date());
+        },
+        onResync: fetchHistory,
+      });
+
+      const interval = setInterval(fetchHistory, 60000);
+      return () => {
+        unsubscribe();
+        clearInterval(interval);
+      };
     }
   }, [selectedServer, period]);
 
@@ -65,21 +106,23 @@ export default function HistoryBoard({ servers }) {
     if (!loading) setLoading(true);
 
     try {
-      const limits = { "1h": 240, "6h": 1440, "24h": 5760 };
-      const limit = limits[period] || 240;
-      const response = await getMetricHistory(selectedServer, limit);
-
-      const allData = response.data.data || [];
-      const sortedData = allData.reverse();
+      // Ne demander que les points affichés, et seulement les champs utilisés,
+      // en tableaux parallèles plutôt qu'un objet par mesure
+      const response = await getMetricHistory(selectedServer, DISPLAYED_MEASURES, {
+        fields: HISTORY_FIELDS.join(","),
+        format: "columnar",
+        delta: 1,
+        precision: 2,
+      });
 
-      const last10Measures = sortedData.slice(-10);
+      const lastMeasures = reverseColumnar(decodeColumnar(response.data));
 
-      setHistory(last10Measures);
+      setHistory(lastMeasures);
       setLastUpdate(new Date());
 
       console.log(
         `[${format(new Date(), "HH:mm:ss")}] Affichage des ${
-          last10Measures.length
+          lastMeasures.timestamps.length
         } dernières mesures`
       );
     } catch (error) {
@@ -97,16 +140,20 @@ export default function HistoryBoard({ servers }) {
     fetchHistory();
   };
 
+  const count = history.timestamps.length;
+  const seriesOf = (field) =>
+    (history.series[field] || []).map((value) => value || 0);
+
   // Données pour le graphique en ligne - AVEC CONVERSION TIMEZONE
   const lineData = {
-    labels: history.map((h) => {
-      const localTime = convertToLocalTime(h.timestamp);
+    labels: history.timestamps.map((timestamp) => {
+      const localTime = convertToLocalTime(timestamp);
       return format(localTime, "HH:mm", { locale: fr });
     }),
     datasets: [
       {
         label: "CPU %",
-        data: history.map((h) => h.cpu_usage || 0),
+        data: seriesOf("cpu_usage"),
         borderColor: "rgb(59, 130, 246)",
         backgroundColor: "rgba(59, 130, 246, 0.1)",
         tension: 0.4,
@@ -117,7 +164,7 @@ export default function HistoryBoard({ servers }) {
       },
       {
         label: "RAM %",
-        data: history.map((h) => h.memory_usage || 0),
+        data: seriesOf("memory_usage"),
         borderColor: "rgb(34, 197, 94)",
         backgroundColor: "rgba(34, 197, 94, 0.1)",
         tension: 0.4,
@@ -146,7 +193,7 @@ export default function HistoryBoard({ servers }) {
           title: function (context) {
             // Afficher l'heure locale dans le tooltip
             const index = context[0].dataIndex;
-            const localTime = convertToLocalTime(history[index].timestamp);
+            const localTime = convertToLocalTime(history.timestamps[index]);
             return format(localTime, "HH:mm:ss", { locale: fr });
           },
         },
@@ -170,8 +217,16 @@ export default function HistoryBoard({ servers }) {
     },
   };
 
+  // Reconstituer une mesure (objet) à partir des colonnes
+  const measureAt = (index) => ({
+    timestamp: history.timestamps[index],
+    ...Object.fromEntries(
+      HISTORY_FIELDS.map((field) => [field, history.series[field]?.[index]])
+    ),
+  });
+
   // Données pour le donut (dernière mesure)
-  const lastMetric = history[history.length - 1] || {};
+  const lastMetric = count > 0 ? measureAt(count - 1) : {};
   const donutData = {
     labels: ["CPU", "RAM", "Disque"],
     datasets: [
@@ -205,7 +260,10 @@ export default function HistoryBoard({ servers }) {
   if (servers.length === 0) return null;
 
   // Afficher les dernières 30 mesures dans le tableau
-  const recentMeasures = history.slice(-30).reverse();
+  const recentMeasures = [];
+  for (let index = count - 1; index >= Math.max(0, count - 30); index--) {
+    recentMeasures.push(measureAt(index));
+  }
 
   return (
     <div className="mt-8">
@@ -253,11 +311,11 @@ export default function HistoryBoard({ servers }) {
 
       {/* Contenu principal */}
       <div className="bg-white rounded-b-lg p-6 shadow-lg">
-        {loading && history.length === 0 ? (
+        {loading && count === 0 ? (
           <div className="h-96 flex items-center justify-center">
             <div className="animate-spin rounded-full h-12 w-12 border-b-4 border-blue-600"></div>
           </div>
-        ) : history.length === 0 ? (
+        ) : count === 0 ? (
           <div className="h-96 flex flex-col items-center justify-center text-gray-500">
             <p className="text-lg font-semibold">Aucune donnée disponible</p>
             <p className="text-sm mt-2">
@@ -273,7 +331,7 @@ export default function HistoryBoard({ servers }) {
                   Évolution CPU & RAM
                 </h4>
                 <span className="text-xs text-gray-500">
-                  {history.length} mesures • EAT (UTC+3)
+                  {count} mesures • EAT (UTC+3)
                 </span>
               </div>
               <div className="h-96">
@@ -81,8 +81,13 @@ export const deleteServer = (ip) => api.delete(`/api/targets/${ip}`);
 export const getLatestMetric = (serverId) =>
   api.get(`/api/metrics/${serverId}/latest`);
 
-export const getMetricHistory = (serverId, limit = 100, page = 1) =>
-  api.get(`/api/metrics/${serverId}/history`, { params: { limit, page } });
+// Dernière mesure de tous les serveurs en une requête ({ server_id: mesure })
+export const getLatestMetrics = () => api.get("/api/metrics/latest");
+
+// params optionnels : from, to, step, fields, order, cursor (pagination par timestamp),
+// format ("columnar" : tableaux parallèles, voir services/columnar.js), delta, precision
+export const getMetricHistory = (serverId, limit = 100, params = {}) =>
+  api.get(`/api/metrics/${serverId}/history`, { params: { limit, ...params } });
 
 export const deleteMetrics = (serverId) =>
   api.delete(`/api/metrics/${serverId}`);
@@ -0,0 +1,39 @@
+/**
+ * Décodage des historiques au format colonnes (?format=columnar).
+ *
+ * Réponse du backend : { timestamps, series: { champ: [valeurs] }, delta }
+ * où les tableaux listés dans `delta` sont codés en écarts successifs.
+ * Retourne { timestamps: [epoch ms], series } avec des valeurs absolues.
+ */
+const deltaDecode = (values) => {
+  const decoded = new Array(values.length);
+  let current = 0;
+  for (let i = 0; i < values.length; i++) {
+    current += values[i];
+    decoded[i] = current;
+  }
+  return decoded;
+};
+
+export const decodeColumnar = (payload) => {
+  const encoded = new Set(payload?.delta || []);
+  const timestamps = payload?.timestamps || [];
+  const series = {};
+
+  for (const [field, values] of Object.entries(payload?.series || {})) {
+    series[field] = encoded.has(field) ? deltaDecode(values) : values;
+  }
+
+  return {
+    timestamps: encoded.has("timestamps") ? deltaDecode(timestamps) : timestamps,
+    series,
+  };
+};
+
+// Inverser l'ordre des points (le backend renvoie les plus récents d'abord)
+export const reverseColumnar = ({ timestamps, series }) => ({
+  timestamps: [...timestamps].reverse(),
+  series: Object.fromEntries(
+    Object.entries(series).map(([field, values]) => [field, [...values].reverse()])
+  ),
+});
@@ -0,0 +1,156 @@
+import api from "./api";
+
+// Délai avant de rouvrir le flux après une coupure
+const RECONNECT_DELAY_MS = 5000;
+
+// Abonnés de l'onglet : une seule connexion SSE partagée entre eux, le
+// backend limitant le nombre de flux ouverts par worker
+const listeners = new Set();
+let source = null;
+let retryTimer = null;
+let reconnecting = false;
+let generation = 0;
+// Dernier état complet connu, transmis aux abonnés arrivés après le snapshot
+let latest = null;
+
+const wants = (listener, serverId) =>
+  !listener.servers || serverId == null || listener.servers.has(serverId);
+
+const call = (handler, payload) => {
+  if (!handler) return;
+  try {
+    handler(payload);
+  } catch (error) {
+    console.error("Erreur abonné temps réel:", error);
+  }
+};
+
+const filterSnapshot = (listener, snapshot) =>
+  listener.servers
+    ? Object.fromEntries(
+        Object.entries(snapshot).filter(([serverId]) =>
+          listener.servers.has(serverId)
+        )
+      )
+    : snapshot;
+
+const handlers = {
+  snapshot: (snapshot) => {
+    latest = { ...snapshot };
+    listeners.forEach((l) => call(l.onSnapshot, filterSnapshot(l, snapshot)));
+  },
+  metric: (delta) => {
+    if (latest)
+      latest[delta.server_id] = applyMetricDelta(latest[delta.server_id], delta);
+    listeners.forEach((l) => wants(l, delta.server_id) && call(l.onMetric, delta));
+  },
+  alert: (alert) =>
+    listeners.forEach((l) => wants(l, alert.server_id) && call(l.onAlert, alert)),
+  resync: () => listeners.forEach((l) => call(l.onResync)),
+};
+
+const disconnect = () => {
+  generation += 1;
+  clearTimeout(retryTimer);
+  retryTimer = null;
+  reconnecting = false;
+  latest = null;
+  if (source) source.close();
+  source = null;
+};
+
+const scheduleReconnect = () => {
+  if (!listeners.size) return;
+  reconnecting = true;
+  latest = null;
+  retryTimer = setTimeout(connect, RECONNECT_DELAY_MS);
+};
+
+const connect = async () => {
+  const current = generation;
+  let token;
+  try {
+    token = (await api.post("/api/live/token")).data.token;
+  } catch (error) {
+    if (current === generation) scheduleReconnect();
+    return;
+  }
+  // Tous les abonnés sont partis pendant la demande de jeton
+  if (current !== generation || !listeners.size) return;
+
+  const params = new URLSearchParams({ token });
+  source = new EventSource(
+    `${api.defaults.baseURL}/api/live/stream?${params.toString()}`
+  );
+
+  Object.entries(handlers).forEach(([event, handler]) =>
+    source.addEventListener(event, (e) => {
+      try {
+        handler(JSON.parse(e.data));
+      } catch (error) {
+        console.error(`Erreur événement ${event}:`, error);
+      }
+    })
+  );
+
+  source.onopen = () => {
+    if (reconnecting) handlers.resync();
+    reconnecting = false;
+  };
+  // La reconnexion automatique d'EventSource réutiliserait un jeton expiré
+  // (503 : trop de flux ouverts sur le backend, nouvel essai plus tard)
+  source.onerror = () => {
+    source.close();
+    source = null;
+    scheduleReconnect();
+  };
+};
+
+/**
+ * Abonnement au flux temps réel du backend (Server-Sent Events).
+ *
+ * - onSnapshot(latest) : dernière mesure complète de chaque serveur
+ * - onMetric(delta)    : champs modifiés d'une nouvelle mesure
+ * - onAlert(alert)     : alerte créée ou mise à jour
+ * - onResync()         : le client a pris du retard, recharger l'état complet
+ *
+ * Le flux est ouvert avec un jeton court (POST /api/live/token), jamais avec
+ * le JWT dans l'URL. Après une coupure, un nouveau jeton est demandé et
+ * onResync est appelé pour rattraper les événements manqués.
+ *
+ * Tous les abonnements de l'onglet partagent une seule connexion ; le filtre
+ * `servers` est appliqué ici. Retourne une fonction de désabonnement.
+ */
+export const subscribeLive = ({
+  servers,
+  onSnapshot,
+  onMetric,
+  onAlert,
+  onResync,
+}) => {
+  if (!localStorage.getItem("token") || typeof EventSource === "undefined")
+    return () => {};
+
+  const listener = {
+    servers: servers?.length ? new Set(servers) : null,
+    onSnapshot,
+    onMetric,
+    onAlert,
+    onResync,
+  };
+  listeners.add(listener);
+
+  if (latest) call(onSnapshot, filterSnapshot(listener, latest));
+  if (listeners.size === 1) connect();
+
+  return () => {
+    listeners.delete(listener);
+    if (!listeners.size) disconnect();
+  };
+};
+
+// Appliquer un delta de mesure sur la dernière mesure connue
+export const applyMetricDelta = (previous, delta) => ({
+  ...(previous || {}),
+  ...delta,
+});